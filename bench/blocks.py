@@ -0,0 +1,175 @@
+"""Microbenchmark for stripping comments and brackets from proze lines.
+
+Compares lib.blocks.Blocks against the original regex based implementation
+kept below as LegacyBlocks.
+
+Usage: python3 -m bench.blocks
+"""
+from lib.blocks import Blocks
+import re
+import timeit
+
+legacy_regex = {
+    '###': re.compile(r'^.*?(?<!\\)(###)'),
+    '##': re.compile(r'^.*?(?<!\\)(?<!\#)(##)'),
+    '[': re.compile(r'^.*?(?<!\\)(\[)'),
+    ']': re.compile(r'^.*?(?<!\\)(])'),
+}
+
+
+class LegacyBlocks(object):
+
+    """Regex based implementation that rescans the line after each token."""
+
+    def __init__(self):
+        self.in_bracket_block = False
+        self.in_comment_block = False
+
+    def _get_index(self, line, token):
+        match = legacy_regex[token].match(line)
+        return match.start(1) if match else None
+
+    def _next_token(self, line):
+        index = None
+        token = None
+        index_line_comment = self._get_index(line, '##')
+        index_block_comment = self._get_index(line, '###')
+        index_bracket_open = self._get_index(line, '[')
+        index_bracket_close = self._get_index(line, ']')
+        if self.in_comment_block:
+            index = index_block_comment
+            token = '###'
+        elif self.in_bracket_block:
+            index = index_bracket_close
+            token = ']'
+        else:
+            if index_line_comment is not None:
+                index = index_line_comment
+                token = '##'
+            if index_block_comment is not None:
+                if not index or index_block_comment <= index:
+                    index = index_block_comment
+                    token = '###'
+            if index_bracket_open is not None:
+                if not index or index_bracket_open < index:
+                    index = index_bracket_open
+                    token = '['
+        return index, token
+
+    def remove(self, line):
+        result = ''
+        right = line
+        while right:
+            index, token = self._next_token(right)
+            if index is not None:
+                if token in ('###', '[', ']'):
+                    left, right = right[0:index], right[index+len(token):]
+                    if token == '###':
+                        if not self.in_comment_block:
+                            result = result + left
+                        self.in_comment_block = not self.in_comment_block
+                    else:
+                        if not self.in_bracket_block:
+                            result = result + left
+                        self.in_bracket_block = not self.in_bracket_block
+                else:
+                    result = result + right[0:index]
+                    right = None
+            else:
+                if not self.in_comment_block and not self.in_bracket_block:
+                    result = result + right
+                right = None
+        return result
+
+    def reset(self):
+        self.in_bracket_block = False
+        self.in_comment_block = False
+
+
+def token_dense_lines(count=200, repeat=40):
+    """Lines packed with bracket and comment blocks.
+    @type  count: int
+    @param count: Number of lines to generate.
+    @type  repeat: int
+    @param repeat: Number of hidden blocks on each line.
+    @rtype:  list
+    @return: Generated lines.
+    """
+    chunk = 'word [note] more ### hidden ### text \\[ escaped '
+    return [chunk * repeat + '\n' for _ in range(count)]
+
+
+def prose_lines(count=2000):
+    """Lines of prose without any comment or bracket tokens.
+    @type  count: int
+    @param count: Number of lines to generate.
+    @rtype:  list
+    @return: Generated lines.
+    """
+    sentence = (
+        '"Furthermore," she said, "I would never take a deal like that." '
+        'The rain kept falling on the __old__ house by the *ridge*. '
+    )
+    lines = []
+    for i in range(count):
+        lines.append('\n' if i % 2 else sentence * 4 + '\n')
+    return lines
+
+
+def commented_prose_lines(count=2000):
+    """Lines of prose hidden inside a multi-line block comment.
+    @type  count: int
+    @param count: Number of lines to generate.
+    @rtype:  list
+    @return: Generated lines.
+    """
+    lines = prose_lines(count)
+    lines[0] = '### ' + lines[0]
+    return lines
+
+
+def measure(blocks_class, lines, number=5):
+    """Time stripping every line.
+    @type  blocks_class: type
+    @param blocks_class: Class implementing remove() and reset().
+    @type  lines: list
+    @param lines: Lines of proze text.
+    @type  number: int
+    @param number: Number of passes over the lines.
+    @rtype:  float
+    @return: Throughput in MB of input per second.
+    """
+    blocks = blocks_class()
+
+    def run():
+        blocks.reset()
+        for line in lines:
+            blocks.remove(line)
+
+    size = sum(len(line) for line in lines) * number
+    seconds = min(timeit.repeat(run, number=number, repeat=3))
+    return size / seconds / 1e6
+
+
+def report(name, lines):
+    """Print throughput of both implementations for the input lines.
+    @type  name: str
+    @param name: Description of the input.
+    @type  lines: list
+    @param lines: Lines of proze text.
+    """
+    legacy = measure(LegacyBlocks, lines)
+    current = measure(Blocks, lines)
+    print('{:<14} legacy {:8.2f} MB/s   current {:8.2f} MB/s   x{:.1f}'.format(
+        name, legacy, current, current / legacy
+    ))
+
+
+def main():
+    report('token dense', token_dense_lines())
+    report('prose', prose_lines())
+    report('commented', commented_prose_lines())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Compare a benchmark run against a stored baseline.
+
+A stage counts as slower when its median is more than the threshold above
+the baseline median, and the two runs don't overlap: the lower quartile of
+the new samples is above the upper quartile of the baseline samples. Both
+runs are scaled by their calibration time first, so a baseline recorded
+on another machine can still be used. Exits with status 1 if any stage is
+slower, and with status 2 if the results were recorded with another
+version or spec than the baseline.
+
+Usage: python3 -m bench.compare [--threshold 0.25] [results.json]
+
+Without a results file, the suite is run with the spec of the baseline.
+To record a new baseline:
+
+python3 -m bench.suite --repeat 11 --output bench/baseline.json
+"""
+from bench.generator import ProjectSpec
+from bench.suite import run_suite
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+
+# Default baseline committed to the repo.
+BASELINE_PATH = 'bench/baseline.json'
+
+# Fields of the results that must match the baseline for the runs to be
+# comparable.
+MATCHED_FIELDS = ['version', 'spec']
+
+# Default slowdown of the median allowed before a stage fails.
+THRESHOLD = 0.25
+
+
+def compare(baseline, results, threshold=THRESHOLD):
+    """Compare the stages of two benchmark runs.
+    @type  baseline: dict
+    @param baseline: Results of the baseline run.
+    @type  results: dict
+    @param results: Results of the new run.
+    @type  threshold: float
+    @param threshold: Slowdown of the median allowed, e.g. 0.25 for 25%.
+    @rtype:  list
+    @return: Tuples of stage name, change of the median, and True if the
+        stage is slower, for the stages in both runs.
+    """
+    scale = 1.0
+    if baseline.get('calibration') and results.get('calibration'):
+        scale = results['calibration'] / baseline['calibration']
+    compared = []
+    for name, stage in baseline['stages'].items():
+        new = results['stages'].get(name)
+        if new is None:
+            continue
+        old_samples = [sample * scale for sample in stage['samples']]
+        old_median = statistics.median(old_samples)
+        new_median = statistics.median(new['samples'])
+        change = new_median / old_median - 1
+        slower = (
+            change > threshold and
+            quartiles(new['samples'])[0] > quartiles(old_samples)[2]
+        )
+        compared.append((name, change, slower))
+    return compared
+
+
+def mismatches(baseline, results):
+    """Find the fields that differ between two benchmark runs, which make
+    their timings incomparable, e.g. the spec of the generated project.
+    @type  baseline: dict
+    @param baseline: Results of the baseline run.
+    @type  results: dict
+    @param results: Results of the new run.
+    @rtype:  list
+    @return: Names of the fields that differ.
+    """
+    return [
+        field for field in MATCHED_FIELDS
+        if baseline.get(field) != results.get(field)
+    ]
+
+
+def parse_args(argv=None):
+    """Parse command line arguments.
+    @type  argv: list
+    @param argv: Arguments. Defaults to sys.argv.
+    @rtype:  object
+    @return: Parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description='Compare a benchmark run against a baseline.'
+    )
+    parser.add_argument(
+        'results',
+        nargs='?',
+        type=str,
+        help='JSON results of bench.suite. The suite is run if not given.'
+    )
+    parser.add_argument(
+        '--baseline',
+        default=BASELINE_PATH,
+        type=str,
+        help='JSON results to compare against.'
+    )
+    parser.add_argument(
+        '--threshold',
+        default=THRESHOLD,
+        type=float,
+        help='Slowdown of the median allowed, e.g. 0.25 for 25%%.'
+    )
+    return parser.parse_args(argv)
+
+
+def quartiles(samples):
+    """Get the quartiles of timing samples.
+    @type  samples: list
+    @param samples: Seconds taken by each run.
+    @rtype:  list
+    @return: Lower quartile, median and upper quartile.
+    """
+    if len(samples) < 2:
+        return [samples[0]] * 3
+    return statistics.quantiles(samples, n=4, method='inclusive')
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if args.results:
+        with open(args.results, 'r') as f:
+            results = json.load(f)
+        different = mismatches(baseline, results)
+        if different:
+            print('Results don\'t match the baseline: different {}.'.format(
+                ', '.join(different)
+            ))
+            return 2
+    else:
+        root = tempfile.mkdtemp()
+        try:
+            results = run_suite(
+                root, ProjectSpec(**baseline['spec']), baseline['repeat']
+            )
+        finally:
+            shutil.rmtree(root)
+    failed = False
+    for name, change, slower in compare(baseline, results, args.threshold):
+        failed = failed or slower
+        print('{:<12}{:>+9.1%}  {}'.format(
+            name, change, 'SLOWER' if slower else 'ok'
+        ))
+    if failed:
+        print('Performance regression beyond {:.0%}.'.format(args.threshold))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
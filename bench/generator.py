@@ -0,0 +1,119 @@
+"""Generate synthetic proze projects for benchmarks.
+
+Every project is generated from a seed, so the same spec always gives the
+same files.
+"""
+from bench.names import invalid_names
+from collections import namedtuple
+import os
+import random
+
+# Size and markup densities of a generated project. Densities are the
+# chance that a paragraph contains the markup.
+ProjectSpec = namedtuple('ProjectSpec', [
+    'seed',
+    'files',
+    'chapters',
+    'paragraphs',
+    'words',
+    'comments',
+    'brackets',
+    'emphasis',
+    'quotes',
+    'invalid',
+    'invalid_names',
+])
+ProjectSpec.__new__.__defaults__ = (
+    1,      # seed
+    20,     # files
+    3,      # chapters per file
+    50,     # paragraphs per chapter
+    60,     # words per paragraph
+    0.05,   # comments
+    0.05,   # brackets
+    0.2,    # emphasis
+    0.05,   # quotes
+    0.01,   # invalid
+    50,     # invalid names in the config
+)
+
+vocabulary = (
+    'the rain fell on the old house near the ridge where a well-known '
+    'stranger waited quietly for news of the storm and she looked up at '
+    'grey clouds while thunder rolled over fields of wheat that bent low '
+    'in wind he said nothing but his hands shook as lightning lit every '
+    'window of town'
+).split()
+
+
+def chapter(rng, spec, number, names):
+    """Generate the lines of a chapter.
+    @type  rng: random.Random
+    @param rng: Seeded random number generator.
+    @type  spec: ProjectSpec
+    @param spec: Size and densities of the project.
+    @type  number: int
+    @param number: Chapter number.
+    @type  names: list
+    @param names: Invalid names from the config.
+    @rtype:  list
+    @return: Lines of proze.
+    """
+    lines = ['Chapter: Chapter {}\n'.format(number), '\n']
+    for _ in range(spec.paragraphs):
+        words = [rng.choice(vocabulary) for _ in range(spec.words)]
+        words[0] = words[0].title()
+        if rng.random() < spec.emphasis:
+            start = rng.randrange(len(words))
+            end = rng.randrange(start, len(words))
+            mark = rng.choice(['*', '__'])
+            words[start] = mark + words[start]
+            words[end] = words[end] + mark
+        if rng.random() < spec.invalid:
+            words[rng.randrange(len(words))] = rng.choice(names)
+        if rng.random() < spec.brackets:
+            start = rng.randrange(len(words))
+            words[start] = '[' + words[start]
+            words[-1] = words[-1] + ']'
+        paragraph = ' '.join(words) + '.'
+        if rng.random() < spec.comments:
+            paragraph = paragraph + ' ## ' + ' '.join(words[:5])
+        if rng.random() < spec.quotes:
+            paragraph = '    ' + paragraph
+        lines.append(paragraph + '\n')
+        lines.append('\n')
+    return lines
+
+
+def generate(root, spec=ProjectSpec()):
+    """Write a proze project.
+    @type  root: str
+    @param root: Path to the project folder. Created if it doesn't exist.
+    @type  spec: ProjectSpec
+    @param spec: Size and densities of the project.
+    @rtype:  list
+    @return: Names of the proze files in compile order.
+    """
+    rng = random.Random(spec.seed)
+    names = invalid_names(spec.invalid_names, spec.seed)
+    os.makedirs(root, exist_ok=True)
+    order = []
+    for file_number in range(spec.files):
+        filename = '{:04}.proze'.format(file_number)
+        lines = []
+        if file_number == 0:
+            lines = ['Title: Benchmark\n', 'Author: Mary Sue\n', '\n']
+        for chapter_number in range(spec.chapters):
+            number = file_number * spec.chapters + chapter_number + 1
+            lines.extend(chapter(rng, spec, number, names))
+        with open(os.path.join(root, filename), 'w') as f:
+            f.writelines(lines)
+        order.append(filename)
+    with open(os.path.join(root, 'config.yml'), 'w') as f:
+        f.write('---\nnames:\n  invalid:\n')
+        for name in names:
+            f.write('    - {}\n'.format(name))
+        f.write('compile:\n  order:\n')
+        for filename in order:
+            f.write('    - {}\n'.format(filename))
+    return order
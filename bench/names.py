@@ -0,0 +1,78 @@
+"""Microbenchmark for finding invalid names on lines of proze.
+
+Compares lib.names.Names against one regex search per invalid name, as
+the check was originally implemented.
+
+Usage: python3 -m bench.names
+"""
+from bench.options import LegacyNames
+from lib.names import Names
+from test.mock import MockOptions
+import random
+import timeit
+
+syllables = [
+    'al', 'ba', 'cor', 'da', 'el', 'fen', 'gar', 'hal', 'is', 'jo', 'ka',
+    'lor', 'mal', 'nor', 'os', 'pe', 'quin', 'ra', 'sel', 'tor', 'ul', 'va',
+]
+
+
+def invalid_names(count, seed=1):
+    """Generate made up names, some of them with two words.
+    @type  count: int
+    @param count: Number of names.
+    @type  seed: int
+    @param seed: Seed for the random name generator.
+    @rtype:  list
+    @return: Generated names.
+    """
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        name = ''.join(rng.choice(syllables) for _ in range(3)).title()
+        if rng.random() < 0.2:
+            name = name + ' ' + rng.choice(syllables).title() + 'son'
+        names.add(name)
+    return sorted(names)
+
+
+def measure(names_class, names, lines):
+    """Time checking every line.
+    @type  names_class: type
+    @param names_class: Class implementing find_invalid().
+    @type  names: list
+    @param names: Invalid names.
+    @type  lines: list
+    @param lines: Lines of proze text.
+    @rtype:  float
+    @return: Lines checked per second.
+    """
+    options = MockOptions()
+    options.names.invalid = names
+    checker = names_class(options)
+
+    def run():
+        for line in lines:
+            checker.find_invalid(line)
+
+    seconds = min(timeit.repeat(run, number=1, repeat=3))
+    return len(lines) / seconds
+
+
+def main():
+    lines = [
+        'Winchester Mason felt a drop of water splash into his hair. He '
+        'looked up just in time to be hit in the eye with a second drop.'
+    ] * 200
+    for count in [4, 40, 400, 4000]:
+        names = invalid_names(count)
+        legacy = measure(LegacyNames, names, lines)
+        current = measure(Names, names, lines)
+        print('{:>5} names  legacy {:10.0f} lines/s   current {:10.0f} '
+              'lines/s   x{:.1f}'.format(
+                  count, legacy, current, current / legacy
+              ))
+
+
+if __name__ == '__main__':
+    main()
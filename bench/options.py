@@ -0,0 +1,100 @@
+"""Microbenchmark for reading compile options in per-line hot paths.
+
+Compares Rules.first_character and Names.find_invalid when options are a
+DotMap, as they were before, against the frozen lib.options records.
+
+Usage: python3 -m bench.options
+"""
+from lib.names import Names
+from lib.options import freeze
+from lib.rules import Rules
+from lib.state import State
+from types import SimpleNamespace
+import lib.config
+import re
+import timeit
+
+# Regex the invalid names were matched with before NameMatcher. The
+# lookarounds stop a name matching part of a larger word.
+invalid_base = '(?<![0-9a-zA-Z_-]){}(?![0-9a-zA-Z_-])'
+
+
+class LegacyNames(object):
+
+    """Invalid name check that reads the options on every line."""
+
+    def __init__(self, options):
+        self.options = options
+        self.invalid_patterns = {}
+
+    def find_invalid(self, line):
+        found = []
+        line = line.lower()
+        if self.options.names.invalid:
+            for invalid in self.options.names.invalid:
+                key = invalid.lower()
+                pattern = self.invalid_patterns.get(key)
+                if pattern is None:
+                    pattern = re.compile(invalid_base.format(key))
+                    self.invalid_patterns[key] = pattern
+                if pattern.search(line) is not None:
+                    found.append(invalid)
+        return found
+
+
+def per_call(function, number=20000):
+    """Time a function call.
+    @type  function: function
+    @param function: Function to time.
+    @type  number: int
+    @param number: Number of calls per sample.
+    @rtype:  float
+    @return: Time per call in microseconds.
+    """
+    seconds = min(timeit.repeat(function, number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+def report(name, before, after):
+    """Print the per-line overhead before and after.
+    @type  name: str
+    @param name: Description of what is timed.
+    @type  before: float
+    @param before: Microseconds per line before.
+    @type  after: float
+    @param after: Microseconds per line after.
+    """
+    print('{:<26} before {:7.2f} us/line   after {:7.2f} us/line'.format(
+        name, before, after
+    ))
+
+
+def main():
+    options = lib.config._default(SimpleNamespace(path='.'))
+    options.compile.order = []
+    options.compile.paragraph.tabFirst.title = True
+    options.names.invalid = ['Gerald', 'Yates', 'cheddar castle']
+    frozen = freeze(options)
+
+    state = State()
+    state.update('A paragraph of proze.')
+    before = Rules(options)
+    after = Rules(frozen)
+    report(
+        'Rules.first_character',
+        per_call(lambda: before.first_character(state, use_spaces=True)),
+        per_call(lambda: after.first_character(state, use_spaces=True)),
+    )
+
+    line = 'Winchester Mason felt a drop of water splash into his hair.'
+    before = LegacyNames(options)
+    after = Names(frozen)
+    report(
+        'Names.find_invalid',
+        per_call(lambda: before.find_invalid(line)),
+        per_call(lambda: after.find_invalid(line)),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark extracting the outline of a project against compiling it.
+
+Usage: python3 -m bench.outline
+"""
+from lib.blocks import Blocks
+from lib.names import Names
+from lib.outline import outline
+from lib.state import State
+from strategy.text import TextStrategy
+from types import SimpleNamespace
+import io
+import lib.config
+import os
+import proze
+import tempfile
+import timeit
+
+plain = (
+    'Winchester Mason felt a drop of water splash into his hair. He looked '
+    'up just in time to be hit in the eye with a second drop.\n'
+)
+chapter = [
+    'Chapter: Chapter {}\n',
+    '\n',
+    plain,
+    '\n',
+    'Sally ran for *cover* under the __old__ oak tree. ## Rewrite this.\n',
+    '\n',
+    plain,
+    '\n',
+    '[Note to self: foreshadow the storm.] The rain came down in sheets '
+    'over Happenstance Ridge.\n',
+    '\n',
+    plain,
+    '\n',
+    '---\n',
+    '\n',
+]
+
+
+def manuscript(chapters):
+    """Generate the text of a proze file.
+    @type  chapters: int
+    @param chapters: Number of chapters.
+    @rtype:  str
+    @return: Proze text.
+    """
+    lines = []
+    for number in range(chapters):
+        lines.append(chapter[0].format(number))
+        lines.extend(chapter[1:] * 20)
+    return ''.join(lines)
+
+
+def main():
+    text = manuscript(100)
+    handle, path = tempfile.mkstemp(suffix='.proze')
+    with os.fdopen(handle, 'w') as f:
+        f.write(text)
+    args = SimpleNamespace(path='test/sample/dark-and-story')
+    options = lib.config.load(args)
+    strategy = TextStrategy(options)
+
+    def compile_text():
+        with strategy.compile(io.StringIO()) as compiler:
+            proze.compile_file(
+                path, compiler, Blocks(), State(), Names(options)
+            )
+
+    def extract_outline():
+        with open(path, 'r') as proze_file:
+            list(outline(path, proze_file))
+
+    lines = text.count('\n')
+    compile_seconds = min(timeit.repeat(compile_text, number=1, repeat=3))
+    outline_seconds = min(timeit.repeat(extract_outline, number=1, repeat=3))
+    os.remove(path)
+    print('{} lines  compile {:8.0f} lines/s   outline {:8.0f} lines/s   '
+          'x{:.1f}'.format(
+              lines, lines / compile_seconds, lines / outline_seconds,
+              compile_seconds / outline_seconds
+          ))
+
+
+if __name__ == '__main__':
+    main()
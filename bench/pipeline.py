@@ -0,0 +1,86 @@
+"""Benchmark the pipelined compile on a project with slow file access.
+
+Opening a file is delayed to simulate a network mounted project folder.
+
+Usage: python3 -m bench.pipeline
+"""
+from bench.outline import manuscript
+import argparse
+import builtins
+import lib.pipeline
+import os
+import proze
+import shutil
+import tempfile
+import time
+
+# Simulated delay of opening a file on a network mount, in seconds.
+OPEN_LATENCY = 0.01
+
+
+def slow_open(*args, **kwargs):
+    """Open a file after a delay."""
+    time.sleep(OPEN_LATENCY)
+    return builtins.open(*args, **kwargs)
+
+
+def project(root, files, chapters):
+    """Generate a proze project.
+    @type  root: str
+    @param root: Path to the project folder.
+    @type  files: int
+    @param files: Number of proze files.
+    @type  chapters: int
+    @param chapters: Number of chapters per file.
+    """
+    names = ['{:03}.proze'.format(number) for number in range(files)]
+    text = manuscript(chapters)
+    for name in names:
+        with open(os.path.join(root, name), 'w') as f:
+            f.write(text)
+    with open(os.path.join(root, 'config.yml'), 'w') as f:
+        f.write('---\ncompile:\n  order:\n')
+        for name in names:
+            f.write('    - {}\n'.format(name))
+
+
+def measure(root, pipeline):
+    """Time compiling the project.
+    @type  root: str
+    @param root: Path to the project folder.
+    @type  pipeline: bool
+    @param pipeline: True to use the pipelined compile.
+    @rtype:  float
+    @return: Seconds taken.
+    """
+    args = argparse.Namespace(
+        doctype='txt',
+        output=os.path.join(root, 'out', 'output'),
+        path=root,
+        pipeline=pipeline,
+    )
+    start = time.perf_counter()
+    proze.run(args)
+    return time.perf_counter() - start
+
+
+def main():
+    root = tempfile.mkdtemp()
+    try:
+        project(root, 200, 2)
+        proze.open = slow_open
+        lib.pipeline.open = slow_open
+        serial = min(measure(root, False) for _ in range(3))
+        pipelined = min(measure(root, True) for _ in range(3))
+        print('{:.0f} ms open latency  serial {:.2f} s   pipeline {:.2f} s   '
+              'x{:.1f}'.format(
+                  OPEN_LATENCY * 1000, serial, pipelined, serial / pipelined
+              ))
+    finally:
+        del proze.open
+        del lib.pipeline.open
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""End to end benchmark suite on a generated proze project.
+
+Each stage of a compile is timed on its own, followed by a full compile of
+the project from disk. Results are printed and can be written as JSON, so
+that runs can be compared.
+
+Usage: python3 -m bench.suite [--files 10] [--output results.json] ...
+"""
+from bench.generator import ProjectSpec, generate
+from lib.blocks import Blocks
+from lib.names import Names
+from lib.state import State
+from strategy.text import MAX_LINE_LENGTH, TextStrategy, split_on_line_length
+from types import SimpleNamespace
+import argparse
+import contextlib
+import io
+import json
+import lib.config
+import platform
+import proze
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Bump when the format of the results changes.
+VERSION = 1
+
+
+def byte_count(lines):
+    """Count the bytes of lines of text.
+    @type  lines: list
+    @param lines: Lines of text.
+    @rtype:  int
+    @return: Number of bytes when encoded as UTF-8.
+    """
+    return sum(len(line.encode('utf-8')) for line in lines)
+
+
+def calibrate(repeat):
+    """Time a fixed workload of plain Python, to compare runs on machines
+    of different speeds.
+    @type  repeat: int
+    @param repeat: Number of runs.
+    @rtype:  float
+    @return: Median seconds taken.
+    """
+    def workload():
+        total = 0
+        for number in range(200000):
+            total = total + len(str(number))
+        return total
+
+    return statistics.median(timed(workload, repeat))
+
+
+def parse_args(argv=None):
+    """Parse command line arguments.
+    @type  argv: list
+    @param argv: Arguments. Defaults to sys.argv.
+    @rtype:  object
+    @return: Parsed command line arguments.
+    """
+    defaults = ProjectSpec()
+    parser = argparse.ArgumentParser(description='Benchmark proze stages.')
+    for field in ProjectSpec._fields:
+        default = getattr(defaults, field)
+        parser.add_argument(
+            '--' + field.replace('_', '-'),
+            default=default,
+            type=type(default),
+            help='Project {} (default: {}).'.format(
+                field.replace('_', ' '), default
+            )
+        )
+    parser.add_argument(
+        '--output',
+        type=str,
+        help='Path of a JSON file to write the results to.'
+    )
+    parser.add_argument(
+        '--repeat',
+        default=5,
+        type=int,
+        help='Number of times each stage is timed.'
+    )
+    return parser.parse_args(argv)
+
+
+def run_suite(root, spec, repeat):
+    """Generate a project and time each stage of compiling it.
+    @type  root: str
+    @param root: Path of a folder to generate the project in.
+    @type  spec: ProjectSpec
+    @param spec: Size and densities of the project.
+    @type  repeat: int
+    @param repeat: Number of times each stage is timed.
+    @rtype:  dict
+    @return: Results that can be written as JSON.
+    """
+    order = generate(root, spec)
+    options = lib.config.load(SimpleNamespace(path=root))
+    files = []
+    for filename in order:
+        with open(root + '/' + filename, 'r') as f:
+            files.append(f.readlines())
+    raw_lines = sum(len(lines) for lines in files)
+    raw_size = sum(byte_count(lines) for lines in files)
+
+    # Inputs of the later stages are the outputs of the earlier ones.
+    visible = []
+    states = []
+    blocks = Blocks()
+    state = State()
+    for lines in files:
+        blocks.reset()
+        state.reset()
+        for raw_line in lines:
+            line = blocks.remove(raw_line)
+            state.update(raw_line)
+            if line:
+                visible.append(line)
+                states.append(state.line_state())
+    visible_size = byte_count(visible)
+    unwrapped = options._replace(
+        compile=options.compile._replace(lineLength=sys.maxsize)
+    )
+    output = io.StringIO()
+    with TextStrategy(unwrapped).compile(output) as compiler:
+        compiler.write_many(visible, states)
+    formatted = output.getvalue().split('\n')
+    formatted_size = byte_count(formatted)
+
+    def blocks_stage():
+        blocks = Blocks()
+        for lines in files:
+            blocks.reset()
+            for raw_line in lines:
+                blocks.remove(raw_line)
+
+    def state_stage():
+        state = State()
+        for lines in files:
+            state.reset()
+            for raw_line in lines:
+                state.update(raw_line)
+
+    def names_stage():
+        names = Names(options)
+        for line in visible:
+            names.find_invalid(line)
+
+    def format_stage():
+        with TextStrategy(unwrapped).compile(io.StringIO()) as compiler:
+            compiler.write_many(visible, states)
+
+    def wrap_stage():
+        for line in formatted:
+            split_on_line_length(line, MAX_LINE_LENGTH)
+
+    args = argparse.Namespace(
+        doctype='txt', output=root + '/out/output', path=root
+    )
+
+    def end_to_end():
+        # Warnings about invalid names would flood the results.
+        with contextlib.redirect_stdout(io.StringIO()):
+            proze.run(args)
+
+    stages = {
+        'blocks': (blocks_stage, raw_lines, raw_size),
+        'state': (state_stage, raw_lines, raw_size),
+        'names': (names_stage, len(visible), visible_size),
+        'format': (format_stage, len(visible), visible_size),
+        'wrap': (wrap_stage, len(formatted), formatted_size),
+        'end_to_end': (end_to_end, raw_lines, raw_size),
+    }
+    results = {}
+    for name, (function, lines, size) in stages.items():
+        results[name] = stage_result(timed(function, repeat), lines, size)
+    return {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'spec': spec._asdict(),
+        'repeat': repeat,
+        'calibration': calibrate(repeat),
+        'stages': results,
+    }
+
+
+def stage_result(samples, lines, size):
+    """Summarize the timings of a stage.
+    @type  samples: list
+    @param samples: Seconds taken by each run.
+    @type  lines: int
+    @param lines: Number of lines processed per run.
+    @type  size: int
+    @param size: Number of bytes processed per run.
+    @rtype:  dict
+    @return: Timings and throughput based on the median run.
+    """
+    median = statistics.median(samples)
+    return {
+        'lines': lines,
+        'bytes': size,
+        'samples': samples,
+        'median': median,
+        'lines_per_sec': lines / median,
+        'mb_per_sec': size / median / 1e6,
+    }
+
+
+def timed(function, repeat):
+    """Time a function.
+    @type  function: function
+    @param function: Function to time.
+    @type  repeat: int
+    @param repeat: Number of runs.
+    @rtype:  list
+    @return: Seconds taken by each run.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spec = ProjectSpec(**{
+        field: getattr(args, field) for field in ProjectSpec._fields
+    })
+    root = tempfile.mkdtemp()
+    try:
+        results = run_suite(root, spec, args.repeat)
+    finally:
+        shutil.rmtree(root)
+    print('{:<12}{:>12}{:>14}{:>10}'.format(
+        'stage', 'median ms', 'lines/s', 'MB/s'
+    ))
+    for name, result in results['stages'].items():
+        print('{:<12}{:>12.1f}{:>14.0f}{:>10.2f}'.format(
+            name,
+            result['median'] * 1000,
+            result['lines_per_sec'],
+            result['mb_per_sec'],
+        ))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('Results written to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Microbenchmark for wrapping long lines of text output.
+
+Compares strategy.text.split_on_line_length against the original
+implementation kept below as legacy_split.
+
+Usage: python3 -m bench.wrap
+"""
+from strategy.text import MAX_LINE_LENGTH, split_on_line_length
+import random
+import timeit
+
+
+def legacy_split(line, width=MAX_LINE_LENGTH):
+    """Original wrapping that copies the rest of the line per split."""
+    lines = []
+    curr = line
+    while len(curr) > width:
+        index = width
+        while curr[index] not in [' ', '-'] and index >= 0:
+            index -= 1
+        if index == 0:
+            index = width
+        lines.append(curr[0:index])
+        curr = curr[index+1:]
+    lines.append(curr)
+    return lines
+
+
+def paragraph(size, seed=1):
+    """A single line paragraph of random words.
+    @type  size: int
+    @param size: Approximate number of characters in the paragraph.
+    @type  seed: int
+    @param seed: Seed for the random word generator.
+    @rtype:  str
+    @return: Generated paragraph.
+    """
+    words = (
+        'the rain fell on the old house near the ridge where a well-known '
+        'stranger waited quietly for news of the storm'
+    ).split()
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length = length + len(word) + 1
+    return ' '.join(parts)
+
+
+def measure(split, line, number=3):
+    """Time wrapping the line.
+    @type  split: function
+    @param split: Wrapping implementation.
+    @type  line: str
+    @param line: Text to be wrapped.
+    @type  number: int
+    @param number: Number of times the line is wrapped per sample.
+    @rtype:  float
+    @return: Throughput in MB of input per second.
+    """
+    seconds = min(timeit.repeat(
+        lambda: split(line, MAX_LINE_LENGTH), number=number, repeat=3
+    ))
+    return len(line) * number / seconds / 1e6
+
+
+def main():
+    for size in [1000, 10000, 100000, 1000000]:
+        line = paragraph(size)
+        legacy = measure(legacy_split, line)
+        current = measure(split_on_line_length, line)
+        print('{:>8} chars  legacy {:8.2f} MB/s   current {:8.2f} MB/s   '
+              'x{:.1f}'.format(size, legacy, current, current / legacy))
+
+
+if __name__ == '__main__':
+    main()
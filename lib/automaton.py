@@ -0,0 +1,76 @@
+"""Match many patterns in a single pass over a string."""
+
+
+class Automaton(object):
+
+    """Aho-Corasick automaton over a fixed set of patterns.
+
+    Building the automaton is linear in the total length of the patterns.
+    Searching is linear in the length of the text plus the number of
+    matches, no matter how many patterns there are.
+    """
+
+    def __init__(self, patterns):
+        """Constructor.
+        @type  patterns: iterable
+        @param patterns: Strings to search for. Empty strings are ignored.
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        """Add a pattern to the trie.
+        @type  pattern: str
+        @param pattern: String to search for.
+        """
+        node = 0
+        for char in pattern:
+            following = self.goto[node].get(char)
+            if following is None:
+                following = len(self.goto)
+                self.goto[node][char] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            node = following
+        if pattern not in self.output[node]:
+            self.output[node] = self.output[node] + (pattern,)
+
+    def _link(self):
+        """Build failure links breadth first and merge their outputs."""
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, following in self.goto[node].items():
+                queue.append(following)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                link = self.goto[fallback].get(char, 0)
+                self.fail[following] = link
+                self.output[following] = (
+                    self.output[following] + self.output[link]
+                )
+
+    def search(self, text):
+        """Find every occurrence of every pattern in the text.
+        @type  text: str
+        @param text: Text to search.
+        @rtype:  generator
+        @return: Tuples of start index and pattern for each match,
+            including overlapping matches.
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern in output[node]:
+                yield index - len(pattern) + 1, pattern
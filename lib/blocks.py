@@ -1,87 +1,77 @@
 from dotmap import DotMap
 import re
 
-tkn = DotMap()
-tkn.comment.block = '###'
-tkn.comment.line = '##'
-tkn.bracket.open = '['
-tkn.bracket.close = ']'
-
-regex = {
-    '###': re.compile(r'^.*?(?<!\\)(###)'),
-    '##': re.compile(r'^.*?(?<!\\)(?<!\#)(##)'),
-    '[': re.compile(r'^.*?(?<!\\)(\[)'),
-    ']': re.compile(r'^.*?(?<!\\)(])'),
-}
+# Plain constants are used while scanning since DotMap lookups are slow.
+COMMENT_BLOCK = '###'
+COMMENT_LINE = '##'
+BRACKET_OPEN = '['
+BRACKET_CLOSE = ']'
 
+tkn = DotMap()
+tkn.comment.block = COMMENT_BLOCK
+tkn.comment.line = COMMENT_LINE
+tkn.bracket.open = BRACKET_OPEN
+tkn.bracket.close = BRACKET_CLOSE
 
-class RegexNotFound(Exception):
-    pass
+# Candidate positions of tokens that start hiding text. A '##' match may
+# turn out to be the start of a '###' block token.
+open_candidates = re.compile(r'##|\[')
 
 
 class Blocks(object):
 
-    """Strip comments and bracket blocks from lines."""
+    """Strip comments and bracket blocks from lines.
+
+    Each line is scanned once from left to right. Lines without any '#' or
+    '[' characters are returned as is, and inside a block the scan jumps
+    straight to the closing token. A token only counts if it isn't escaped
+    with a backslash. Escapes and the '##' lookbehind only
+    apply to characters after the most recently consumed token.
+    """
 
     def __init__(self):
         self.in_bracket_block = False
         self.in_comment_block = False
+        self.in_line_comment = False
 
-    def _get_index(self, line, token):
-        """Get index of first occurrence of the token in the string.
+    def _find_close(self, line, token, start):
+        """Find the first unescaped closing token at or after start.
         @type  line: str
-        @param line: Line of proze formatted text.
+        @param line: The proze line being processed.
         @type  token: str
-        @param token: Substring being searched for.
+        @param token: Closing token being searched for.
+        @type  start: int
+        @param start: Index just past the most recently consumed token.
         @rtype:  int
-        @return: Index of the first token in the strong, None if not found.
+        @return: Index of the token, -1 if not found.
         """
-        index = None
-        prog = regex.get(token)
-        if prog is None:
-            raise RegexNotFound('No regex found for token ' + str(token))
-        match = prog.match(line)
-        if match:
-            index = match.start(1)
+        index = line.find(token, start)
+        while index > start and line[index - 1] == '\\':
+            index = line.find(token, index + 1)
         return index
 
-    def _next_token(self, line):
-        """Get the index and type of the first comment or bracket token.
+    def _find_open(self, line, start):
+        """Find the first unescaped token that starts hiding text.
         @type  line: str
         @param line: The proze line being processed.
+        @type  start: int
+        @param start: Index just past the most recently consumed token.
         @rtype:  tuple(int, str)
-        @return: Line token index, value. Both None if no token found.
+        @return: Token index and value. (-1, None) if no token found.
         """
-        index = None
-        token = None
-        index_line_comment = self._get_index(line, tkn.comment.line)
-        index_block_comment = self._get_index(line, tkn.comment.block)
-        index_bracket_open = self._get_index(line, tkn.bracket.open)
-        index_bracket_close = self._get_index(line, tkn.bracket.close)
-        if self.in_comment_block:
-            # Everything is hidden up until the closing comment block token.
-            index = index_block_comment
-            token = tkn.comment.block
-        elif self.in_bracket_block:
-            # Everything is hidden up until the closing bracket token.
-            index = index_bracket_close
-            token = tkn.bracket.close
-        else:
-            # We're looking for the first token found on the line because
-            # it will hide any subsequent tokens. The closing bracket is
-            # ignored because it doesn't matter in this state.
-            if index_line_comment is not None:
-                index = index_line_comment
-                token = tkn.comment.line
-            if index_block_comment is not None:
-                if not index or index_block_comment <= index:
-                    index = index_block_comment
-                    token = tkn.comment.block
-            if index_bracket_open is not None:
-                if not index or index_bracket_open < index:
-                    index = index_bracket_open
-                    token = tkn.bracket.open
-        return index, token
+        match = open_candidates.search(line, start)
+        while match:
+            index = match.start()
+            previous = line[index - 1] if index > start else ''
+            if previous != '\\':
+                if line[index] == BRACKET_OPEN:
+                    return index, BRACKET_OPEN
+                if line.startswith(COMMENT_BLOCK, index):
+                    return index, COMMENT_BLOCK
+                if previous != '#':
+                    return index, COMMENT_LINE
+            match = open_candidates.search(line, index + 1)
+        return -1, None
 
     def remove(self, line):
         """Remove text from the line that is in brackets or comments.
@@ -90,36 +80,75 @@ class Blocks(object):
         @rtype:  str
         @return: The proze formatted line with brackets/comments removed.
         """
-        result = ''
-        right = line
-        while right:
-            index, token = self._next_token(right)
-            if index is not None:
-                if (
-                    token == tkn.comment.block or
-                    token == tkn.bracket.open or
-                    token == tkn.bracket.close
-                ):
-                    left, right = right[0:index], right[index+len(token):]
-                    if token == tkn.comment.block:
-                        if not self.in_comment_block:
-                            result = result + left
-                        self.in_comment_block = not self.in_comment_block
-                    else:
-                        if not self.in_bracket_block:
-                            result = result + left
-                        self.in_bracket_block = not self.in_bracket_block
-                else:
-                    keep, _ = right[0:index], right[index:]
-                    right = None
-                    result = result + keep
+        self.in_line_comment = False
+        if not self.in_comment_block and not self.in_bracket_block:
+            # Most lines of prose can't contain a token that hides text.
+            if '#' not in line and BRACKET_OPEN not in line:
+                return line
+        kept = []
+        start = 0
+        while True:
+            if self.in_comment_block:
+                # Everything is hidden up until the closing comment token.
+                index = self._find_close(line, COMMENT_BLOCK, start)
+                if index < 0:
+                    break
+                self.in_comment_block = False
+                start = index + len(COMMENT_BLOCK)
+            elif self.in_bracket_block:
+                # Everything is hidden up until the closing bracket token.
+                index = self._find_close(line, BRACKET_CLOSE, start)
+                if index < 0:
+                    break
+                self.in_bracket_block = False
+                start = index + len(BRACKET_CLOSE)
             else:
-                if not self.in_comment_block and not self.in_bracket_block:
-                    result = result + right
-                right = None
-        return result
+                # The first token found hides any tokens that follow it.
+                index, token = self._find_open(line, start)
+                if token is None:
+                    kept.append(line[start:])
+                    break
+                kept.append(line[start:index])
+                if token == COMMENT_LINE:
+                    self.in_line_comment = True
+                    break
+                if token == COMMENT_BLOCK:
+                    self.in_comment_block = True
+                else:
+                    self.in_bracket_block = True
+                start = index + len(token)
+        return ''.join(kept)
+
+    def remove_continued(self, line):
+        """Remove hidden text from the next piece of a line that is too
+        long to be read at once. The first piece is passed to remove(), and
+        a line comment in an earlier piece hides the rest of the line.
+        @type  line: str
+        @param line: Piece of the proze line being processed.
+        @rtype:  str
+        @return: The piece with brackets/comments removed.
+        """
+        if self.in_line_comment:
+            return ''
+        return self.remove(line)
 
     def reset(self):
         """Clear state values."""
         self.in_bracket_block = False
         self.in_comment_block = False
+        self.in_line_comment = False
+
+    def restore(self, snapshot):
+        """Continue from state values saved with snapshot().
+        @type  snapshot: list
+        @param snapshot: Saved state values.
+        """
+        self.in_bracket_block, self.in_comment_block = snapshot
+
+    def snapshot(self):
+        """Save the state values, e.g. to resume parsing part way through a
+        file later.
+        @rtype:  list
+        @return: State values that can be stored as JSON.
+        """
+        return [self.in_bracket_block, self.in_comment_block]
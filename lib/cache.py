@@ -0,0 +1,238 @@
+"""Cache compiled output fragments between runs."""
+import hashlib
+import json
+import os
+
+# Folder in the project root where cached data is stored.
+CACHE_DIR = '.proze-cache'
+
+# Default upper bound on the total size of cached fragments.
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Bump when the format of cached data changes.
+VERSION = 3
+
+
+def hash_bytes(data):
+    """Hash content for use in cache keys.
+    @type  data: bytes
+    @param data: Content to hash.
+    @rtype:  str
+    @return: Hex digest of the content.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def options_key(doctype, options):
+    """Build a key from the options that change compiled output.
+    @type  doctype: str
+    @param doctype: Output format of the compiled document.
+    @type  options: lib.options.Options
+    @param options: Compile options parsed from the config file.
+    @rtype:  str
+    @return: Hash of the options.
+    """
+    paragraph = options.compile.paragraph
+    values = [
+        doctype,
+        options.compile.lineLength,
+        paragraph.mode,
+        paragraph.removeBlankLines,
+        paragraph.tabFirst.chapter,
+        paragraph.tabFirst.section,
+        paragraph.tabFirst.title,
+        options.compile.spacing,
+        list(options.names.invalid),
+    ]
+    return hash_bytes(json.dumps(values).encode('utf-8'))
+
+
+class FileHashes(object):
+
+    """Content hashes of project files, checked against mtime and size.
+
+    A file is only read and hashed when its mtime or size differ from the
+    values recorded when it was last hashed.
+    """
+
+    def __init__(self, root, records=None):
+        """Constructor.
+        @type  root: str
+        @param root: Path to the root folder of the proze project.
+        @type  records: dict
+        @param records: Saved records of [mtime, size, hash] by file name.
+        """
+        self.root = root
+        self.records = records if records is not None else {}
+
+    def get(self, filename):
+        """Get the content hash of a file.
+        @type  filename: str
+        @param filename: Name of the file relative to the project root.
+        @rtype:  str
+        @return: Hash of the file content. None if the file doesn't exist.
+        """
+        path = self.root + '/' + filename
+        try:
+            stat = os.stat(path)
+            record = self.records.get(filename)
+            if record and record[0] == stat.st_mtime_ns and \
+                    record[1] == stat.st_size:
+                return record[2]
+            with open(path, 'rb') as f:
+                digest = hash_bytes(f.read())
+        except FileNotFoundError:
+            self.records.pop(filename, None)
+            return None
+        self.records[filename] = [stat.st_mtime_ns, stat.st_size, digest]
+        return digest
+
+
+class FragmentCache(object):
+
+    """Persistent cache of compiled output fragments.
+
+    Fragments are stored in CACHE_DIR in the project root. Each one is keyed
+    by the content hash of its proze file, the file name, the options that
+    change the output and whether the file before it ends in a heading
+    (State.find_first_paragraph at the start of the file). When the cache
+    grows beyond max_bytes, the least recently used fragments are evicted.
+    """
+
+    def __init__(self, root, doctype, options, max_bytes=MAX_CACHE_BYTES):
+        """Constructor.
+        @type  root: str
+        @param root: Path to the root folder of the proze project.
+        @type  doctype: str
+        @param doctype: Output format of the compiled document.
+        @type  options: lib.options.Options
+        @param options: Compile options parsed from the config file.
+        @type  max_bytes: int
+        @param max_bytes: Upper bound on the total size of stored fragments.
+        """
+        self.dir = os.path.join(root, CACHE_DIR)
+        self.index_path = os.path.join(self.dir, 'fragments.json')
+        self.max_bytes = max_bytes
+        self.options_key = options_key(doctype, options)
+        self.root = root
+        self._load()
+
+    def _entry_path(self, key):
+        """Path of the file that holds a cached fragment.
+        @type  key: str
+        @param key: Cache key of the fragment.
+        @rtype:  str
+        @return: Path to the fragment file.
+        """
+        return os.path.join(self.dir, key + '.json')
+
+    def _evict(self):
+        """Remove least recently used fragments until under max_bytes."""
+        total = sum(self.entries.values())
+        while total > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            total = total - self.entries.pop(key)
+            try:
+                os.remove(self._entry_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _key(self, filename, find_first_paragraph):
+        """Build the cache key for a proze file.
+        @type  filename: str
+        @param filename: Name of the proze file relative to the project root.
+        @type  find_first_paragraph: bool
+        @param find_first_paragraph: State.find_first_paragraph at the
+            start of the file.
+        @rtype:  str
+        @return: Cache key. None if the file doesn't exist.
+        """
+        digest = self.hashes.get(filename)
+        if digest is None:
+            return None
+        key = json.dumps([
+            self.options_key, self.root, filename, digest,
+            find_first_paragraph,
+        ])
+        return hash_bytes(key.encode('utf-8'))
+
+    def _load(self):
+        """Load the cache index from disk."""
+        index = {}
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if index.get('version') != VERSION:
+            index = {}
+        self.hashes = FileHashes(self.root, index.get('files'))
+        # Dicts keep insertion order, so the first entry is the least
+        # recently used one.
+        self.entries = dict(index.get('entries', []))
+
+    def get(self, filename, find_first_paragraph):
+        """Get the cached fragment for a proze file.
+        @type  filename: str
+        @param filename: Name of the proze file relative to the project root.
+        @type  find_first_paragraph: bool
+        @param find_first_paragraph: State.find_first_paragraph at the
+            start of the file.
+        @rtype:  tuple(str, str, bool)
+        @return: Formatted output and console messages of the file, and
+            State.find_first_paragraph at the end of it. None if it isn't
+            cached.
+        """
+        key = self._key(filename, find_first_paragraph)
+        if key is None or key not in self.entries:
+            return None
+        try:
+            with open(self._entry_path(key), 'r') as f:
+                fragment, messages, find_at_end = json.load(f)
+        except (OSError, ValueError):
+            del self.entries[key]
+            return None
+        self.entries[key] = self.entries.pop(key)
+        return fragment, messages, find_at_end
+
+    def put(self, filename, find_first_paragraph, fragment, messages,
+            find_at_end):
+        """Store the compiled fragment of a proze file.
+        @type  filename: str
+        @param filename: Name of the proze file relative to the project root.
+        @type  find_first_paragraph: bool
+        @param find_first_paragraph: State.find_first_paragraph at the
+            start of the file.
+        @type  fragment: str
+        @param fragment: Formatted output of the file.
+        @type  messages: str
+        @param messages: Console messages printed while compiling the file.
+        @type  find_at_end: bool
+        @param find_at_end: State.find_first_paragraph at the end of the
+            file.
+        """
+        key = self._key(filename, find_first_paragraph)
+        if key is None:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        data = json.dumps([fragment, messages, find_at_end]).encode('utf-8')
+        with open(self._entry_path(key), 'wb') as f:
+            f.write(data)
+        self.entries.pop(key, None)
+        self.entries[key] = len(data)
+
+    def save(self):
+        """Evict old fragments and write the cache index to disk."""
+        if not self.entries and not os.path.isdir(self.dir):
+            return
+        self._evict()
+        os.makedirs(self.dir, exist_ok=True)
+        index = {
+            'version': VERSION,
+            'files': self.hashes.records,
+            'entries': list(self.entries.items()),
+        }
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
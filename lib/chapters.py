@@ -0,0 +1,226 @@
+"""Index the byte offsets of chapters so they can be compiled on their own."""
+from collections import namedtuple
+from lib.blocks import Blocks
+from lib.cache import CACHE_DIR
+from lib.state import State
+from lib.structural_token import MarkupToken
+import io
+import json
+import locale
+import os
+
+# Bump when the format of the stored index changes.
+VERSION = 3
+
+# Line of chapter or section markup, and the parsing state before it.
+Marker = namedtuple('Marker', [
+    'filename', 'offset', 'line_number', 'token', 'title', 'blocks', 'state',
+])
+
+# Part of a proze file to compile, from the byte offset of a marker up to an
+# end offset. The marker is None to start at the beginning of the file, and
+# the end is None to compile the rest of the file.
+Segment = namedtuple('Segment', ['filename', 'marker', 'end'])
+
+
+def scan(proze_file, encoding=None):
+    """Find the chapter and section markers of a proze file.
+    @type  proze_file: file
+    @param proze_file: Proze file opened in binary mode.
+    @type  encoding: str
+    @param encoding: Text encoding of the file. Defaults to the encoding
+        used when a proze file is opened as text.
+    @rtype:  list
+    @return: Offset, line number, token, title and the Blocks and State
+        snapshots from before each marker line.
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+    blocks = Blocks()
+    state = State()
+    markers = []
+    offset = 0
+    for line_number, data in enumerate(proze_file, 1):
+        raw_line = data.decode(encoding)
+        snapshot = None
+        if raw_line[:1] in 'cCsS' and (
+            state.is_blank or state.markup.is_markup_line
+        ):
+            # Only these lines can start a chapter or section.
+            snapshot = blocks.snapshot(), state.snapshot()
+        line = blocks.remove(raw_line)
+        state.update(raw_line)
+        token = state.markup.token
+        if snapshot and line and (
+            token == MarkupToken.chapter or token == MarkupToken.section
+        ):
+            title = line.strip()[len(token):].strip()
+            markers.append([
+                offset, line_number, token, title, snapshot[0], snapshot[1],
+            ])
+        offset = offset + len(data)
+    return markers
+
+
+class ChapterIndex(object):
+
+    """Persistent index of the chapter and section markers of a project.
+
+    The index is stored in CACHE_DIR in the project root. The markers of a
+    file are found again when its mtime or size change.
+    """
+
+    def __init__(self, root):
+        """Constructor.
+        @type  root: str
+        @param root: Path to the root folder of the proze project.
+        """
+        self.changed = False
+        self.path = os.path.join(root, CACHE_DIR, 'chapters.json')
+        self.root = root
+        self._load()
+
+    def chapters(self, order):
+        """Get the chapter markers of the project.
+        @type  order: list
+        @param order: Names of the proze files in compile order.
+        @rtype:  list
+        @return: Markers of every chapter in compile order.
+        """
+        return [
+            marker
+            for filename in order
+            for marker in self.markers(filename)
+            if marker.token == MarkupToken.chapter
+        ]
+
+    def _load(self):
+        """Load the stored index from disk."""
+        index = {}
+        try:
+            with open(self.path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if index.get('version') != VERSION:
+            index = {}
+        self.files = index.get('files', {})
+
+    def markers(self, filename):
+        """Get the chapter and section markers of a proze file.
+        @type  filename: str
+        @param filename: Name of the file relative to the project root.
+        @rtype:  list
+        @return: Markers in the order they appear. Empty if the file
+            doesn't exist.
+        """
+        path = os.path.join(self.root, filename)
+        try:
+            stat = os.stat(path)
+            record = self.files.get(filename)
+            if not record or record[0] != stat.st_mtime_ns or \
+                    record[1] != stat.st_size:
+                with open(path, 'rb') as proze_file:
+                    record = [stat.st_mtime_ns, stat.st_size, scan(proze_file)]
+                self.files[filename] = record
+                self.changed = True
+        except FileNotFoundError:
+            if self.files.pop(filename, None) is not None:
+                self.changed = True
+            return []
+        return [Marker(filename, *values) for values in record[2]]
+
+    def save(self):
+        """Write the index to disk if it changed."""
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': VERSION, 'files': self.files}, f)
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+    def segments(self, order, numbers):
+        """Find the parts of the project that hold the selected chapters.
+        A chapter runs until the next chapter marker, which can be in a
+        later file, or until the end of the project.
+
+        @type  order: list
+        @param order: Names of the proze files in compile order.
+        @type  numbers: list
+        @param numbers: Chapter numbers to select, counting from 1.
+        @rtype:  list
+        @return: Segments in compile order.
+        """
+        chapters = self.chapters(order)
+        positions = {filename: i for i, filename in enumerate(order)}
+        segments = []
+        for number in sorted(set(numbers)):
+            if number < 1 or number > len(chapters):
+                continue
+            start = chapters[number - 1]
+            end = chapters[number] if number < len(chapters) else None
+            first = positions[start.filename]
+            last = len(order) - 1 if end is None else positions[end.filename]
+            for position in range(first, last + 1):
+                filename = order[position]
+                marker = start if position == first else None
+                stop = None
+                if end is not None and position == last:
+                    stop = end.offset
+                if marker is None and stop == 0:
+                    continue
+                if segments and segments[-1].filename == filename and \
+                        segments[-1].end is not None and \
+                        marker is not None and \
+                        segments[-1].end == marker.offset:
+                    # Join chapters that follow each other.
+                    segments[-1] = segments[-1]._replace(end=stop)
+                    continue
+                segments.append(Segment(filename, marker, stop))
+        return segments
+
+
+class SegmentReader(io.RawIOBase):
+
+    """Binary stream of the bytes of a file up to a limit.
+
+    Wrapped in a buffered text stream, a segment is decoded as it's read,
+    so it never has to be held in memory at once.
+    """
+
+    def __init__(self, handle, size=None):
+        """Constructor.
+        @type  handle: file
+        @param handle: Unbuffered binary file, at the start of the segment.
+        @type  size: int
+        @param size: Number of bytes in the segment. The rest of the file is
+            read if not given.
+        """
+        super().__init__()
+        self.handle = handle
+        self.remaining = size
+
+    def close(self):
+        """Close the file."""
+        if not self.closed:
+            self.handle.close()
+        super().close()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        """Read bytes of the segment into a buffer.
+        @type  buffer: bytearray
+        @param buffer: Buffer to fill.
+        @rtype:  int
+        @return: Number of bytes read. Zero at the end of the segment.
+        """
+        view = memoryview(buffer).cast('B')
+        if self.remaining is not None:
+            view = view[:self.remaining]
+        count = self.handle.readinto(view)
+        if self.remaining is not None:
+            self.remaining = self.remaining - count
+        return count
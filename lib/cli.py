@@ -2,6 +2,29 @@ import argparse
 import os
 
 
+def chapter_numbers(value):
+    """Parse a selection of chapter numbers, e.g. '3' or '1,12-15'.
+    @type  value: str
+    @param value: Command line value.
+    @rtype:  list
+    @return: Chapter numbers in order.
+    """
+    numbers = set()
+    try:
+        for part in value.split(','):
+            first, separator, last = part.partition('-')
+            first = int(first)
+            last = int(last) if separator else first
+            if first < 1 or last < first:
+                raise ValueError
+            numbers.update(range(first, last + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'invalid chapter selection: {}'.format(value)
+        )
+    return sorted(numbers)
+
+
 def parse():
     """Parse command line arguments.
     @rtype:  object
@@ -9,14 +32,56 @@ def parse():
     """
     cwd = os.getcwd()
     parser = argparse.ArgumentParser(description='Compile a proze project.')
+    # Only one way of measuring the compile can be active at a time.
+    measure = parser.add_mutually_exclusive_group()
     parser.add_argument(
         'doctype',
         choices=[
+            'index',
+            'outline',
             'pdf',
+            'report',
             'txt',
         ],
         type=str,
-        help='The output format of the compiled document.'
+        help='The output format of the compiled document, report to ' +
+        'print a report about the project, index to look up words, or ' +
+        'outline to list the structural markup.'
+    )
+    parser.add_argument(
+        'arguments',
+        nargs='*',
+        type=str,
+        help='Arguments of the command, e.g. the kind of report: names, ' +
+        'or the words to look up in the index.'
+    )
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Reuse the output of unchanged proze files from earlier runs.'
+    )
+    parser.add_argument(
+        '--chapters',
+        type=chapter_numbers,
+        help='Only compile these chapters, e.g. 12-15 or 1,3.'
+    )
+    parser.add_argument(
+        '--file',
+        action='append',
+        help='Only compile this proze file. Can be given more than once.'
+    )
+    parser.add_argument(
+        '--jobs',
+        default=1,
+        type=int,
+        help='Number of processes used to compile proze files. ' +
+        'Use 0 for one process per CPU.'
+    )
+    measure.add_argument(
+        '--memory-report',
+        action='store_true',
+        help='Print the peak memory of the compile and the lines of code ' +
+        'that allocated the most memory. Only the main process is traced.'
     )
     parser.add_argument(
         '--output',
@@ -30,4 +95,48 @@ def parse():
         type=str,
         help='Path to the root folder of the proze project.'
     )
-    return parser.parse_args()
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Read proze files ahead of the parser, and format and write ' +
+        'output in a separate process while files are parsed.'
+    )
+    measure.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print the time spent in each stage of the compile. Only ' +
+        'work done in the main process is counted, so it can\'t be used ' +
+        'with --jobs or --pipeline.'
+    )
+    measure.add_argument(
+        '--trace',
+        metavar='PATH',
+        type=str,
+        help='Write a Chrome trace of the compile to PATH, to be opened ' +
+        'in chrome://tracing or Perfetto. Worker processes are traced ' +
+        'when they are forked, the default on Linux.'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and recompile proze files when they change. ' +
+        'Only for the pdf and txt doctypes.'
+    )
+    args = parser.parse_args()
+    if args.doctype == 'report':
+        if args.arguments != ['names']:
+            parser.error('the kind of report must be one of: names')
+    elif args.arguments and args.doctype != 'index':
+        parser.error('unrecognized arguments: ' + ' '.join(args.arguments))
+    if (args.chapters or args.file) and (args.cache or args.jobs != 1):
+        parser.error('--chapters and --file can\'t be used with --cache ' +
+                     'or --jobs')
+    if args.watch and args.doctype not in ['pdf', 'txt']:
+        parser.error('--watch can only be used with the pdf and txt ' +
+                     'doctypes')
+    if args.watch and (args.chapters or args.file):
+        parser.error('--watch can\'t be used with --chapters or --file')
+    if args.profile and (args.jobs != 1 or args.pipeline):
+        parser.error('--profile can\'t be used with --jobs or --pipeline, ' +
+                     'which compile in other processes')
+    return args
@@ -0,0 +1,207 @@
+"""Persistent inverted index of the words in a proze project."""
+from lib.blocks import Blocks
+from lib.cache import CACHE_DIR, FileHashes
+from lib.report import chapter_title
+from lib.state import State
+from lib.structural_token import MarkupToken
+import bisect
+import gzip
+import json
+import os
+import re
+
+# Bump when the format of the stored index changes.
+VERSION = 2
+
+# Words of any alphabet, with the hyphens and underscores that names use.
+words = re.compile(r'[\w-]+', re.UNICODE)
+
+
+def decode_lines(deltas):
+    """Expand delta encoded line numbers.
+    @type  deltas: list
+    @param deltas: First line number followed by the gaps between lines.
+    @rtype:  list
+    @return: Line numbers.
+    """
+    lines = []
+    line_number = 0
+    for delta in deltas:
+        line_number = line_number + delta
+        lines.append(line_number)
+    return lines
+
+
+def scan(proze_file):
+    """Index the words of a proze file that make it into compiled output.
+    Comments and bracket blocks are skipped, the same as when compiling,
+    and so are the tokens of structural markup lines.
+
+    @type  proze_file: file
+    @param proze_file: Open proze file.
+    @rtype:  dict
+    @return: Chapters as [line number, title] pairs in order, and delta
+        encoded line numbers of each lowercase word.
+    """
+    blocks = Blocks()
+    state = State()
+    chapters = []
+    index = {}
+    for line_number, raw_line in enumerate(proze_file, 1):
+        line = blocks.remove(raw_line)
+        state.update(raw_line)
+        if not line:
+            continue
+        token = state.markup.token
+        if token == MarkupToken.chapter:
+            chapters.append([line_number, chapter_title(line)])
+        if token is not None:
+            line = line.strip()[len(token):]
+        for word in words.findall(line.lower()):
+            lines = index.get(word)
+            if lines is None:
+                index[word] = [line_number]
+            elif lines[-1] != line_number:
+                lines.append(line_number)
+    # Store the gaps between line numbers, which are short in JSON.
+    for word, lines in index.items():
+        previous = 0
+        deltas = []
+        for line_number in lines:
+            deltas.append(line_number - previous)
+            previous = line_number
+        index[word] = deltas
+    return {'chapters': chapters, 'words': index}
+
+
+class Concordance(object):
+
+    """Index of the files, lines and chapters where each word appears.
+
+    The index is stored gzip compressed in CACHE_DIR in the project root.
+    Each file is indexed separately and only rescanned when its content
+    hash changes. A line belongs to the last chapter that starts before it,
+    which can be in an earlier file of the compile order.
+    """
+
+    def __init__(self, root):
+        """Constructor.
+        @type  root: str
+        @param root: Path to the root folder of the proze project.
+        """
+        self.order = []
+        self.path = os.path.join(root, CACHE_DIR, 'concordance.json.gz')
+        self.root = root
+        self._load()
+
+    def _chapter(self, position, line_number):
+        """Find the chapter that contains a line.
+        @type  position: int
+        @param position: Index of the file in the compile order.
+        @type  line_number: int
+        @param line_number: Line number in the file.
+        @rtype:  str
+        @return: Title of the chapter. Empty if before the first chapter.
+        """
+        chapters = self.files[self.order[position]]['chapters']
+        index = bisect.bisect_right(self.chapter_lines[position], line_number)
+        if index:
+            return chapters[index - 1][1]
+        for previous in range(position - 1, -1, -1):
+            chapters = self.files[self.order[previous]]['chapters']
+            if chapters:
+                return chapters[-1][1]
+        return ''
+
+    def chapters(self, word):
+        """Find the chapters where a word appears.
+        @type  word: str
+        @param word: Word to look up. Case is ignored.
+        @rtype:  list
+        @return: Chapter titles in compile order, without duplicates.
+        """
+        found = []
+        for _, _, chapter in self.find(word):
+            if chapter not in found:
+                found.append(chapter)
+        return found
+
+    def find(self, word):
+        """Find every line where a word appears.
+        @type  word: str
+        @param word: Word to look up. Case is ignored.
+        @rtype:  list
+        @return: Tuples of file name, line number and chapter title in
+            compile order.
+        """
+        word = word.lower()
+        found = []
+        for position, filename in enumerate(self.order):
+            deltas = self.files[filename]['words'].get(word)
+            if deltas:
+                for line_number in decode_lines(deltas):
+                    found.append((
+                        filename,
+                        line_number,
+                        self._chapter(position, line_number),
+                    ))
+        return found
+
+    def _load(self):
+        """Load the stored index from disk."""
+        index = {}
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if index.get('version') != VERSION:
+            index = {}
+        self.files = index.get('files', {})
+        self.hashes = FileHashes(self.root, index.get('hashes'))
+        self.chapter_lines = []
+
+    def save(self):
+        """Write the index to disk."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        index = {
+            'version': VERSION,
+            'hashes': self.hashes.records,
+            'files': self.files,
+        }
+        tmp_path = self.path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def update(self, order):
+        """Bring the index up to date with the files of the project.
+        @type  order: list
+        @param order: Names of the proze files in compile order.
+        @rtype:  list
+        @return: Names of the files that were scanned again.
+        """
+        scanned = []
+        files = {}
+        for filename in order:
+            digest = self.hashes.get(filename)
+            if digest is None:
+                continue
+            entry = self.files.get(filename)
+            if entry is None or entry['hash'] != digest:
+                path = os.path.join(self.root, filename)
+                with open(path, 'r') as proze_file:
+                    entry = scan(proze_file)
+                entry['hash'] = digest
+                scanned.append(filename)
+            files[filename] = entry
+        for filename in list(self.hashes.records):
+            if filename not in files:
+                del self.hashes.records[filename]
+        self.files = files
+        self.order = [filename for filename in order if filename in files]
+        self.chapter_lines = [
+            [line_number for line_number, _ in files[filename]['chapters']]
+            for filename in self.order
+        ]
+        return scanned
@@ -1,10 +1,14 @@
 """Parse prose config file."""
 from dotmap import DotMap
+from lib.options import freeze
 import glob
 import json
 import os
 import yaml
 
+# Names of the files a project config is read from, in order of precedence.
+CONFIG_FILENAMES = ['config.json', 'config.yml', 'config.yaml']
+
 
 def _default(args):
     """Get data struct containing default options.
@@ -18,7 +22,8 @@ def _default(args):
     options.names.places = []
     options.names.things = []
     options.names.invalid = []
-    options.compile.order = _find_proze_files(args)
+    options.compile.lineLength = 80
+    options.compile.order = find_proze_files(args)
     options.compile.paragraph.mode = 'prose'
     options.compile.paragraph.removeBlankLines = True
     options.compile.paragraph.tabFirst.chapter = False
@@ -28,29 +33,28 @@ def _default(args):
     return options
 
 
-def _find_config_path(args):
+def find_config_path(args):
     """Find the path to the proze config file.
     @type  args: object
     @param args: Command line arguments.
     @rtype:  str
     @return: Path to config file if found. None otherwise.
     """
-    filenames = ['config.json', 'config.yml', 'config.yaml']
     if args.path:
-        for name in filenames:
+        for name in CONFIG_FILENAMES:
             path = args.path + '/' + name
             if os.path.isfile(path):
                 return path
     else:
         cwd = os.getcwd()
-        for name in filenames:
+        for name in CONFIG_FILENAMES:
             path = cwd + '/' + name
             if os.path.isfile(path):
                 return path
     return None
 
 
-def _find_proze_files(args):
+def find_proze_files(args):
     """Find proze files and build a default compile order.
     @type  args: object
     @param args: Command line arguments.
@@ -71,17 +75,17 @@ def load(args):
     """Load proze configuration file.
     @type  args: object
     @param args: Command line arguments.
-    @rtype:  DotMap
-    @return: Options parsed from the project config file. Default options
-        if no config file is found.
+    @rtype:  lib.options.Options
+    @return: Frozen options parsed from the project config file. Default
+        options if no config file is found.
     """
     options = _default(args)
-    path = _find_config_path(args)
+    path = find_config_path(args)
     if not path:
         print('No config file found for project. Using default settings.')
     else:
         _parse_config(path, options)
-    return options
+    return freeze(options)
 
 
 def _parse_config(path, options):
@@ -112,6 +116,7 @@ def _parse_compile_options(parsed, options):
     @param options: Data structure where options are stored.
     """
     _parse_compile_order(parsed, options)
+    _parse_line_length(parsed, options)
     _parse_paragraph_options(parsed, options)
     _parse_spacing(parsed, options)
 
@@ -130,6 +135,20 @@ def _parse_compile_order(parsed, options):
             options.compile.order = order
 
 
+def _parse_line_length(parsed, options):
+    """Parse the maximum number of characters per line of text output.
+    @type  parsed: object
+    @param parsed: Data loaded from the config file.
+    @type  options: DotMap
+    @param options: Data structure where options are stored.
+    """
+    compiler = parsed.get('compile')
+    if compiler:
+        length = compiler.get('lineLength')
+        if type(length) is int and length > 0:
+            options.compile.lineLength = length
+
+
 def _parse_names(parsed, options):
     """Parse names from the config file data.
     @type  parsed: object
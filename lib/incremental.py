@@ -0,0 +1,154 @@
+"""Parse a proze file again after an edit without starting from the top."""
+from lib.blocks import Blocks
+from lib.state import State
+import bisect
+
+# Number of lines between saved parsing states.
+CHECKPOINT_INTERVAL = 64
+
+
+def visible_text(line, state):
+    """Default output of a line: the text left after comments and brackets
+    are removed.
+    @type  line: str
+    @param line: Proze line with comments and brackets removed.
+    @type  state: lib.state.State
+    @param state: Formatting state of the line.
+    @rtype:  str
+    @return: Output of the line.
+    """
+    return line
+
+
+class IncrementalParser(object):
+
+    """Keep the output of every line of a proze file up to date while it's
+    edited.
+
+    The Blocks and State values are saved every few lines. After an edit,
+    parsing resumes from the last checkpoint before the edit, and stops at
+    the first checkpoint after the edit where the parsing state matches
+    the state recorded before the edit. From there on, every line gives the
+    same output as before, so the old output is reused.
+
+    The render function is called with each line after comments and
+    brackets are removed, and the State after the line. Its output must
+    only depend on those two values.
+    """
+
+    def __init__(self, render=visible_text, interval=CHECKPOINT_INTERVAL):
+        """Constructor.
+        @type  render: function
+        @param render: Function that gives the output of a line.
+        @type  interval: int
+        @param interval: Number of lines between checkpoints.
+        """
+        self.blocks = Blocks()
+        self.interval = interval
+        self.render = render
+        self.state = State()
+        self.load([])
+
+    def edit(self, start, end, lines):
+        """Replace lines of the file and update the output.
+        @type  start: int
+        @param start: Index of the first line replaced.
+        @type  end: int
+        @param end: Index after the last line replaced. Same as start to
+            insert lines.
+        @type  lines: list
+        @param lines: New lines, each ending with a line break.
+        @rtype:  tuple(int, int)
+        @return: Range of the line indexes that were parsed again.
+        """
+        delta = len(lines) - (end - start)
+        self.lines[start:end] = lines
+        index = bisect.bisect_right(self.positions, start) - 1
+        # Checkpoints after the edit move along with their lines.
+        later = [
+            (position + delta, snapshot)
+            for position, snapshot in zip(
+                self.positions[index + 1:], self.checkpoints[index + 1:]
+            )
+            if position >= end
+        ]
+        resume = self.positions[index]
+        snapshot = self.checkpoints[index]
+        del self.positions[index + 1:]
+        del self.checkpoints[index + 1:]
+        self.blocks.restore(snapshot[0])
+        self.state.restore(snapshot[1])
+        stop = self._parse(resume, start + len(lines), later, delta)
+        return resume, stop
+
+    def load(self, lines):
+        """Parse a whole file.
+        @type  lines: list
+        @param lines: Lines of the file, each ending with a line break.
+        """
+        self.blocks.reset()
+        self.state.reset()
+        self.checkpoints = [[self.blocks.snapshot(), self.state.snapshot()]]
+        self.lines = list(lines)
+        self.output = []
+        self.positions = [0]
+        self._parse(0, 0, [], 0)
+
+    def _parse(self, position, edit_end, later, delta):
+        """Parse lines from a position until the state matches a checkpoint
+        recorded before the edit.
+        @type  position: int
+        @param position: Index of the first line to parse. Blocks and State
+            must hold the values from before this line, and it must be the
+            position of the last checkpoint.
+        @type  edit_end: int
+        @param edit_end: Index after the last edited line.
+        @type  later: list
+        @param later: Checkpoints recorded after the edit, with positions
+            already moved by delta.
+        @type  delta: int
+        @param delta: Change in the number of lines from the edit.
+        @rtype:  int
+        @return: Index after the last line parsed.
+        """
+        blocks = self.blocks
+        state = self.state
+        old_output = self.output
+        output = old_output[:position]
+        next_later = 0
+        last_checkpoint = position
+        count = len(self.lines)
+        while position < count:
+            while next_later < len(later) and \
+                    later[next_later][0] < max(position, edit_end):
+                next_later = next_later + 1
+            snapshot = None
+            if next_later < len(later) and later[next_later][0] == position:
+                snapshot = [blocks.snapshot(), state.snapshot()]
+                if snapshot == later[next_later][1]:
+                    # The rest of the file parses the same as before.
+                    output.extend(old_output[position - delta:])
+                    for moved, saved in later[next_later:]:
+                        self.positions.append(moved)
+                        self.checkpoints.append(saved)
+                    break
+            if position - last_checkpoint >= self.interval:
+                last_checkpoint = position
+                self.positions.append(position)
+                self.checkpoints.append(
+                    snapshot or [blocks.snapshot(), state.snapshot()]
+                )
+            raw_line = self.lines[position]
+            line = blocks.remove(raw_line)
+            state.update(raw_line)
+            output.append(self.render(line, state))
+            position = position + 1
+        self.output = output
+        return position
+
+    def text(self):
+        """Get the output of the whole file.
+        @rtype:  str
+        @return: Output of every line joined together.
+        """
+        return ''.join(self.output)
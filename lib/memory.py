@@ -0,0 +1,119 @@
+"""Report the peak memory of a compile and where the memory was allocated."""
+from lib.profiler import Profiler
+import os
+import tracemalloc
+
+# A snapshot of the allocation sites is taken when the memory in use grows by
+# this factor over the largest snapshot so far, so only a few are taken.
+GROWTH = 1.1
+
+
+class MemoryReport(Profiler):
+
+    """Trace the memory allocated by the stages of a compile.
+
+    Used in a 'with' clause like a Profiler. The peak is measured by
+    tracemalloc over the whole compile. The allocation sites are taken from
+    the snapshot with the most memory in use, which is checked after every
+    call of a stage, so memory that only lives inside a call counts towards
+    the peak but isn't listed by site. Only this process is traced.
+    """
+
+    def __init__(self, targets, openers=None, output=None, top=10,
+                 growth=GROWTH):
+        """Constructor.
+        @type  targets: list
+        @param targets: Tuples of the object that owns a callable, the
+            attribute name of the callable, and a label for the stage.
+        @type  openers: list
+        @param openers: Tuples of the owner and attribute name of each
+            function or method that opens proze files. They're called with
+            the path of the file.
+        @type  output: list
+        @param output: Modules whose calls to open() for writing create
+            output files.
+        @type  top: int
+        @param top: Number of allocation sites in the report.
+        @type  growth: float
+        @param growth: Factor the memory in use grows by before another
+            snapshot is taken.
+        """
+        super().__init__(targets, openers, output)
+        self.current = 0
+        self.growth = growth
+        self.peak = 0
+        self.snapshot = None
+        self.top = top
+        self.was_tracing = False
+
+    def __enter__(self):
+        """Swap in the instrumented callables and start tracing
+        allocations.
+        """
+        super().__enter__()
+        self.was_tracing = tracemalloc.is_tracing()
+        if not self.was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.current = 0
+        self.snapshot = None
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Put the original callables back and stop tracing."""
+        super().__exit__(exc_type, exc_value, traceback)
+        self._checkpoint()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        if not self.was_tracing:
+            tracemalloc.stop()
+
+    def _checkpoint(self):
+        """Take a snapshot if the memory in use has grown enough."""
+        current = tracemalloc.get_traced_memory()[0]
+        if self.snapshot is None or current > self.current * self.growth:
+            self.current = current
+            self.snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, __file__),
+            ])
+
+    def _recorder(self, label):
+        """Get a function that checks the memory after a call of a stage.
+        @type  label: str
+        @param label: Name of the stage.
+        @rtype:  function
+        @return: Function called with the start and end times of a call.
+        """
+        count = super()._recorder(label)
+
+        def record(start, end):
+            count(start, end)
+            self._checkpoint()
+
+        return record
+
+    def report(self):
+        """Format the peak memory and the top allocation sites for display.
+        @rtype:  list
+        @return: Lines of text.
+        """
+        lines = [
+            'Memory ({:.2f} MB peak, {:.2f} MB in largest snapshot):'.format(
+                self.peak / 1e6, self.current / 1e6
+            ),
+            '  {:<46}{:>10}{:>12}'.format('site', 'blocks', 'KB'),
+        ]
+        if self.snapshot is None:
+            return lines
+        for stat in self.snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            filename = os.path.relpath(frame.filename)
+            if filename.startswith(os.pardir):
+                folder, name = os.path.split(frame.filename)
+                filename = os.path.join(os.path.basename(folder), name)
+            site = '{}:{}'.format(filename, frame.lineno)
+            lines.append('  {:<46}{:>10}{:>12.1f}'.format(
+                site[-46:], stat.count, stat.size / 1000
+            ))
+        return lines
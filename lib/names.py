@@ -1,21 +1,117 @@
+from collections import Counter
+from lib.automaton import Automaton
 import re
+import string
+
+# Characters that make up a word. A name only matches where it isn't
+# part of a larger word.
+word_characters = frozenset(string.ascii_letters + string.digits + '_-')
+words = re.compile('[0-9a-zA-Z_-]+')
+
+
+class NameMatcher(object):
+
+    """Find a fixed set of names on lines of proze.
+
+    Matching is case insensitive and a name only matches where it isn't part
+    of a larger word. Names that are a single word are matched against the
+    words of the line with a hash set. The rest are found with an automaton,
+    which only runs when the first word of one of them is on the line.
+    """
+
+    def __init__(self, names):
+        """Constructor.
+        @type  names: iterable
+        @param names: Names to search for.
+        """
+        self.single = set()
+        multiple = []
+        self.first_words = set()
+        self.always_search = False
+        for name in names:
+            key = name.lower()
+            if words.fullmatch(key):
+                self.single.add(key)
+            elif key:
+                multiple.append(key)
+                first = words.match(key)
+                if first:
+                    self.first_words.add(first.group())
+                else:
+                    self.always_search = True
+        self.automaton = Automaton(multiple) if multiple else None
+
+    def _needs_search(self, tokens):
+        """Check if the automaton needs to run for a line.
+        @type  tokens: iterable
+        @param tokens: Lowercase words on the line.
+        @rtype:  bool
+        @return: True if a name with several words may be on the line.
+        """
+        if self.automaton is None:
+            return False
+        return self.always_search or not self.first_words.isdisjoint(tokens)
+
+    def _search(self, line):
+        """Search for names made of several words.
+        @type  line: str
+        @param line: Lowercase proze line.
+        @rtype:  generator
+        @return: Lowercase key of each name found on the line.
+        """
+        for start, key in self.automaton.search(line):
+            end = start + len(key)
+            if start and line[start - 1] in word_characters:
+                continue
+            if end < len(line) and line[end] in word_characters:
+                continue
+            yield key
+
+    def count(self, line):
+        """Count occurrences of each name on the line.
+        @type  line: str
+        @param line: Proze line.
+        @rtype:  collections.Counter
+        @return: Number of matches by lowercase name.
+        """
+        line = line.lower()
+        tokens = words.findall(line)
+        counts = Counter(token for token in tokens if token in self.single)
+        if self._needs_search(tokens):
+            counts.update(self._search(line))
+        return counts
+
+    def find(self, line):
+        """Find the names on the line.
+        @type  line: str
+        @param line: Proze line.
+        @rtype:  set
+        @return: Lowercase names found on the line.
+        """
+        line = line.lower()
+        tokens = set(words.findall(line))
+        found = self.single.intersection(tokens)
+        if self._needs_search(tokens):
+            found.update(self._search(line))
+        return found
 
 
 class Names(object):
 
     """Work with character names in proze documents."""
 
-    # Include negative lookahead/lookbehind to prevent matching
-    # against invalid name patterns that are part of a larger word.
-    invalid_base = '(?<![0-9a-zA-Z_-]){}(?![0-9a-zA-Z_-])'
-
     def __init__(self, options):
         """Constructor.
-        @type  options: DotMap
+        @type  options: lib.options.Options
         @param options: Config options that contain character names.
         """
         self.options = options
-        self.invalid_patterns = {}  # Cache compiled invalid name regexs
+        # Invalid names paired with their lowercase keys, in config order.
+        self.invalid = [
+            (invalid, invalid.lower())
+            for invalid in options.names.invalid or []
+        ]
+        self.invalid_matcher = NameMatcher(options.names.invalid or [])
 
     def find_invalid(self, line):
         """Find all invalid character names on the line.
@@ -24,15 +120,9 @@ class Names(object):
         @rtype:  list
         @return: List of all invalid character names found on the line.
         """
-        found = []
-        line = line.lower()
-        if self.options.names.invalid:
-            for invalid in self.options.names.invalid:
-                key = invalid.lower()
-                pattern = self.invalid_patterns.get(key)
-                if pattern is None:
-                    pattern = re.compile(self.invalid_base.format(key))
-                    self.invalid_patterns[key] = pattern
-                if pattern.search(line) is not None:
-                    found.append(invalid)
-        return found
+        if not self.invalid:
+            return []
+        found = self.invalid_matcher.find(line)
+        if not found:
+            return []
+        return [invalid for invalid, key in self.invalid if key in found]
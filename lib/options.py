@@ -0,0 +1,55 @@
+"""Frozen compile options.
+
+Options are parsed into a DotMap, then converted to these immutable
+records. Reading an attribute from a record is a plain slot lookup, which
+keeps per-line reads in hot paths cheap.
+"""
+from collections import namedtuple
+
+TabFirstOptions = namedtuple(
+    'TabFirstOptions', ['chapter', 'section', 'title']
+)
+ParagraphOptions = namedtuple(
+    'ParagraphOptions', ['mode', 'removeBlankLines', 'tabFirst']
+)
+CompileOptions = namedtuple(
+    'CompileOptions', ['lineLength', 'order', 'paragraph', 'spacing']
+)
+NameOptions = namedtuple(
+    'NameOptions', ['characters', 'invalid', 'places', 'things']
+)
+Options = namedtuple('Options', ['compile', 'names'])
+
+
+def freeze(options):
+    """Resolve parsed options into frozen records.
+    @type  options: DotMap
+    @param options: Options parsed from the config file.
+    @rtype:  Options
+    @return: Frozen options.
+    """
+    compiler = options.compile
+    paragraph = compiler.paragraph
+    names = options.names
+    return Options(
+        compile=CompileOptions(
+            lineLength=compiler.lineLength,
+            order=list(compiler.order),
+            paragraph=ParagraphOptions(
+                mode=paragraph.mode,
+                removeBlankLines=paragraph.removeBlankLines,
+                tabFirst=TabFirstOptions(
+                    chapter=paragraph.tabFirst.chapter,
+                    section=paragraph.tabFirst.section,
+                    title=paragraph.tabFirst.title,
+                ),
+            ),
+            spacing=compiler.spacing,
+        ),
+        names=NameOptions(
+            characters=list(names.characters),
+            invalid=list(names.invalid),
+            places=list(names.places),
+            things=list(names.things),
+        ),
+    )
@@ -0,0 +1,73 @@
+"""Extract the structural markup of a proze project."""
+from collections import namedtuple
+from lib.blocks import Blocks
+from lib.state import MarkupState, PreviousLine
+from lib.structural_token import MarkupToken
+import re
+
+# First characters of markup tokens, in either case.
+first_characters = frozenset(
+    character
+    for token in [
+        MarkupToken.author,
+        MarkupToken.chapter,
+        MarkupToken.section,
+        MarkupToken.section_break,
+        MarkupToken.title,
+    ]
+    for character in [token[0], token[0].upper()]
+)
+
+# Line of structural markup in the outline of a project.
+Heading = namedtuple('Heading', ['filename', 'line_number', 'token', 'text'])
+
+
+def outline(filename, proze_file):
+    """Find the structural markup lines of a proze file.
+    Markup is detected with the same rules as compiling, but lines aren't
+    formatted, checked for names or written. Only lines that follow a blank
+    line or another line of markup, and start with a character that a token
+    or whitespace can start with, are lowercased and checked for tokens.
+    Other lines are only passed to Blocks when they could start or end a
+    multi-line block.
+
+    @type  filename: str
+    @param filename: Name of the file relative to the project root.
+    @type  proze_file: file
+    @param proze_file: Open proze file.
+    @rtype:  generator
+    @return: Heading of each line of markup that isn't hidden by comments
+        or brackets.
+    """
+    blocks = Blocks()
+    markup = MarkupState()
+    previous_line = PreviousLine()
+    remove = blocks.remove
+    # Markup can only start after a blank line or a line of markup.
+    can_start = True
+    is_blank = True
+    for line_number, raw_line in enumerate(proze_file, 1):
+        line = None
+        if blocks.in_comment_block or blocks.in_bracket_block or \
+                '[' in raw_line or '###' in raw_line:
+            line = remove(raw_line)
+        first = raw_line[:1]
+        if not can_start or \
+                first not in first_characters and not first.isspace():
+            is_blank = not raw_line.strip()
+            can_start = is_blank
+            continue
+        if line is None:
+            # A line comment doesn't carry over to the next line, so it only
+            # needs to be removed from lines that could be markup.
+            line = remove(raw_line) if '#' in raw_line else raw_line
+        previous_line.update(is_blank, not is_blank)
+        is_blank = not raw_line.strip()
+        if is_blank:
+            continue
+        markup.check_markup(raw_line.lower(), previous_line)
+        can_start = markup.is_markup_line
+        if can_start and line:
+            text = line.strip()
+            text = re.sub(re.escape(markup.token), '', text, 1, re.I)
+            yield Heading(filename, line_number, markup.token, text.strip())
@@ -0,0 +1,396 @@
+"""Run the stages of a compile concurrently, connected by bounded queues.
+
+Proze files are opened ahead of the parser in threads, lines are formatted in
+a separate process, and output is written to disk in a thread of that
+process. Every stage blocks when the queue to the next one is full.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process, Queue
+import collections
+import io
+import lib.trace
+import queue
+import sys
+import threading
+
+# Number of lines sent to the formatting process at a time.
+BATCH_SIZE = 2048
+
+# Number of files read ahead of the parser, each in its own thread.
+PREFETCH_FILES = 8
+
+# Number of characters read ahead from the start of each file. The rest of
+# a file is read by the parser, so memory use doesn't grow with file size.
+PREFETCH_SIZE = 256 * 1024
+
+# Number of batches that can wait in the queue before the parser blocks.
+QUEUE_SIZE = 8
+
+# Seconds to wait on a full queue before checking that the stage at the
+# other end is still running.
+QUEUE_TIMEOUT = 0.5
+
+# Number of chunks of output that can wait to be written to disk.
+WRITE_QUEUE_SIZE = 16
+
+
+def format_batches(strategy, path, queue, errors):
+    """Format and write the batches from the queue until None is received.
+    If formatting fails, the error is sent back before the process exits.
+
+    @type  strategy: BaseStrategy
+    @param strategy: Strategy that formats the lines.
+    @type  path: str
+    @param path: Path of the output file to be generated.
+    @type  queue: multiprocessing.Queue
+    @param queue: Batches sent by the parser.
+    @type  errors: multiprocessing.Queue
+    @param errors: Exception that stopped formatting, if any.
+    """
+    try:
+        with BackgroundWriter(path) as stream:
+            with strategy.compile(stream) as compiler:
+                for batch in iter(queue.get, None):
+                    if batch[0] == 'lines':
+                        compiler.write_many(batch[1], batch[2])
+                    elif batch[0] == 'end_file':
+                        compiler.end_file()
+                    else:
+                        compiler.write_fragment(batch[1])
+    except Exception as error:
+        errors.put(error)
+        sys.exit(1)
+    lib.trace.save()
+
+
+def read_head(path, size=PREFETCH_SIZE):
+    """Open a text file and read the start of it.
+    @type  path: str
+    @param path: Path of the file.
+    @type  size: int
+    @param size: Number of characters to read.
+    @rtype:  tuple(file, str)
+    @return: The open file, and the text read from it.
+    """
+    text_file = open(path, 'r')
+    try:
+        return text_file, text_file.read(size)
+    except BaseException:
+        text_file.close()
+        raise
+
+
+class BackgroundWriter(object):
+
+    """Output stream that writes to a file in a background thread.
+
+    Writes only block when WRITE_QUEUE_SIZE chunks are already waiting.
+    """
+
+    def __init__(self, path, queue_size=WRITE_QUEUE_SIZE):
+        """Constructor.
+        @type  path: str
+        @param path: Path of the file to write.
+        @type  queue_size: int
+        @param queue_size: Number of chunks that can wait to be written.
+        """
+        self.error = None
+        self.handle = None
+        self.path = path
+        self.queue = queue.Queue(queue_size)
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+
+    def __enter__(self):
+        """Open the file and start the writer thread."""
+        self.handle = open(self.path, 'w')
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Wait for the queued chunks to be written and close the file."""
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=QUEUE_TIMEOUT)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        self.handle.close()
+        if self.error is not None and exc_type is None:
+            raise self.error
+
+    def _drain(self):
+        """Write queued chunks until None is received, or a write fails."""
+        try:
+            for text in iter(self.queue.get, None):
+                self.handle.write(text)
+        except Exception as error:
+            self.error = error
+
+    def write(self, text):
+        """Queue text to be written. Raises the error of an earlier write
+        that failed.
+        @type  text: str
+        @param text: Output text.
+        """
+        while self.error is None:
+            try:
+                self.queue.put(text, timeout=QUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+        raise self.error
+
+
+class PipelineCompiler(object):
+
+    """Compiler that sends parsed lines to another process to be formatted.
+
+    It is used in a 'with' clause in place of the compiler of a strategy.
+    The live State is turned into an immutable LineState record for each
+    line, and lines are sent in batches over a bounded queue, so parsing
+    blocks when formatting falls behind.
+    """
+
+    def __init__(self, strategy, path, batch_size=BATCH_SIZE,
+                 queue_size=QUEUE_SIZE):
+        """Constructor.
+        @type  strategy: BaseStrategy
+        @param strategy: Strategy that formats the lines.
+        @type  path: str
+        @param path: Path of the output file to be generated.
+        @type  batch_size: int
+        @param batch_size: Number of lines sent at a time.
+        @type  queue_size: int
+        @param queue_size: Number of batches that can wait in the queue.
+        """
+        self.batch_size = batch_size
+        self.errors = Queue()
+        self.lines = []
+        self.path = path
+        self.queue = Queue(queue_size)
+        self.states = []
+        self.strategy = strategy
+        self.worker = None
+
+    def __enter__(self):
+        """Start the formatting process."""
+        self.worker = Process(
+            target=format_batches,
+            args=(self.strategy, self.path, self.queue, self.errors),
+        )
+        self.worker.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Wait for the formatting process to write the rest of the output.
+        If parsing failed, the formatting process is stopped instead.
+        """
+        if exc_type is not None:
+            self.worker.terminate()
+            self.worker.join()
+            return
+        self._send()
+        self._put(None)
+        self.worker.join()
+        if self.worker.exitcode:
+            self._raise_error()
+
+    def end_file(self):
+        """Finish output of the current proze file."""
+        self._send()
+        self._put(('end_file',))
+
+    def flush(self):
+        """Send the lines collected so far."""
+        self._send()
+
+    def _put(self, item):
+        """Put an item in the queue to the formatting process, waiting while
+        the queue is full as long as the process is running.
+        @type  item: tuple
+        @param item: Batch to send, or None to finish.
+        """
+        while True:
+            try:
+                self.queue.put(item, timeout=QUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                if not self.worker.is_alive():
+                    self._raise_error()
+
+    def _raise_error(self):
+        """Raise the error that stopped the formatting process."""
+        try:
+            error = self.errors.get(timeout=QUEUE_TIMEOUT)
+        except queue.Empty:
+            error = RuntimeError(
+                'Formatting failed with exit code {}'.format(
+                    self.worker.exitcode
+                )
+            )
+        raise error
+
+    def _send(self):
+        """Send the collected lines as one batch."""
+        if self.lines:
+            self._put(('lines', self.lines, self.states))
+            self.lines = []
+            self.states = []
+
+    def write(self, line, state):
+        """Send a line to be written to the output document.
+        @type  line: str
+        @param line: Formatted line to be written to the document.
+        @type  state: lib.state.State
+        @param state: Formatting state of the current line of text.
+        """
+        self.write_many([line], [state])
+
+    def write_fragment(self, fragment):
+        """Send output already compiled by another compiler.
+        @type  fragment: str
+        @param fragment: Output of a compiler of the same strategy that
+            wrote to a stream.
+        """
+        self._send()
+        self._put(('fragment', fragment))
+
+    def write_many(self, lines, states):
+        """Send a batch of lines to be written to the output document.
+        @type  lines: iterable
+        @param lines: Formatted lines to be written to the document.
+        @type  states: iterable
+        @param states: Formatting state of each line of text.
+        """
+        batch_lines = self.lines
+        batch_states = self.states
+        batch_size = self.batch_size
+        for line, state in zip(lines, states):
+            batch_lines.append(line)
+            batch_states.append(state.line_state())
+            # Pieces of a long line are sent one at a time to bound memory.
+            if len(batch_lines) >= batch_size or state.is_continued:
+                self._send()
+                batch_lines = self.lines
+                batch_states = self.states
+
+
+class PrefetchedFile(object):
+
+    """Text file whose start was read ahead by a Prefetcher."""
+
+    def __init__(self, handle, head):
+        """Constructor.
+        @type  handle: file
+        @param handle: Open text file, positioned after the head.
+        @type  head: str
+        @param head: Text read from the start of the file.
+        """
+        self.handle = handle
+        self.head = io.StringIO(head)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the file."""
+        self.head = None
+        self.handle.close()
+
+    @property
+    def closed(self):
+        """True if the file is closed."""
+        return self.handle.closed
+
+    def readline(self, size=-1):
+        """Read the next line.
+        @type  size: int
+        @param size: Most characters to read.
+        @rtype:  str
+        @return: Line of text, or a part of it if the size is reached.
+        """
+        if self.head is None:
+            return self.handle.readline(size)
+        line = self.head.readline(size)
+        if line.endswith('\n') or len(line) == size:
+            return line
+        self.head = None
+        if size >= 0:
+            size = size - len(line)
+        return line + self.handle.readline(size)
+
+
+class Prefetcher(object):
+
+    """Open proze files in background threads ahead of the parser.
+
+    Up to PREFETCH_FILES files are opened at the same time while earlier
+    ones are parsed, and the first PREFETCH_SIZE characters of each are read
+    and decoded, which hides the latency of opening files on slow or network
+    mounted disks. No more files are opened until the parser opens the next
+    one.
+    """
+
+    def __init__(self, paths, depth=PREFETCH_FILES, size=PREFETCH_SIZE):
+        """Constructor.
+        @type  paths: list
+        @param paths: Paths of the files in the order they are opened.
+        @type  depth: int
+        @param depth: Number of files read ahead.
+        @type  size: int
+        @param size: Number of characters read ahead from each file.
+        """
+        self.depth = depth
+        self.executor = None
+        self.pending = collections.deque()
+        self.paths = iter(paths)
+        self.size = size
+
+    def __enter__(self):
+        """Start reading files."""
+        self.executor = ThreadPoolExecutor(self.depth)
+        for _ in range(self.depth):
+            self._submit()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop reading files, and close the ones that were read ahead."""
+        for _, future in self.pending:
+            future.cancel()
+        self.executor.shutdown()
+        for _, future in self.pending:
+            if not future.cancelled() and future.exception() is None:
+                future.result()[0].close()
+        self.pending.clear()
+
+    def open(self, path, segment=None):
+        """Open the next file as text.
+        @type  path: str
+        @param path: Path of the file. Must be the next one in the order.
+        @type  segment: lib.chapters.Segment
+        @param segment: Not supported. Must be None.
+        @rtype:  PrefetchedFile
+        @return: Text stream of the file.
+        """
+        if segment is not None:
+            raise ValueError('Segments are not prefetched.')
+        found, future = self.pending.popleft()
+        if found != path:
+            raise ValueError(
+                'Expected {} to be opened but got {}.'.format(found, path)
+            )
+        self._submit()
+        handle, head = future.result()
+        return PrefetchedFile(handle, head)
+
+    def _submit(self):
+        """Start reading the next file, if there is one."""
+        path = next(self.paths, None)
+        if path is not None:
+            self.pending.append((
+                path, self.executor.submit(read_head, path, self.size)
+            ))
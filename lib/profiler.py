@@ -0,0 +1,315 @@
+"""Time the stages of a compile by swapping in instrumented callables."""
+from time import perf_counter
+import functools
+import os
+import threading
+
+
+class ProfiledFile(object):
+
+    """Text file that times and counts the lines read from it."""
+
+    def __init__(self, handle, record, stats, on_close):
+        """Constructor.
+        @type  handle: file
+        @param handle: Open text file.
+        @type  record: function
+        @param record: Records a read given its start and end times.
+        @type  stats: dict
+        @param stats: Lines of the file, updated in place.
+        @type  on_close: function
+        @param on_close: Called once when the file is closed.
+        """
+        self.handle = handle
+        self.on_close = on_close
+        self.record = record
+        self.stats = stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the file."""
+        if not self.handle.closed:
+            self.handle.close()
+            self.on_close()
+
+    def readline(self, size=-1):
+        """Read the next line.
+        @type  size: int
+        @param size: Most characters to read.
+        @rtype:  str
+        @return: Line of text, or a part of it if the size is reached.
+        """
+        start = perf_counter()
+        try:
+            line = self.handle.readline(size)
+        finally:
+            self.record(start, perf_counter())
+        if line:
+            self.stats['lines'] = self.stats['lines'] + 1
+        return line
+
+
+class ProfiledOutput(object):
+
+    """Output stream that times the writes to it."""
+
+    def __init__(self, handle, record):
+        """Constructor.
+        @type  handle: file
+        @param handle: Open output stream.
+        @type  record: function
+        @param record: Records a write given its start and end times.
+        """
+        self.handle = handle
+        self.record = record
+
+    def close(self):
+        """Close the output stream."""
+        self.handle.close()
+
+    def write(self, text):
+        """Write text to the output stream.
+        @type  text: str
+        @param text: Output text.
+        """
+        start = perf_counter()
+        try:
+            return self.handle.write(text)
+        finally:
+            self.record(start, perf_counter())
+
+
+class Profiler(object):
+
+    """Count the calls and time spent in the stages of a compile.
+
+    Used in a 'with' clause, it replaces each target attribute with a
+    wrapper that times the call, and puts the originals back on exit. Code
+    runs at full speed when no Profiler is active. Only calls made in this
+    process are counted, from any of its threads.
+    """
+
+    def __init__(self, targets, openers=None, output=None):
+        """Constructor.
+        @type  targets: list
+        @param targets: Tuples of the object that owns a callable, the
+            attribute name of the callable, and a label for the report.
+        @type  openers: list
+        @param openers: Tuples of the owner and attribute name of each
+            function or method that opens proze files. They're called with
+            the path of the file.
+        @type  output: list
+        @param output: Modules whose calls to open() for writing create
+            output files.
+        """
+        self.counters = {}
+        self.files = {}
+        self.lock = threading.Lock()
+        self.openers = openers or []
+        self.output = output or []
+        self.patched = []
+        self.started = None
+        self.targets = targets
+        self.wall = 0
+
+    def __enter__(self):
+        """Swap in the instrumented callables."""
+        for owner, attribute, label in self.targets:
+            self._patch(owner, attribute, self._timed(
+                getattr(owner, attribute), label
+            ))
+        for owner, attribute in self.openers:
+            self._patch(owner, attribute, self._profiled_opener(
+                getattr(owner, attribute), isinstance(owner, type)
+            ))
+        for module in self.output:
+            self._patch(module, 'open', self._profiled_output(open))
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Put the original callables back."""
+        self.wall = perf_counter() - self.started
+        for owner, attribute, original in reversed(self.patched):
+            if original is None:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+        self.patched = []
+
+    def _close_file(self, path, stats):
+        """Record how long a proze file was open.
+        @type  path: str
+        @param path: Path of the file.
+        @type  stats: dict
+        @param stats: Lines, bytes and timings of the file.
+        """
+        stats['seconds'] = perf_counter() - stats['opened']
+
+    def _counter(self, label):
+        """Get the counter of a stage.
+        @type  label: str
+        @param label: Name of the stage in the report.
+        @rtype:  list
+        @return: Calls and seconds, updated in place.
+        """
+        return self.counters.setdefault(label, [0, 0.0])
+
+    def _open_file(self, path, start):
+        """Start the stats of a proze file.
+        @type  path: str
+        @param path: Path of the file.
+        @type  start: float
+        @param start: Time the file started to open.
+        @rtype:  dict
+        @return: Lines, bytes and timings of the file, updated in place.
+        """
+        stats = {
+            'bytes': os.path.getsize(path),
+            'lines': 0,
+            'opened': start,
+            'seconds': 0.0,
+        }
+        self.files[path] = stats
+        return stats
+
+    def _patch(self, owner, attribute, replacement):
+        """Replace an attribute, remembering the original.
+        @type  owner: object
+        @param owner: Class, module or object that owns the attribute.
+        @type  attribute: str
+        @param attribute: Name of the attribute.
+        @type  replacement: function
+        @param replacement: New value of the attribute.
+        """
+        original = owner.__dict__.get(attribute)
+        self.patched.append((owner, attribute, original))
+        setattr(owner, attribute, replacement)
+
+    def _profiled_opener(self, opener, method=False):
+        """Wrap a function that opens proze files.
+        @type  opener: function
+        @param opener: Function to wrap.
+        @type  method: bool
+        @param method: Whether the function is a method, so the path is
+            the second argument.
+        @rtype:  function
+        @return: Function that times opening the file, and returns a file
+            that times reading it.
+        """
+        record_open = self._recorder('file open')
+        record_read = self._recorder('file read')
+
+        @functools.wraps(opener)
+        def profiled(*args, **kwargs):
+            path = args[1] if method else args[0]
+            start = perf_counter()
+            try:
+                handle = opener(*args, **kwargs)
+            finally:
+                record_open(start, perf_counter())
+            stats = self._open_file(path, start)
+            return ProfiledFile(
+                handle,
+                record_read,
+                stats,
+                functools.partial(self._close_file, path, stats),
+            )
+
+        return profiled
+
+    def _profiled_output(self, opener):
+        """Wrap the function that opens output files.
+        @type  opener: function
+        @param opener: Function to wrap.
+        @rtype:  function
+        @return: Function that returns a stream that times writes when a
+            file is opened for writing.
+        """
+        record = self._recorder('output write')
+
+        @functools.wraps(opener)
+        def profiled(file, mode='r', *args, **kwargs):
+            handle = opener(file, mode, *args, **kwargs)
+            if 'w' in mode or 'a' in mode:
+                return ProfiledOutput(handle, record)
+            return handle
+
+        return profiled
+
+    def _recorder(self, label):
+        """Get a function that records a call of a stage.
+        @type  label: str
+        @param label: Name of the stage in the report.
+        @rtype:  function
+        @return: Function called with the start and end times of a call.
+        """
+        counter = self._counter(label)
+        lock = self.lock
+
+        def record(start, end):
+            with lock:
+                counter[0] = counter[0] + 1
+                counter[1] = counter[1] + end - start
+
+        return record
+
+    def report(self):
+        """Format the timings for display.
+        @rtype:  list
+        @return: Lines of text.
+        """
+        lines = [
+            'Profile ({:.1f} ms wall time):'.format(self.wall * 1000),
+            '  {:<46}{:>10}{:>12}{:>10}{:>8}'.format(
+                'stage', 'calls', 'total ms', 'us/call', 'wall'
+            ),
+        ]
+        for label, (calls, seconds) in self.counters.items():
+            lines.append('  {:<46}{:>10}{:>12.1f}{:>10.2f}{:>8.1%}'.format(
+                label,
+                calls,
+                seconds * 1000,
+                seconds / calls * 1e6 if calls else 0,
+                seconds / self.wall if self.wall else 0,
+            ))
+        if self.files:
+            lines.append('  {:<46}{:>10}{:>12}{:>10}{:>8}'.format(
+                'file', 'lines', 'bytes', 'lines/s', 'MB/s'
+            ))
+        for path, stats in self.files.items():
+            seconds = stats['seconds'] or 1e-9
+            lines.append('  {:<46}{:>10}{:>12}{:>10.0f}{:>8.2f}'.format(
+                os.path.basename(path),
+                stats['lines'],
+                stats['bytes'],
+                stats['lines'] / seconds,
+                stats['bytes'] / seconds / 1e6,
+            ))
+        return lines
+
+    def _timed(self, function, label):
+        """Wrap a callable so its calls are counted and timed.
+        @type  function: function
+        @param function: Callable to wrap.
+        @type  label: str
+        @param label: Name of the stage in the report.
+        @rtype:  function
+        @return: Instrumented callable.
+        """
+        record = self._recorder(label)
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(start, perf_counter())
+
+        return timed
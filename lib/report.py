@@ -0,0 +1,176 @@
+"""Reports about the contents of a proze project."""
+from collections import Counter
+from lib.blocks import Blocks
+from lib.names import NameMatcher, words
+from lib.spelling import BKTree
+from lib.state import State
+from lib.structural_token import MarkupToken
+
+# Shortest word checked for near-miss spellings of a name.
+MIN_NEAR_MISS_LENGTH = 4
+
+# Characters that end a sentence, and that may come before its first word.
+SENTENCE_ENDS = '.!?'
+SENTENCE_OPENERS = ' \t"\'(*_\u201c\u2018'
+
+
+def chapter_title(line):
+    """Get the title from a line of chapter markup.
+    @type  line: str
+    @param line: Line that starts with the chapter token.
+    @rtype:  str
+    @return: Title of the chapter.
+    """
+    return line.strip()[len(MarkupToken.chapter):].strip()
+
+
+def is_sentence_start(line, start):
+    """Check if a word is the first word of a sentence.
+    @type  line: str
+    @param line: Line of proze, which starts a paragraph.
+    @type  start: int
+    @param start: Index of the first character of the word.
+    @rtype:  bool
+    @return: True if the word starts the line or follows the end of a
+        sentence.
+    """
+    before = line[:start].rstrip(SENTENCE_OPENERS)
+    return not before or before[-1] in SENTENCE_ENDS
+
+
+class NameReport(object):
+
+    """Count configured names per file and chapter, and flag near misses.
+
+    Every file is read once. Comments and bracket blocks are skipped, the
+    same as when compiling. Names in structural markup, such as a chapter
+    title, are counted too. A capitalized word that isn't a configured name
+    but is within a small edit distance of one is reported as a possible
+    misspelling. Words that start a sentence and words in structural
+    markup are capitalized anyway, so they aren't checked.
+
+    :ivar list categories: Tuples of category and names in config order.
+    :ivar dict counts: Counter of lowercase names by (file, chapter
+        number, chapter title), in the order they were found. Chapter
+        number 0 is the text before the first chapter of a file.
+    :ivar list near_misses: Tuples of file, line number, word found and
+        the names it is close to.
+    """
+
+    def __init__(self, options):
+        """Constructor.
+        @type  options: lib.options.Options
+        @param options: Config options that contain the names.
+        """
+        self.categories = [
+            ('characters', list(options.names.characters or [])),
+            ('places', list(options.names.places or [])),
+            ('things', list(options.names.things or [])),
+        ]
+        names = [name for _, group in self.categories for name in group]
+        self.matcher = NameMatcher(names)
+        self.known_words = set()
+        self.spellings = {}  # Original spelling of each lowercase name word.
+        for name in names:
+            for word in words.findall(name):
+                self.known_words.add(word.lower())
+                self.spellings.setdefault(word.lower(), word)
+        self.index = BKTree(self.known_words)
+        self.suggestions = {}  # Cache near-miss lookups by word.
+        self.counts = {}
+        self.near_misses = []
+
+    def _near_miss(self, word):
+        """Find configured name words close to a word.
+        @type  word: str
+        @param word: Lowercase word from the proze text.
+        @rtype:  list
+        @return: Original spellings of the close names.
+        """
+        found = self.suggestions.get(word)
+        if found is None:
+            tolerance = 1 if len(word) < 6 else 2
+            found = [
+                self.spellings[match]
+                for gap, match in self.index.search(word, tolerance)
+                if gap
+            ]
+            self.suggestions[word] = found
+        return found
+
+    def format(self):
+        """Format the report for display.
+        @rtype:  list
+        @return: Lines of text.
+        """
+        lines = ['Names by file and chapter:']
+        category_of = {}
+        for category, group in self.categories:
+            for name in group:
+                category_of.setdefault(name.lower(), (name, category))
+        totals = Counter()
+        for (filename, _, chapter), counts in self.counts.items():
+            if not counts:
+                continue
+            heading = '  ' + filename
+            if chapter:
+                heading = heading + ' [{}]'.format(chapter)
+            lines.append(heading)
+            for key, count in sorted(counts.items()):
+                name, category = category_of[key]
+                lines.append('    {} ({}): {}'.format(name, category, count))
+            totals.update(counts)
+        lines.append('Totals:')
+        for category, group in self.categories:
+            for name in group:
+                lines.append('  {} ({}): {}'.format(
+                    name, category, totals[name.lower()]
+                ))
+        if self.near_misses:
+            lines.append('Possible misspellings:')
+            for filename, line_number, word, close in self.near_misses:
+                lines.append('  {}[{}]: "{}" is close to {}'.format(
+                    filename, line_number, word, ', '.join(close)
+                ))
+        return lines
+
+    def scan(self, filename, proze_file):
+        """Count names in a proze file.
+        @type  filename: str
+        @param filename: Name of the file relative to the project root.
+        @type  proze_file: file
+        @param proze_file: Open proze file.
+        """
+        blocks = Blocks()
+        state = State()
+        position = 0
+        counts = self.counts.setdefault((filename, position, ''), Counter())
+        for line_number, raw_line in enumerate(proze_file, 1):
+            line = blocks.remove(raw_line)
+            state.update(raw_line)
+            if not line:
+                continue
+            token = state.markup.token
+            if token == MarkupToken.chapter:
+                position = position + 1
+                counts = self.counts.setdefault(
+                    (filename, position, chapter_title(line)), Counter()
+                )
+            if token is not None:
+                counts.update(self.matcher.count(line.strip()[len(token):]))
+                continue
+            counts.update(self.matcher.count(line))
+            for match in words.finditer(line):
+                word = match.group()
+                if len(word) < MIN_NEAR_MISS_LENGTH or not word[0].isupper():
+                    continue
+                key = word.lower()
+                if key in self.known_words:
+                    continue
+                if is_sentence_start(line, match.start()):
+                    continue
+                close = self._near_miss(key)
+                if close:
+                    self.near_misses.append(
+                        (filename, line_number, word, close)
+                    )
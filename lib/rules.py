@@ -10,7 +10,7 @@ class Rules(object):
 
     def __init__(self, options):
         """Constructor.
-        @type  options: DotMap
+        @type  options: lib.options.Options
         @param options: Compile options parsed from the config file.
         """
         self.options = options
@@ -38,23 +38,18 @@ class Rules(object):
         """
         to_insert = ''
         add_tab = False
-        if self.options.compile.paragraph.mode == 'prose':
+        paragraph = self.options.compile.paragraph
+        if paragraph.mode == 'prose':
             add_tab = True
             if not state.previous_line.is_blank:
                 add_tab = False
             elif state.is_first_paragraph:
                 add_tab = False
-                if (
-                    state.markup.is_chapter and
-                    self.options.compile.paragraph.tabFirst.chapter
-                ):
+                if state.markup.is_chapter and paragraph.tabFirst.chapter:
                     add_tab = True
-                elif (
-                    state.markup.is_section and
-                    self.options.compile.paragraph.tabFirst.section
-                ):
+                elif state.markup.is_section and paragraph.tabFirst.section:
                     add_tab = True
-                elif self.options.compile.paragraph.tabFirst.title:
+                elif paragraph.tabFirst.title:
                     add_tab = True
         if add_tab:
             if use_spaces:
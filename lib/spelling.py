@@ -0,0 +1,91 @@
+"""Find words that are close to a known spelling."""
+
+
+def distance(first, second, limit):
+    """Levenshtein edit distance between two strings, bounded by a limit.
+    @type  first: str
+    @param first: A string.
+    @type  second: str
+    @param second: Another string.
+    @type  limit: int
+    @param limit: Largest distance of interest.
+    @rtype:  int
+    @return: Edit distance, or limit + 1 if it's larger than the limit.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class BKTree(object):
+
+    """Burkhard-Keller tree of words for near-miss spelling lookups.
+
+    Children are keyed by their edit distance to the parent, so a lookup
+    only visits subtrees whose distance could be within the tolerance.
+    """
+
+    def __init__(self, words=()):
+        """Constructor.
+        @type  words: iterable
+        @param words: Words to index.
+        """
+        self.root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        """Add a word to the tree.
+        @type  word: str
+        @param word: Word to index.
+        """
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            gap = distance(word, node[0], len(word) + len(node[0]))
+            if gap == 0:
+                return
+            child = node[1].get(gap)
+            if child is None:
+                node[1][gap] = (word, {})
+                return
+            node = child
+
+    def search(self, word, tolerance):
+        """Find indexed words within the edit distance of a word.
+        @type  word: str
+        @param word: Word to look up.
+        @type  tolerance: int
+        @param tolerance: Largest edit distance to include.
+        @rtype:  list
+        @return: Tuples of distance and word, closest first.
+        """
+        found = []
+        if self.root is None:
+            return found
+        pending = [self.root]
+        while pending:
+            candidate, children = pending.pop()
+            gap = distance(word, candidate, len(word) + len(candidate))
+            if gap <= tolerance:
+                found.append((gap, candidate))
+            for key in range(gap - tolerance, gap + tolerance + 1):
+                child = children.get(key)
+                if child is not None:
+                    pending.append(child)
+        found.sort()
+        return found
@@ -1,8 +1,43 @@
+from array import array
+from collections import namedtuple
 from lib.structural_token import MarkupToken
 import re
 
 whitespace = re.compile(r'^(\s+)[^\s-]')
 
+# Largest indent length stored in the indentation stack.
+MAX_INDENT_LENGTH = 0xFFFF
+
+# Immutable copies of the state values. They have the same attributes as the
+# state objects, so a snapshot can be passed to a strategy in place of the
+# live State. Being tuples, they pickle quickly and can be stored as JSON.
+MarkupSnapshot = namedtuple('MarkupSnapshot', [
+    'is_chapter', 'is_markup_line', 'is_section', 'token',
+])
+PreviousLineSnapshot = namedtuple('PreviousLineSnapshot', [
+    'is_blank', 'is_structural_markup',
+])
+StateSnapshot = namedtuple('StateSnapshot', [
+    'markup',
+    'previous_line',
+    'find_first_paragraph',
+    'indent_lengths',
+    'indent_level',
+    'is_blank',
+    'is_bold',
+    'is_continued',
+    'is_first_paragraph',
+    'is_italics',
+])
+
+# Values of a line that strategies use for formatting. Records are shared
+# between lines with the same values, so they cost a dict lookup per line.
+LineState = namedtuple('LineState', [
+    'markup', 'previous_line', 'is_blank', 'is_continued',
+    'is_first_paragraph',
+])
+_line_states = {}
+
 
 class MarkupState(object):
 
@@ -16,6 +51,8 @@ class MarkupState(object):
         markup token.
     """
 
+    __slots__ = ['is_chapter', 'is_markup_line', 'is_section', 'token']
+
     def __init__(self):
         self.reset()
 
@@ -54,6 +91,27 @@ class MarkupState(object):
         self.is_markup_line = False
         self.token = None
 
+    def restore(self, snapshot):
+        """Continue from state values saved with snapshot().
+        @type  snapshot: MarkupSnapshot
+        @param snapshot: Saved state values.
+        """
+        (
+            self.is_chapter,
+            self.is_markup_line,
+            self.is_section,
+            self.token,
+        ) = snapshot
+
+    def snapshot(self):
+        """Save the state values.
+        @rtype:  MarkupSnapshot
+        @return: Immutable copy of the state values.
+        """
+        return MarkupSnapshot(
+            self.is_chapter, self.is_markup_line, self.is_section, self.token
+        )
+
     def update_structural_markup_flags(self):
         """Update flags based on structural markup token."""
         if self.token == MarkupToken.chapter:
@@ -79,6 +137,8 @@ class PreviousLine(object):
         markup tag.
     """
 
+    __slots__ = ['is_blank', 'is_structural_markup']
+
     def __init__(self):
         self.reset()
 
@@ -86,6 +146,20 @@ class PreviousLine(object):
         self.is_blank = True
         self.is_structural_markup = False
 
+    def restore(self, snapshot):
+        """Continue from state values saved with snapshot().
+        @type  snapshot: PreviousLineSnapshot
+        @param snapshot: Saved state values.
+        """
+        self.is_blank, self.is_structural_markup = snapshot
+
+    def snapshot(self):
+        """Save the state values.
+        @rtype:  PreviousLineSnapshot
+        @return: Immutable copy of the state values.
+        """
+        return PreviousLineSnapshot(self.is_blank, self.is_structural_markup)
+
     def update(self, is_blank, is_structural_markup):
         self.is_blank = is_blank
         self.is_structural_markup = is_structural_markup
@@ -100,20 +174,111 @@ class State(object):
     :ivar int indent_level: The current indentation level of a block quote.
     :ivar bool is_blank: True if line is blank.
     :ivar bool is_bold: True if bold is carried over from a previous line.
+    :ivar bool is_continued: True if the line is too long to be read at
+        once, and this piece of it is followed by another.
     :ivar bool is_first_paragraph: True if currently in the first paragraph
         after a title, chapter, or section tag.
     :ivar bool is_italics: True if italics is carried over from a
         previous line.
     :ivar bool _find_first_paragraph: When true, the next line of proze is
         the first paragraph after a new title, chapter, or section.
+    :ivar array _indent_lengths: Lengths of the leading whitespace of each
+        open level of indentation.
     """
 
+    __slots__ = [
+        '_find_first_paragraph',
+        '_indent_lengths',
+        'indent_level',
+        'is_blank',
+        'is_bold',
+        'is_continued',
+        'is_first_paragraph',
+        'is_italics',
+        'markup',
+        'previous_line',
+    ]
+
     def __init__(self):
         self._find_first_paragraph = True
         self.markup = MarkupState()
         self.previous_line = PreviousLine()
         self.reset()
 
+    def __reduce__(self):
+        """Pickle the state values as a flat tuple of plain values, which
+        pickles several times faster than nested objects.
+        """
+        markup = self.markup
+        previous_line = self.previous_line
+        return State, (), (
+            markup.is_chapter,
+            markup.is_markup_line,
+            markup.is_section,
+            markup.token,
+            previous_line.is_blank,
+            previous_line.is_structural_markup,
+            self._find_first_paragraph,
+            self._indent_lengths.tobytes(),
+            self.indent_level,
+            self.is_blank,
+            self.is_bold,
+            self.is_continued,
+            self.is_first_paragraph,
+            self.is_italics,
+        )
+
+    def __setstate__(self, values):
+        """Restore the state values from a pickled tuple."""
+        markup = self.markup
+        previous_line = self.previous_line
+        (
+            markup.is_chapter,
+            markup.is_markup_line,
+            markup.is_section,
+            markup.token,
+            previous_line.is_blank,
+            previous_line.is_structural_markup,
+            self._find_first_paragraph,
+            indent_lengths,
+            self.indent_level,
+            self.is_blank,
+            self.is_bold,
+            self.is_continued,
+            self.is_first_paragraph,
+            self.is_italics,
+        ) = values
+        self._indent_lengths = array('H')
+        self._indent_lengths.frombytes(indent_lengths)
+
+    def continue_line(self, line, is_continued):
+        """Update the document state based on the next piece of a line that
+        is too long to be read at once. The first piece is passed to
+        update().
+        @type  line: str
+        @param line: Piece of the proze line.
+        @type  is_continued: bool
+        @param is_continued: True if another piece of the line follows.
+        """
+        self.is_continued = is_continued
+        if not self.is_blank and not self.markup.is_markup_line:
+            self._toggle_bold_and_italics(line)
+
+    @property
+    def find_first_paragraph(self):
+        """True if the next line of proze is the first paragraph after a
+        new title, chapter, or section. Unlike the other state values, it's
+        carried over from the end of one file to the start of the next, so
+        it's set to the value at the end of the previous file to compile a
+        file on its own.
+        @rtype:  bool
+        """
+        return self._find_first_paragraph
+
+    @find_first_paragraph.setter
+    def find_first_paragraph(self, value):
+        self._find_first_paragraph = value
+
     def _process_blank_line(self):
         """Update state for a line that is blank.
         Lines that contain only whitespace chars are considered to be blank.
@@ -141,17 +306,91 @@ class State(object):
         self._toggle_bold_and_italics(lowercase)
         self._update_indentation_level(line)
 
+    def line_state(self):
+        """Get the values of the current line that formatting depends on.
+        @rtype:  LineState
+        @return: Immutable record that can be passed to a strategy in
+            place of the live State, e.g. to format lines in another
+            thread or process.
+        """
+        markup = self.markup
+        previous_line = self.previous_line
+        key = (
+            markup.is_chapter,
+            markup.is_markup_line,
+            markup.is_section,
+            markup.token,
+            previous_line.is_blank,
+            previous_line.is_structural_markup,
+            self.is_blank,
+            self.is_continued,
+            self.is_first_paragraph,
+        )
+        record = _line_states.get(key)
+        if record is None:
+            record = LineState(
+                markup.snapshot(),
+                previous_line.snapshot(),
+                self.is_blank,
+                self.is_continued,
+                self.is_first_paragraph,
+            )
+            _line_states[key] = record
+        return record
+
     def reset(self):
         """Reset all state values to default."""
         self.markup.reset()
         self.previous_line.reset()
-        self._indent_leading_whitespace = []
+        self._indent_lengths = array('H')
         self.indent_level = 0
         self.is_blank = True
         self.is_bold = False
+        self.is_continued = False
         self.is_first_paragraph = False
         self.is_italics = False
 
+    def restore(self, snapshot):
+        """Continue from state values saved with snapshot().
+        @type  snapshot: StateSnapshot
+        @param snapshot: Saved state values. A list with the same values in
+            the same order is accepted, e.g. after a round trip to JSON.
+        """
+        (
+            markup,
+            previous_line,
+            self._find_first_paragraph,
+            indent_lengths,
+            self.indent_level,
+            self.is_blank,
+            self.is_bold,
+            self.is_continued,
+            self.is_first_paragraph,
+            self.is_italics,
+        ) = snapshot
+        self.markup.restore(markup)
+        self.previous_line.restore(previous_line)
+        self._indent_lengths = array('H', indent_lengths)
+
+    def snapshot(self):
+        """Save the state values, e.g. to resume parsing part way through a
+        file later.
+        @rtype:  StateSnapshot
+        @return: Immutable copy of the state values.
+        """
+        return StateSnapshot(
+            self.markup.snapshot(),
+            self.previous_line.snapshot(),
+            self._find_first_paragraph,
+            tuple(self._indent_lengths),
+            self.indent_level,
+            self.is_blank,
+            self.is_bold,
+            self.is_continued,
+            self.is_first_paragraph,
+            self.is_italics,
+        )
+
     def _toggle_bold_and_italics(self, line):
         """Toggle state of bold and italics blocks that line wrap.
         @type  line: str
@@ -170,18 +409,20 @@ class State(object):
         if self.previous_line.is_blank:
             current = whitespace.match(line)
             if current:
-                current = current.group(1)
-                previous = ''
-                if self._indent_leading_whitespace:
-                    previous = self._indent_leading_whitespace[-1]
-                if len(previous) > len(current):
-                    self._indent_leading_whitespace.pop()
+                current = current.end(1)
+                if current > MAX_INDENT_LENGTH:
+                    current = MAX_INDENT_LENGTH
+                previous = 0
+                if self._indent_lengths:
+                    previous = self._indent_lengths[-1]
+                if previous > current:
+                    self._indent_lengths.pop()
                     self.indent_level = self.indent_level - 1
-                elif len(previous) < len(current):
-                    self._indent_leading_whitespace.append(current)
+                elif previous < current:
+                    self._indent_lengths.append(current)
                     self.indent_level = self.indent_level + 1
-            else:
-                self._indent_leading_whitespace = []
+            elif self.indent_level:
+                del self._indent_lengths[:]
                 self.indent_level = 0
         if self.indent_level < 0:
                 self.indent_level = 0
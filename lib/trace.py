@@ -0,0 +1,233 @@
+"""Record the stages of a compile as Chrome trace events.
+
+The trace is a JSON file that can be opened in chrome://tracing or Perfetto.
+Every proze file is a span on the thread or process that compiled it, and
+the stages run while compiling it are spans nested inside it. Processes
+forked while a Tracer is active keep recording, and save their events to
+part files that are merged into the trace when the Tracer exits.
+"""
+from lib.profiler import Profiler
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+
+# Calls of stages run once per line that are shorter than this, in seconds,
+# are only counted in the totals of their file, to keep the trace small.
+MIN_DURATION = 0.0001
+
+# Tracer recording in this process, if any.
+_tracer = None
+
+# Whether forked processes are set up to drop the events of their parent.
+_fork_hook = False
+
+
+def _forget_parent_events():
+    """Drop the events a forked process copied from its parent."""
+    if _tracer is not None:
+        _tracer.events = []
+        _tracer.saved = 0
+        _tracer.thread_seconds = {}
+        _tracer.threads = {}
+
+
+def save():
+    """Save the events recorded in this process, if it is being traced.
+    Called by processes that are forked during a traced compile before they
+    finish their work.
+    """
+    if _tracer is not None:
+        _tracer.save()
+
+
+class Tracer(Profiler):
+
+    """Record the stages of a compile as Chrome trace events.
+
+    Used in a 'with' clause like a Profiler. Stages called once per line
+    are only recorded as spans when they take at least the minimum
+    duration, and their total time is added to the span of every file.
+    Only the time spent in the thread that opened a file is added to it,
+    so work done ahead in other threads isn't charged to it.
+    """
+
+    def __init__(self, path, targets, per_line=(), openers=None,
+                 output=None, min_duration=MIN_DURATION):
+        """Constructor.
+        @type  path: str
+        @param path: Path of the trace file to write.
+        @type  targets: list
+        @param targets: Tuples of the object that owns a callable, the
+            attribute name of the callable, and a label for its spans.
+        @type  per_line: iterable
+        @param per_line: Labels of the stages that are called once per
+            line, including 'file read'.
+        @type  openers: list
+        @param openers: Tuples of the owner and attribute name of each
+            function or method that opens proze files. They're called with
+            the path of the file.
+        @type  output: list
+        @param output: Modules whose calls to open() for writing create
+            output files.
+        @type  min_duration: float
+        @param min_duration: Shortest call of a per line stage, in seconds,
+            that is recorded as a span.
+        """
+        super().__init__(targets, openers, output)
+        self.events = []
+        self.min_duration = min_duration
+        self.parts = path + '.parts'
+        self.path = path
+        self.per_line = frozenset(per_line)
+        self.saved = 0
+        self.thread_seconds = {}
+        self.threads = {}
+
+    def __enter__(self):
+        """Swap in the instrumented callables and start recording."""
+        global _fork_hook, _tracer
+        if not _fork_hook:
+            os.register_at_fork(after_in_child=_forget_parent_events)
+            _fork_hook = True
+        shutil.rmtree(self.parts, ignore_errors=True)
+        os.makedirs(self.parts)
+        super().__enter__()
+        _tracer = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Put the original callables back and write the trace file."""
+        global _tracer
+        super().__exit__(exc_type, exc_value, traceback)
+        _tracer = None
+        self.save()
+        events = []
+        for part in sorted(glob.glob(os.path.join(self.parts, '*.json'))):
+            with open(part, 'r') as part_file:
+                events.extend(json.load(part_file))
+        shutil.rmtree(self.parts)
+        with open(self.path, 'w') as trace_file:
+            json.dump({
+                'displayTimeUnit': 'ms',
+                'traceEvents': events,
+            }, trace_file)
+
+    def _close_file(self, path, stats):
+        """Record the span of a proze file with the time of every stage.
+        @type  path: str
+        @param path: Path of the file.
+        @type  stats: dict
+        @param stats: Lines, bytes and timings of the file.
+        """
+        super()._close_file(path, stats)
+        args = {'bytes': stats['bytes'], 'lines': stats['lines']}
+        for label, seconds in stats['totals'].items():
+            spent = seconds - stats['before'].get(label, 0.0)
+            if spent > 0:
+                args[label + ' ms'] = round(spent * 1000, 3)
+        self._span(
+            os.path.basename(path),
+            stats['opened'],
+            stats['opened'] + stats['seconds'],
+            'file',
+            args,
+        )
+
+    def _open_file(self, path, start):
+        """Start the stats of a proze file.
+        @type  path: str
+        @param path: Path of the file.
+        @type  start: float
+        @param start: Time the file started to open.
+        @rtype:  dict
+        @return: Lines, bytes and timings of the file, updated in place.
+        """
+        stats = super()._open_file(path, start)
+        stats['totals'] = self._thread_seconds()
+        stats['before'] = dict(stats['totals'])
+        return stats
+
+    def _recorder(self, label):
+        """Get a function that records a call of a stage.
+        @type  label: str
+        @param label: Name of the stage.
+        @rtype:  function
+        @return: Function called with the start and end times of a call.
+        """
+        count = super()._recorder(label)
+        min_duration = self.min_duration if label in self.per_line else 0
+
+        def record(start, end):
+            count(start, end)
+            seconds = self._thread_seconds()
+            seconds[label] = seconds.get(label, 0.0) + end - start
+            if end - start >= min_duration:
+                self._span(label, start, end)
+
+        return record
+
+    def save(self):
+        """Save the events recorded in this process since the last save.
+        They are written to a part file that is merged into the trace.
+        """
+        pid = os.getpid()
+        events = self.events
+        self.events = []
+        events.append({
+            'args': {'name': multiprocessing.current_process().name},
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': pid,
+        })
+        for tid, name in self.threads.items():
+            events.append({
+                'args': {'name': name},
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': pid,
+                'tid': tid,
+            })
+        part = os.path.join(self.parts, '{}-{}.json'.format(pid, self.saved))
+        self.saved = self.saved + 1
+        with open(part, 'w') as part_file:
+            json.dump(events, part_file)
+
+    def _span(self, name, start, end, category='stage', args=None):
+        """Record a complete event.
+        @type  name: str
+        @param name: Name of the span.
+        @type  start: float
+        @param start: Start time from perf_counter().
+        @type  end: float
+        @param end: End time from perf_counter().
+        @type  category: str
+        @param category: Category of the span, 'file' or 'stage'.
+        @type  args: dict
+        @param args: Values shown with the span.
+        """
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        event = {
+            'cat': category,
+            'dur': (end - start) * 1e6,
+            'name': name,
+            'ph': 'X',
+            'pid': os.getpid(),
+            'tid': tid,
+            'ts': (start - self.started) * 1e6,
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def _thread_seconds(self):
+        """Get the time spent in each stage by the current thread.
+        @rtype:  dict
+        @return: Seconds by stage label, updated in place. Only the
+            current thread updates it.
+        """
+        return self.thread_seconds.setdefault(threading.get_ident(), {})
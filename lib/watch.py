@@ -0,0 +1,48 @@
+"""Detect changes to project files."""
+import os
+
+# Seconds to wait between checks for changed files.
+POLL_INTERVAL = 0.5
+
+
+class Watcher(object):
+
+    """Detect changes to files by polling their mtime and size.
+
+    The standard library has no portable file change notifications, so
+    files are checked with os.stat. A file that is created or deleted
+    counts as changed.
+    """
+
+    def __init__(self, paths):
+        """Constructor.
+        @type  paths: list
+        @param paths: Paths of the files to watch.
+        """
+        self.stats = {path: self._stat(path) for path in paths}
+
+    def _stat(self, path):
+        """Get the values compared to detect a change.
+        @type  path: str
+        @param path: Path of the file.
+        @rtype:  tuple(int, int)
+        @return: Modification time in ns and size. None if missing.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        """Check all watched files for changes since the last poll.
+        @rtype:  list
+        @return: Paths of the files that changed.
+        """
+        changed = []
+        for path, previous in self.stats.items():
+            current = self._stat(path)
+            if current != previous:
+                self.stats[path] = current
+                changed.append(path)
+        return changed
@@ -1,18 +1,164 @@
 #!/usr/bin/python3
 from lib.blocks import Blocks
-from lib.names import Names
-from lib.state import State
+from lib.cache import FragmentCache
+from lib.chapters import ChapterIndex, Segment, SegmentReader
+from lib.concordance import Concordance
+from lib.memory import MemoryReport
+from lib.names import Names, word_characters
+from lib.outline import outline
+from lib.pipeline import PipelineCompiler, Prefetcher
+from lib.profiler import Profiler
+from lib.report import NameReport
+from lib.state import MAX_INDENT_LENGTH, State
+from lib.watch import POLL_INTERVAL, Watcher
 from strategy.text import TextStrategy
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+import contextlib
+import io
+import itertools
 import lib.cli
 import lib.config
+import lib.pipeline
+import lib.trace
 import os
+import strategy.text
+import sys
+import time
+
+# Lines longer than this many characters are read and compiled in pieces,
+# so memory use doesn't grow with the length of a line.
+PIECE_SIZE = 64 * 1024
+
+# Per-process compile objects used by workers in parallel mode.
+_worker = {}
 
 
 class StrategyNotFoundError(Exception):
     pass
 
 
-def check_invalid_names(line, path, line_number, names):
+class WatchedProject(object):
+
+    """A compiled project kept in memory between rebuilds in watch mode.
+
+    The parsed config, strategy and parsing objects stay warm, and the
+    output fragment of every file is kept so that a change to one file only
+    recompiles that file. The files after it are recompiled too, up to the
+    first one that starts with the same State.find_first_paragraph as
+    before, since they're formatted according to how the file before them
+    ends.
+    """
+
+    def __init__(self, args):
+        """Constructor.
+        @type  args: object
+        @param args: Parsed command line args.
+        """
+        self.args = args
+        self.output_path = args.output + '.' + args.doctype
+        self.load()
+
+    def _compile(self, filename, find_first_paragraph, fragment=None):
+        """Compile a file and keep its fragment.
+        @type  filename: str
+        @param filename: Name of the proze file relative to the project root.
+        @type  find_first_paragraph: bool
+        @param find_first_paragraph: State.find_first_paragraph at the end
+            of the previous file in compile order.
+        @type  fragment: tuple(str, str, bool)
+        @param fragment: Already compiled output and messages of the file,
+            and State.find_first_paragraph at the end of it. The file is
+            compiled if not given.
+        """
+        if fragment is None:
+            fragment = compile_fragment(
+                self.args.path + '/' + filename,
+                self.strategy,
+                self.blocks,
+                self.state,
+                self.names,
+                find_first_paragraph
+            )
+        if fragment[1]:
+            print(fragment[1], end='')
+        self.entries[filename] = find_first_paragraph
+        self.fragments[filename] = fragment
+
+    def _write(self):
+        """Write the output document from the stored fragments."""
+        with self.strategy.compile(self.output_path) as compiler:
+            for filename in self.options.compile.order:
+                compiler.write_fragment(self.fragments[filename][0])
+
+    def load(self):
+        """Parse the config and compile every file in the project."""
+        args = self.args
+        self.options = lib.config.load(args)
+        self.strategy = determine_strategy(args, self.options)
+        self.blocks = Blocks()
+        self.names = Names(self.options)
+        self.state = State()
+        self.entries = {}
+        self.fragments = {}
+        self.has_config = lib.config.find_config_path(args) is not None
+        self.config_paths = [
+            args.path + '/' + name for name in lib.config.CONFIG_FILENAMES
+        ]
+        self.prefix_length = len(args.path) + 1
+        paths = [args.path + '/' + name for name in self.options.compile.order]
+        self.watcher = Watcher(paths + self.config_paths)
+        cache = None
+        if getattr(args, 'cache', False):
+            cache = FragmentCache(args.path, args.doctype, self.options)
+        fragments = iter_fragments(
+            self.strategy,
+            args,
+            self.options,
+            job_count(args),
+            cache
+        )
+        find_first_paragraph = self.state.find_first_paragraph
+        for filename, fragment in zip(self.options.compile.order, fragments):
+            self._compile(filename, find_first_paragraph, fragment)
+            find_first_paragraph = fragment[2]
+        if cache is not None:
+            cache.save()
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        self._write()
+
+    def poll(self):
+        """Recompile files that changed since the last poll.
+        The whole project is reloaded if the config changes, or if proze
+        files are added or removed in a project without a config file.
+
+        @rtype:  list
+        @return: Paths of the files that changed.
+        """
+        changed = self.watcher.poll()
+        reload = any(path in self.config_paths for path in changed)
+        if not self.has_config:
+            found = lib.config.find_proze_files(self.args)
+            if found != self.options.compile.order:
+                changed.append(self.args.path)
+                reload = True
+        if reload:
+            self.load()
+        elif changed:
+            filenames = set(path[self.prefix_length:] for path in changed)
+            find_first_paragraph = State().find_first_paragraph
+            for filename in self.options.compile.order:
+                if (
+                    filename in filenames or
+                    self.entries[filename] != find_first_paragraph
+                ):
+                    self._compile(filename, find_first_paragraph)
+                find_first_paragraph = self.fragments[filename][2]
+            self._write()
+        return changed
+
+
+def check_invalid_names(line, path, line_number, names, reported=None):
     """Check the line and warn if it contains invalid names.
     @type  line: str
     @param line: Proze formatted line.
@@ -22,8 +168,14 @@ def check_invalid_names(line, path, line_number, names):
     @param line_number: Current line number in the file being parsed.
     @type  names: lib.names.Names
     @param names: Methods for managing character names.
+    @type  reported: set
+    @param reported: Names already reported for the line, e.g. in earlier
+        pieces of a long line. Updated in place.
     """
     invalid = names.find_invalid(line)
+    if reported is not None:
+        invalid = [name for name in invalid if name not in reported]
+        reported.update(invalid)
     if invalid:
         print(
             'WARN: Invalid names found in {}[{}]: {}'.format(
@@ -32,11 +184,236 @@ def check_invalid_names(line, path, line_number, names):
         )
 
 
+def compile_file(path, compiler, blocks, state, names, opener=None):
+    """Compile a single proze file.
+    @type  path: str
+    @param path: Path to the proze file.
+    @type  compiler: BaseStrategyCompiler
+    @param compiler: Open compiler that output is written to.
+    @type  blocks: lib.blocks.Blocks
+    @param blocks: Strips comments and brackets from lines.
+    @type  state: lib.state.State
+    @param state: Document state tracked from line to line.
+    @type  names: lib.names.Names
+    @param names: Methods for managing character names.
+    @type  opener: function
+    @param opener: Opens the file, e.g. lib.pipeline.Prefetcher.open.
+        Defaults to open_segment.
+    """
+    lines = parse_file(path, blocks, state, names, opener=opener)
+    compiler.write_many(lines, itertools.repeat(state))
+    compiler.end_file()
+
+
+def compile_iter(project_path, doctype='txt', options=None):
+    """Compile a proze project, generating the output as it's formatted.
+    Nothing is written to disk. Output is generated one source line at a
+    time, so memory use doesn't depend on the size of the project.
+
+    @type  project_path: str
+    @param project_path: Path to the root folder of the proze project.
+    @type  doctype: str
+    @param doctype: Output format of the compiled document.
+    @type  options: lib.options.Options
+    @param options: Compile options. Loaded from the project config file
+        if not given.
+    @rtype:  generator
+    @return: Chunks of formatted output, in document order.
+    """
+    args = SimpleNamespace(doctype=doctype, output=None, path=project_path)
+    if options is None:
+        options = lib.config.load(args)
+    strategy = determine_strategy(args, options)
+    blocks = Blocks()
+    names = Names(options)
+    state = State()
+    output = io.StringIO()
+    with strategy.compile(output) as compiler:
+        for filename in options.compile.order:
+            path = project_path + '/' + filename
+            lines = itertools.chain(
+                parse_file(path, blocks, state, names), [None]
+            )
+            for line in lines:
+                if line is None:
+                    compiler.end_file()
+                else:
+                    compiler.write(line, state)
+                compiler.flush()
+                chunk = output.getvalue()
+                if chunk:
+                    output.seek(0)
+                    output.truncate()
+                    yield chunk
+
+
+def compile_fragment(path, strategy, blocks, state, names,
+                     find_first_paragraph=None):
+    """Compile a single proze file to an output fragment.
+    @type  path: str
+    @param path: Path to the proze file.
+    @type  strategy: BaseStrategy
+    @param strategy: Strategy to use.
+    @type  blocks: lib.blocks.Blocks
+    @param blocks: Strips comments and brackets from lines.
+    @type  state: lib.state.State
+    @param state: Document state tracked from line to line.
+    @type  names: lib.names.Names
+    @param names: Methods for managing character names.
+    @type  find_first_paragraph: bool
+    @param find_first_paragraph: State.find_first_paragraph at the end of
+        the previous file. The value already in the state is kept if not
+        given.
+    @rtype:  tuple(str, str, bool)
+    @return: Formatted output of the file, console messages printed
+        while compiling it, and State.find_first_paragraph at the end of it.
+    """
+    if find_first_paragraph is not None:
+        state.find_first_paragraph = find_first_paragraph
+    output = io.StringIO()
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        with strategy.compile(output) as compiler:
+            compile_file(path, compiler, blocks, state, names)
+    return output.getvalue(), messages.getvalue(), state.find_first_paragraph
+
+
+def _compile_fragment(filename, find_first_paragraph):
+    """Compile a proze file to an output fragment in a worker process.
+    @type  filename: str
+    @param filename: Name of the proze file relative to the project root.
+    @type  find_first_paragraph: bool
+    @param find_first_paragraph: State.find_first_paragraph at the end of
+        the previous file in compile order.
+    @rtype:  tuple(str, str, bool)
+    @return: Formatted output of the file, console messages printed
+        while compiling it, and State.find_first_paragraph at the end of it.
+    """
+    fragment = compile_fragment(
+        _worker['args'].path + '/' + filename,
+        _worker['strategy'],
+        _worker['blocks'],
+        _worker['state'],
+        _worker['names'],
+        find_first_paragraph
+    )
+    lib.trace.save()
+    return fragment
+
+
+def compile_selection(compiler, args, options):
+    """Compile the chapters and files selected on the command line.
+    Chapters are found with the chapter index, so only the parts of the
+    files that hold them are read.
+
+    @type  compiler: BaseStrategyCompiler
+    @param compiler: Open compiler that output is written to.
+    @type  args: object
+    @param args: Parsed command line args.
+    @type  options: lib.options.Options
+    @param options: Compile options parsed from the config file.
+    """
+    order = options.compile.order
+    files = getattr(args, 'file', None)
+    if files:
+        for filename in files:
+            if filename not in order:
+                print('WARN: {} is not in the compile order.'.format(filename))
+    numbers = getattr(args, 'chapters', None)
+    if numbers:
+        index = ChapterIndex(args.path)
+        segments = index.segments(order, numbers)
+        index.save()
+    else:
+        segments = [Segment(filename, None, None) for filename in order]
+    blocks = Blocks()
+    names = Names(options)
+    state = State()
+    for segment in segments:
+        if files and segment.filename not in files:
+            continue
+        path = args.path + '/' + segment.filename
+        if segment.marker is None and segment.end is None:
+            segment = None
+        lines = parse_file(path, blocks, state, names, segment)
+        compiler.write_many(lines, itertools.repeat(state))
+        compiler.end_file()
+
+
+def _compile_stages():
+    """Stages of a compile that are profiled or traced.
+    @rtype:  list
+    @return: Tuples of the object that owns the function of each stage, the
+        attribute name of the function and a label for the stage.
+    """
+    module = sys.modules[__name__]
+    compiler = strategy.text._TextStrategyCompiler
+    return [
+        (Blocks, 'remove', 'Blocks.remove'),
+        (State, 'update', 'State.update'),
+        (module, 'check_invalid_names', 'check_invalid_names'),
+        (compiler, '_format', '_TextStrategyCompiler._format'),
+        (
+            compiler,
+            '_split_on_line_length',
+            '_TextStrategyCompiler._split_on_line_length'
+        ),
+    ]
+
+
+def create_memory_report():
+    """Create a memory report for the stages of a compile.
+    @rtype:  lib.memory.MemoryReport
+    @return: Memory report that traces allocations while it's active.
+    """
+    return MemoryReport(
+        _compile_stages(),
+        openers=_openers(),
+        output=[strategy.text],
+    )
+
+
+def create_profiler():
+    """Create a profiler for the stages of a compile.
+    @rtype:  lib.profiler.Profiler
+    @return: Profiler that instruments the stages while it's active.
+    """
+    return Profiler(
+        _compile_stages(),
+        openers=_openers(),
+        output=[strategy.text],
+    )
+
+
+def create_tracer(path):
+    """Create a tracer for the stages of a compile.
+    Besides the profiled stages, batches of lines written to the compiler
+    and files read ahead by the pipeline are traced.
+
+    @type  path: str
+    @param path: Path of the trace file to write.
+    @rtype:  lib.trace.Tracer
+    @return: Tracer that records the stages while it's active.
+    """
+    stages = _compile_stages()
+    compiler = strategy.text._TextStrategyCompiler
+    return lib.trace.Tracer(
+        path,
+        stages + [
+            (compiler, 'write_many', '_TextStrategyCompiler.write_many'),
+            (lib.pipeline, 'read_head', 'read_head'),
+        ],
+        per_line=[label for _, _, label in stages] + ['file read'],
+        openers=_openers(),
+        output=[strategy.text, lib.pipeline],
+    )
+
+
 def determine_strategy(args, options):
     """Determine the strategy to use when compiling the document.
     @type  args: object
     @param args: Parsed command line args.
-    @type  options: DotMap
+    @type  options: lib.options.Options
     @param options: Compile options parsed from the config file.
     @rtype:  BaseStrategy
     @return: Strategy to use.
@@ -56,34 +433,431 @@ def execute_strategy(strategy, args, options):
     @param strategy: Strategy to use.
     @type  args: object
     @param args: Parsed command line args.
-    @type  options: DotMap
+    @type  options: lib.options.Options
+    @param options: Compile options parsed from the config file.
+    """
+    jobs = job_count(args)
+    cache = None
+    if getattr(args, 'cache', False):
+        cache = FragmentCache(args.path, args.doctype, options)
+    output_path = args.output + '.' + args.doctype
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    selected = getattr(args, 'chapters', None) or getattr(args, 'file', None)
+    if getattr(args, 'pipeline', False):
+        output = PipelineCompiler(strategy, output_path)
+    else:
+        output = strategy.compile(output_path)
+    with output as compiler:
+        if selected:
+            compile_selection(compiler, args, options)
+        elif cache is None and jobs == 1:
+            blocks = Blocks()
+            names = Names(options)
+            state = State()
+            paths = [
+                args.path + '/' + filename
+                for filename in options.compile.order
+            ]
+            opener = None
+            reader = contextlib.nullcontext()
+            if getattr(args, 'pipeline', False):
+                reader = Prefetcher(paths)
+                opener = reader.open
+            with reader:
+                for path in paths:
+                    compile_file(path, compiler, blocks, state, names, opener)
+        else:
+            fragments = iter_fragments(strategy, args, options, jobs, cache)
+            for fragment, messages, _ in fragments:
+                if messages:
+                    print(messages, end='')
+                compiler.write_fragment(fragment)
+    if cache is not None:
+        cache.save()
+
+
+def index_words(args, options):
+    """Update the word index of the project and print where words appear.
+    @type  args: object
+    @param args: Parsed command line args.
+    @type  options: lib.options.Options
+    @param options: Compile options parsed from the config file.
+    @rtype:  lib.concordance.Concordance
+    @return: Up to date index of the project.
+    """
+    concordance = Concordance(args.path)
+    scanned = concordance.update(options.compile.order)
+    concordance.save()
+    words = getattr(args, 'arguments', None) or []
+    if not words:
+        print('Indexed {} files, {} updated.'.format(
+            len(concordance.order), len(scanned)
+        ))
+    for word in words:
+        found = concordance.find(word)
+        print('{}: {} lines'.format(word, len(found)))
+        chapters = {}
+        for filename, line_number, chapter in found:
+            chapters.setdefault(chapter, []).append(
+                '{}[{}]'.format(filename, line_number)
+            )
+        for chapter, lines in chapters.items():
+            chapter = chapter or '(no chapter)'
+            print('  {}: {}'.format(chapter, ', '.join(lines)))
+    return concordance
+
+
+def _init_worker(args, options):
+    """Create the compile objects reused by a worker process.
+    @type  args: object
+    @param args: Parsed command line args.
+    @type  options: lib.options.Options
+    @param options: Compile options parsed from the config file.
+    """
+    _worker['args'] = args
+    _worker['blocks'] = Blocks()
+    _worker['names'] = Names(options)
+    _worker['state'] = State()
+    _worker['strategy'] = determine_strategy(args, options)
+
+
+def iter_fragments(strategy, args, options, jobs=1, cache=None):
+    """Compile every proze file to an output fragment.
+    Cached fragments are used for unchanged files. The remaining files are
+    compiled in a process pool if more than one job is requested.
+    Fragments are generated in compile order, so writing them out gives
+    output identical to a serial compile. A file is formatted differently
+    depending on whether the file before it ends in a heading, so that is
+    part of the cache key, and it's found for each file with
+    scan_first_paragraph() before the files are handed out to the pool.
+
+    @type  strategy: BaseStrategy
+    @param strategy: Strategy to use.
+    @type  args: object
+    @param args: Parsed command line args.
+    @type  options: lib.options.Options
     @param options: Compile options parsed from the config file.
+    @type  jobs: int
+    @param jobs: Number of worker processes.
+    @type  cache: lib.cache.FragmentCache
+    @param cache: Cache of fragments from earlier runs. None to compile
+        every file.
+    @rtype:  generator
+    @return: Tuples of formatted output, console messages and
+        State.find_first_paragraph at the end of the file, per file.
     """
+    order = options.compile.order
     blocks = Blocks()
     names = Names(options)
     state = State()
-    output_path = args.output + '.' + args.doctype
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with strategy.compile(output_path) as compiler:
-        for filename in options.compile.order:
-            path = args.path + '/' + filename
-            try:
-                with open(path, 'r') as proze_file:
-                    blocks.reset()
-                    state.reset()
-                    line_number = 0
-                    for raw_line in proze_file:
-                        line_number = line_number + 1
-                        line = blocks.remove(raw_line)
-                        state.update(raw_line)
-                        check_invalid_names(line, path, line_number, names)
-                        if line:
-                            compiler.write(line, state)
-            except FileNotFoundError:
-                print(
-                    'MISSING: Cannot find file "{}". '.format(path) +
-                    'Update the file names in your config file.'
+    if jobs == 1:
+        for filename in order:
+            entry = state.find_first_paragraph
+            hit = None if cache is None else cache.get(filename, entry)
+            if hit is None:
+                hit = compile_fragment(
+                    args.path + '/' + filename, strategy, blocks, state, names
                 )
+                if cache is not None:
+                    cache.put(filename, entry, *hit)
+            else:
+                state.find_first_paragraph = hit[2]
+            yield hit
+        return
+    cached = []
+    entries = []
+    find_first_paragraph = state.find_first_paragraph
+    for filename in order:
+        hit = None
+        if cache is not None:
+            hit = cache.get(filename, find_first_paragraph)
+        cached.append(hit)
+        entries.append(find_first_paragraph)
+        if hit is None:
+            find_first_paragraph = scan_first_paragraph(
+                args.path + '/' + filename, find_first_paragraph
+            )
+        else:
+            find_first_paragraph = hit[2]
+    stale = [
+        (filename, entry)
+        for filename, entry, hit in zip(order, entries, cached)
+        if hit is None
+    ]
+    with contextlib.ExitStack() as stack:
+        if len(stale) > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(
+                max_workers=min(jobs, len(stale)),
+                initializer=_init_worker,
+                initargs=(args, options)
+            ))
+            compiled = pool.map(_compile_fragment, *zip(*stale))
+        else:
+            compiled = (
+                compile_fragment(
+                    args.path + '/' + filename, strategy, blocks, state, names,
+                    entry
+                ) for filename, entry in stale
+            )
+        for filename, entry, hit in zip(order, entries, cached):
+            if hit is None:
+                hit = next(compiled)
+                if cache is not None:
+                    cache.put(filename, entry, *hit)
+            yield hit
+
+
+def job_count(args):
+    """Number of processes to compile proze files with.
+    @type  args: object
+    @param args: Parsed command line args.
+    @rtype:  int
+    @return: Number of processes. Zero or less means one per CPU.
+    """
+    jobs = getattr(args, 'jobs', 1)
+    if jobs is not None and jobs < 1:
+        jobs = os.cpu_count()
+    return jobs or 1
+
+
+def _name_tail(text, length):
+    """Get the end of a piece of a long line that a name can start in.
+    @type  text: str
+    @param text: Text of the piece.
+    @type  length: int
+    @param length: Length of the longest name.
+    @rtype:  str
+    @return: At most the last length characters of the text, starting at
+        the start of a word.
+    """
+    tail = text[-(length + 1):]
+    if len(tail) <= length:
+        return tail
+    for index, char in enumerate(tail):
+        if char not in word_characters:
+            return tail[index:]
+    return ''
+
+
+def open_segment(path, segment=None):
+    """Open part of a proze file as text.
+    The file is read from the start of the segment, and reading stops at
+    its end, so the rest of the file is never read. The segment is decoded
+    as it's read, the same as a whole file.
+
+    @type  path: str
+    @param path: Path to the proze file.
+    @type  segment: lib.chapters.Segment
+    @param segment: Part of the file to open. The whole file is opened if
+        not given.
+    @rtype:  file
+    @return: Text stream of the segment.
+    """
+    if segment is None:
+        return open(path, 'r')
+    proze_file = open(path, 'rb', buffering=0)
+    if segment.marker is not None:
+        proze_file.seek(segment.marker.offset)
+    size = None
+    if segment.end is not None:
+        size = segment.end - proze_file.tell()
+    return io.TextIOWrapper(
+        io.BufferedReader(SegmentReader(proze_file, size))
+    )
+
+
+def _openers():
+    """Functions that open proze files while compiling.
+    @rtype:  list
+    @return: Tuples of the owner and attribute name of each function.
+    """
+    return [(sys.modules[__name__], 'open_segment'), (Prefetcher, 'open')]
+
+
+def parse_file(path, blocks, state, names, segment=None, opener=None):
+    """Parse a proze file, generating the lines that should be output.
+    The state is updated for each line before it is generated. Lines longer
+    than PIECE_SIZE characters are generated in pieces.
+
+    @type  path: str
+    @param path: Path to the proze file.
+    @type  blocks: lib.blocks.Blocks
+    @param blocks: Strips comments and brackets from lines.
+    @type  state: lib.state.State
+    @param state: Document state tracked from line to line.
+    @type  names: lib.names.Names
+    @param names: Methods for managing character names.
+    @type  segment: lib.chapters.Segment
+    @param segment: Part of the file to parse. The whole file is parsed if
+        not given.
+    @type  opener: function
+    @param opener: Opens the file given the path and segment. Defaults to
+        open_segment.
+    @rtype:  generator
+    @return: Lines with comments and brackets removed.
+    """
+    opener = opener or open_segment
+    try:
+        with opener(path, segment) as proze_file:
+            blocks.reset()
+            state.reset()
+            line_number = 0
+            if segment is not None and segment.marker is not None:
+                blocks.restore(segment.marker.blocks)
+                state.restore(segment.marker.state)
+                line_number = segment.marker.line_number - 1
+            readline = proze_file.readline
+            while True:
+                raw_line = readline(PIECE_SIZE)
+                if not raw_line:
+                    break
+                line_number = line_number + 1
+                if len(raw_line) == PIECE_SIZE and raw_line[-1] != '\n':
+                    yield from _parse_pieces(
+                        raw_line, readline, path, line_number, blocks, state,
+                        names
+                    )
+                    continue
+                line = blocks.remove(raw_line)
+                state.update(raw_line)
+                check_invalid_names(line, path, line_number, names)
+                if line:
+                    yield line
+    except FileNotFoundError:
+        print(
+            'MISSING: Cannot find file "{}". '.format(path) +
+            'Update the file names in your config file.'
+        )
+
+
+def _parse_pieces(text, readline, path, line_number, blocks, state, names):
+    """Parse a line that is too long to be read at once, in pieces.
+    Memory use is bounded by PIECE_SIZE however long the line is. The
+    state is flagged as continued for every piece but the last.
+
+    @type  text: str
+    @param text: First PIECE_SIZE characters of the line.
+    @type  readline: function
+    @param readline: Reads up to a number of characters of the file.
+    @type  path: str
+    @param path: Path to the proze file.
+    @type  line_number: number
+    @param line_number: Line number of the line in the file.
+    @type  blocks: lib.blocks.Blocks
+    @param blocks: Strips comments and brackets from lines.
+    @type  state: lib.state.State
+    @param state: Document state tracked from line to line.
+    @type  names: lib.names.Names
+    @param names: Methods for managing character names.
+    @rtype:  generator
+    @return: Pieces of the line with comments and brackets removed. Once a
+        piece is generated, the last one is too, even if it's empty.
+    """
+    chunk = text
+    is_first = True
+    is_open = False
+    # Names are also checked on the end of the text before each piece, so
+    # names that span two pieces are found. The last word of a piece can go
+    # on in the next one, so it's held back and checked with the next one.
+    # A word longer than any name is replaced by a character no name starts
+    # with, and each name is reported once per line.
+    longest = max((len(key) for _, key in names.invalid), default=0)
+    blocker = min(
+        word_characters - set(key[:1] for _, key in names.invalid),
+        default='_'
+    )
+    reported = set()
+    tail = ''
+    word_chars = ''.join(word_characters)
+    while True:
+        is_continued = len(chunk) == PIECE_SIZE and chunk[-1] != '\n'
+        if is_continued:
+            raw_line, text = split_piece(text)
+        else:
+            raw_line, text = text, ''
+        if is_first and is_continued and raw_line.isspace():
+            # Only the length of the indent matters, up to the longest one
+            # that is tracked, so the rest of it is dropped.
+            text = raw_line[-MAX_INDENT_LENGTH:] + text
+            chunk = readline(PIECE_SIZE)
+            text = text + chunk
+            continue
+        if is_first:
+            line = blocks.remove(raw_line)
+            state.update(raw_line)
+            state.is_continued = is_continued
+            is_first = False
+        else:
+            line = blocks.remove_continued(raw_line)
+            state.continue_line(raw_line, is_continued)
+        checked = tail + line
+        held = ''
+        if is_continued:
+            end = len(checked.rstrip(word_chars))
+            checked, held = checked[:end], checked[end:]
+            if len(held) > longest:
+                held = blocker
+        check_invalid_names(checked, path, line_number, names, reported)
+        tail = _name_tail(checked, longest) + held
+        if line or (is_open and not is_continued):
+            is_open = True
+            yield line
+        if not is_continued:
+            return
+        chunk = readline(PIECE_SIZE)
+        text = text + chunk
+
+
+def print_outline(args, options):
+    """Print the structural markup of the project without compiling it.
+    @type  args: object
+    @param args: Parsed command line args.
+    @type  options: lib.options.Options
+    @param options: Compile options parsed from the config file.
+    @rtype:  list
+    @return: Headings of the project in compile order.
+    """
+    headings = []
+    for filename in options.compile.order:
+        path = os.path.join(args.path, filename)
+        try:
+            with open(path, 'r') as proze_file:
+                headings.extend(outline(filename, proze_file))
+        except FileNotFoundError:
+            print(
+                'MISSING: Cannot find file "{}". '.format(path) +
+                'Update the file names in your config file.'
+            )
+    for heading in headings:
+        print('{}[{}] {} {}'.format(
+            heading.filename, heading.line_number, heading.token,
+            heading.text
+        ).rstrip())
+    return headings
+
+
+def report_names(args, options):
+    """Print the configured names found in each file and chapter.
+    @type  args: object
+    @param args: Parsed command line args.
+    @type  options: lib.options.Options
+    @param options: Config options that contain the names.
+    @rtype:  lib.report.NameReport
+    @return: Report after every proze file is scanned.
+    """
+    report = NameReport(options)
+    for filename in options.compile.order:
+        path = os.path.join(args.path, filename)
+        try:
+            with open(path, 'r') as proze_file:
+                report.scan(filename, proze_file)
+        except FileNotFoundError:
+            print(
+                'MISSING: Cannot find file "{}". '.format(path) +
+                'Update the file names in your config file.'
+            )
+    print('\n'.join(report.format()))
+    return report
 
 
 def run(args):
@@ -91,14 +865,116 @@ def run(args):
     @type  args: object
     @param args: Parsed command line args.
     """
+    if getattr(args, 'watch', False):
+        watch(args)
+        return
     options = lib.config.load(args)
     if not options.compile.order:
         print('No proze files to compile.')
+    elif args.doctype == 'index':
+        index_words(args, options)
+    elif args.doctype == 'outline':
+        print_outline(args, options)
+    elif args.doctype == 'report':
+        report_names(args, options)
+    elif getattr(args, 'memory_report', False):
+        strategy = determine_strategy(args, options)
+        with create_memory_report() as memory_report:
+            execute_strategy(strategy, args, options)
+        print('\n'.join(memory_report.report()))
+    elif getattr(args, 'profile', False):
+        strategy = determine_strategy(args, options)
+        with create_profiler() as profiler:
+            execute_strategy(strategy, args, options)
+        print('\n'.join(profiler.report()))
+    elif getattr(args, 'trace', None):
+        strategy = determine_strategy(args, options)
+        with create_tracer(args.trace):
+            execute_strategy(strategy, args, options)
+        print('Wrote a trace of the compile to {}'.format(args.trace))
     else:
         strategy = determine_strategy(args, options)
         execute_strategy(strategy, args, options)
 
 
+def scan_first_paragraph(path, find_first_paragraph):
+    """Find State.find_first_paragraph at the end of a proze file without
+    compiling it. Only the start of each line is passed to the state, which
+    is all it needs to find blank lines and structural markup. The file
+    isn't opened with open_segment(), so it isn't profiled or traced as a
+    compiled file.
+
+    @type  path: str
+    @param path: Path to the proze file.
+    @type  find_first_paragraph: bool
+    @param find_first_paragraph: Value at the end of the previous file.
+    @rtype:  bool
+    @return: Value at the end of the file. The value passed in if the file
+        is missing.
+    """
+    state = State()
+    state.find_first_paragraph = find_first_paragraph
+    try:
+        with open(path, 'r') as proze_file:
+            readline = proze_file.readline
+            while True:
+                chunk = text = readline(PIECE_SIZE)
+                if not chunk:
+                    break
+                is_continued = len(chunk) == PIECE_SIZE and chunk[-1] != '\n'
+                while is_continued and text.isspace():
+                    chunk = readline(PIECE_SIZE)
+                    text = text[-MAX_INDENT_LENGTH:] + chunk
+                    is_continued = (
+                        len(chunk) == PIECE_SIZE and chunk[-1] != '\n'
+                    )
+                state.update(text)
+                while is_continued:
+                    chunk = readline(PIECE_SIZE)
+                    is_continued = (
+                        len(chunk) == PIECE_SIZE and chunk[-1] != '\n'
+                    )
+    except FileNotFoundError:
+        pass
+    return state.find_first_paragraph
+
+
+def split_piece(text):
+    """Split the next piece off a line that is too long to be read at once.
+    The piece ends after the last space, so no word or token is cut in two.
+    Text without spaces is cut anywhere but after a '#', '_', '*' or
+    backslash, so no token is cut in two there either.
+
+    @type  text: str
+    @param text: Rest of the line read so far.
+    @rtype:  tuple(str, str)
+    @return: The piece, and the text left over for the next piece.
+    """
+    end = text.rfind(' ') + 1
+    if not end:
+        end = len(text.rstrip('#*\\_')) or len(text)
+    return text[:end], text[end:]
+
+
+def watch(args):
+    """Compile the project, then recompile changed files until interrupted.
+    @type  args: object
+    @param args: Parsed command line args.
+    """
+    project = WatchedProject(args)
+    print('Watching {} for changes. Press Ctrl+C to stop.'.format(args.path))
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            changed = project.poll()
+            if changed:
+                print('Recompiled {} after changes to: {}'.format(
+                    project.output_path, ', '.join(changed)
+                ))
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     args = lib.cli.parse()
     run(args)
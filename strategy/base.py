@@ -13,7 +13,7 @@ class BaseStrategy(ABC):
     @abstractmethod
     def __init__(self, options):
         """Constructor.
-        @type  options: DotMap
+        @type  options: lib.options.Options
         @param options: Compile options parsed from the config file.
         """
         pass
@@ -21,8 +21,9 @@ class BaseStrategy(ABC):
     @abstractmethod
     def compile(self, path):
         """Compile the project.
-        @type  path: str
-        @param path: Path of the output file to be generated.
+        @type  path: str or file
+        @param path: Path of the output file to be generated, or an open
+            stream that output is written to.
         @rtype:  BaseStrategyConverter
         @return: Compilation object that can be used in a 'with' clause.
         """
@@ -36,9 +37,10 @@ class BaseStrategyCompiler(ABC):
     @abstractmethod
     def __init__(self, path, options):
         """Constructor.
-        @type  path: str
-        @param path: Path of output file to be generated.
-        @type  options: DotMap
+        @type  path: str or file
+        @param path: Path of output file to be generated, or an open stream
+            that output is written to.
+        @type  options: lib.options.Options
         @param options: Compile options parsed from the config file.
         """
         pass
@@ -53,6 +55,15 @@ class BaseStrategyCompiler(ABC):
         """Close the open file handle."""
         pass
 
+    @abstractmethod
+    def write_fragment(self, fragment):
+        """Write output already compiled by another compiler.
+        @type  fragment: str
+        @param fragment: Output of a compiler of the same strategy that
+            wrote to a stream.
+        """
+        pass
+
     @abstractmethod
     def _format(self, line, **kwargs):
         """Format the line of text for the target document type.
@@ -67,10 +78,36 @@ class BaseStrategyCompiler(ABC):
         """
         pass
 
+    def end_file(self):
+        """Finish output of the current proze file.
+        Called after the last line of each file, e.g. to output a paragraph
+        that is still being collected.
+        """
+        pass
+
+    def flush(self):
+        """Write any buffered output to the document."""
+        pass
+
     @abstractmethod
-    def write(self, line):
+    def write(self, line, state):
         """Write a line of text to the output document.
         @type  line: str
         @param line: Formatted line to be written to the document.
+        @type  state: lib.state.State or lib.state.LineState
+        @param state: Formatting state of the current line of text.
         """
         pass
+
+    def write_many(self, lines, states):
+        """Write a batch of lines to the output document.
+        Lines and states are consumed in step, so a generator of lines can
+        be paired with the live state object, e.g. itertools.repeat(state).
+
+        @type  lines: iterable
+        @param lines: Formatted lines to be written to the document.
+        @type  states: iterable
+        @param states: Formatting state of each line of text.
+        """
+        for line, state in zip(lines, states):
+            self.write(line, state)
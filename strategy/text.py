@@ -6,51 +6,177 @@ import re
 MAX_LINE_LENGTH = 80
 
 
+# Number of characters collected in memory before writing to the document.
+BUFFER_SIZE = 64 * 1024
+
+non_whitespace = re.compile(r'\S*')
+whitespace = re.compile(r'\s+')
+
+
+def justify(words, width):
+    """Break words into fully justified lines.
+    Break points are chosen with dynamic programming to minimise the sum of
+    squared trailing space over every line except the last, which is left
+    ragged. A line can only hold the words that fit in the width, so each
+    word looks back over at most width / 2 candidate breaks and the cost
+    stays linear in the number of words. Words longer than the width are
+    split mid-word. Spaces are padded from the left so every line except
+    the last is exactly the width.
+
+    @type  words: list
+    @param words: Words of the paragraph.
+    @type  width: int
+    @param width: Number of characters per line.
+    @rtype:  list
+    @return: Justified lines.
+    """
+    pieces = []
+    for word in words:
+        while len(word) > width:
+            pieces.append(word[:width])
+            word = word[width:]
+        if word:
+            pieces.append(word)
+    count = len(pieces)
+    lengths = [len(word) for word in pieces]
+    cost = [0] + [float('inf')] * count
+    start = [0] * (count + 1)
+    for end in range(1, count + 1):
+        used = -1
+        for first in range(end - 1, -1, -1):
+            used = used + lengths[first] + 1
+            if used > width:
+                break
+            slack = 0 if end == count else width - used
+            total = cost[first] + slack * slack
+            if total < cost[end]:
+                cost[end] = total
+                start[end] = first
+    breaks = []
+    end = count
+    while end > 0:
+        breaks.append((start[end], end))
+        end = start[end]
+    breaks.reverse()
+    lines = []
+    for first, end in breaks:
+        line_words = pieces[first:end]
+        gaps = len(line_words) - 1
+        if end == count or not gaps:
+            lines.append(' '.join(line_words))
+            continue
+        spaces, extra = divmod(width - sum(lengths[first:end]), gaps)
+        line = line_words[0]
+        for index, word in enumerate(line_words[1:]):
+            line = line + ' ' * (spaces + (index < extra)) + word
+        lines.append(line)
+    return lines
+
+
+def split_on_line_length(line, width):
+    """Split a line into lines no longer than the width.
+    A line is split at the last space or hyphen that fits, and that
+    character is dropped. A word that doesn't fit on a line by itself is
+    split mid-word. The line is never copied while searching for breaks
+    and each search is bounded by the width, so the cost is linear in the
+    length of the line.
+
+    @type  line: str
+    @param line: Text to be split.
+    @type  width: int
+    @param width: Maximum number of characters per line.
+    @rtype:  list
+    @return: Split line.
+    """
+    lines = []
+    start = 0
+    while len(line) - start > width:
+        limit = start + width + 1
+        end = line.rfind(' ', start, limit)
+        hyphen = line.rfind('-', max(end, start), limit)
+        if hyphen > end:
+            end = hyphen
+        if end > start:
+            lines.append(line[start:end])
+            start = end + 1
+        else:
+            # Force a hard mid-word split for really long words.
+            lines.append(line[start:limit - 1])
+            start = limit - 1
+    lines.append(line[start:] if start else line)
+    return lines
+
+
 class TextStrategy(BaseStrategy):
 
     """Compile to a plain text file."""
 
-    def __init__(self, options):
+    def __init__(self, options, buffer_size=BUFFER_SIZE):
         """Constructor.
-        @type  options: DotMap
+        @type  options: lib.options.Options
         @param options: Compile options parsed from the config file.
+        @type  buffer_size: int
+        @param buffer_size: Number of characters collected in memory before
+            they are written to the document.
         """
+        self.buffer_size = buffer_size
         self.options = options
 
     def compile(self, path):
         """Compile the project.
-        @type  path: str
-        @param path: Path of the output file to be generated.
+        @type  path: str or file
+        @param path: Path of the output file to be generated, or an open
+            stream that output is written to.
         @rtype: _TextStrategyCompiler
         @return: Compilation object that can be used in a 'with' clause.
         """
-        return _TextStrategyCompiler(path, self.options)
+        return _TextStrategyCompiler(path, self.options, self.buffer_size)
 
 
 class _TextStrategyCompiler(BaseStrategyCompiler):
 
     """Compile to a plain text file."""
 
-    def __init__(self, path, options):
+    def __init__(self, path, options, buffer_size=BUFFER_SIZE):
         """Constructor.
-        @type  path: str
-        @param path: Path of output file to be generated.
-        @type  options: DotMap
+        @type  path: str or file
+        @param path: Path of output file to be generated, or an open stream
+            that output is written to.
+        @type  options: lib.options.Options
         @param options: Compile options parsed from the config file.
+        @type  buffer_size: int
+        @param buffer_size: Number of characters collected in memory before
+            they are written to the document.
         """
+        self.buffer = []
+        self.buffer_size = buffer_size
+        self.buffered = 0
         self.handle = None
+        self.held = None
+        self.is_leading = False
         self.options = options
+        self.justified = options.compile.paragraph.mode == 'justified'
+        self.line_length = options.compile.lineLength or MAX_LINE_LENGTH
+        self.paragraph = []
+        self.paragraph_prefix = ''
         self.path = path
         self.rules = Rules(options)
+        self.wrapping = None
 
     def __enter__(self):
         """Create and open a new document."""
-        self.handle = open(self.path, 'w')
+        if isinstance(self.path, str):
+            self.handle = open(self.path, 'w')
+        else:
+            self.handle = self.path
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         """Close the open file handle."""
-        self.handle.close()
+        self.end_file()
+        self.flush()
+        if self.handle is not self.path:
+            self.handle.close()
 
     def _blank_lines(self, state):
         """Determine the number of blank lines to insert before this one.
@@ -73,6 +199,20 @@ class _TextStrategyCompiler(BaseStrategyCompiler):
                 blank_lines = '\n'
         return blank_lines
 
+    def end_file(self):
+        """Output the paragraph still being collected in justified mode."""
+        text = self._layout_paragraph()
+        if text:
+            self.buffer.append(text)
+            self.buffered = self.buffered + len(text)
+
+    def flush(self):
+        """Write buffered output to the document in a single call."""
+        if self.buffer:
+            self.handle.write(''.join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+
     def _format(self, line, state):
         """Format the line of text for the target document type.
         @type  line: str
@@ -92,6 +232,54 @@ class _TextStrategyCompiler(BaseStrategyCompiler):
             line = self._strip_bold_italics(line)
         return line
 
+    def _hold_back(self, line):
+        """Split off the end of a piece of a long line that could join up
+        with the next piece: the last word and the whitespace around it.
+        The rest of the piece formats the same as it would as part of the
+        whole line.
+        @type  line: str
+        @param line: Piece of a proze line, after any text held back from
+            the previous piece.
+        @rtype:  tuple(str, str)
+        @return: Text that can be formatted now, and the text held back
+            with runs of whitespace collapsed.
+        """
+        stripped = line.rstrip()
+        end = stripped.rfind(' ')
+        head = stripped[:end].rstrip() if end > 0 else stripped
+        return head, whitespace.sub(' ', line[len(head):])
+
+    def _hold_back_word(self, line):
+        """Split off the end of a piece of a long line that could be the
+        start of a word that goes on in the next piece. Used in justified
+        mode, where a word cut in two would be justified as two words. The
+        paragraph is collected in memory there anyway, so the word is held
+        back however long it is.
+        @type  line: str
+        @param line: Piece of a proze line, after any text held back from
+            the previous piece.
+        @rtype:  tuple(str, str)
+        @return: Text that only ends in whole words, and the start of the
+            last word. Empty if the piece ends in whitespace.
+        """
+        end = len(line) - non_whitespace.match(line[::-1]).end()
+        return line[:end], line[end:]
+
+    def _layout_paragraph(self):
+        """Justify the words collected for the current paragraph.
+        @rtype:  str
+        @return: Output text of the paragraph. Empty if no words were
+            collected.
+        """
+        if not self.paragraph:
+            return ''
+        lines = justify(self.paragraph, self.line_length)
+        lines.append('')
+        text = self.paragraph_prefix + '\n'.join(lines)
+        self.paragraph = []
+        self.paragraph_prefix = ''
+        return text
+
     def _parse_structural_markup(self, line, state):
         """Process lines of structural markup.
         @type  line: str
@@ -101,38 +289,160 @@ class _TextStrategyCompiler(BaseStrategyCompiler):
         @rtype:  str
         @return: Line after structural markup changes are applied.
         """
+        return self._replace_markup_token(line, state).strip()
+
+    def _render(self, line, state):
+        """Format a line and wrap it to the maximum line length.
+        @type  line: str
+        @param line: Proze formatted line to be written to the document.
+        @type  state: lib.state.State
+        @param state: Formatting state of the current line of text.
+        @rtype:  str
+        @return: Output text ending in a line break. Empty if the line
+            doesn't produce any output.
+        """
+        if self.justified:
+            return self._render_justified(line, state)
+        if state.is_blank:
+            return ''
+        if state.is_continued or self.wrapping is not None:
+            return self._render_piece(line, state)
+        lines = self._split_on_line_length(self._format(line, state))
+        lines.append('')
+        return '\n'.join(lines)
+
+    def _render_justified(self, line, state):
+        """Collect lines of proze into a paragraph to be justified.
+        The paragraph is laid out once a blank line, a line of structural
+        markup, or the start of a new paragraph is found.
+
+        @type  line: str
+        @param line: Proze formatted line to be written to the document.
+        @type  state: lib.state.State
+        @param state: Formatting state of the current line of text.
+        @rtype:  str
+        @return: Output text ending in a line break. Empty if the line
+            doesn't produce any output yet.
+        """
+        if self.wrapping is not None:
+            return self._render_piece(line, state)
+        if self.held is not None:
+            # The next piece of a long line of proze.
+            line = self.held + line
+            self.held = None
+            if state.is_continued:
+                line, self.held = self._hold_back_word(line)
+            line = self._strip_bold_italics(whitespace.sub(' ', line))
+            self.paragraph.extend(line.split())
+            return ''
+        text = ''
+        if (
+            state.is_blank or
+            state.markup.is_markup_line or
+            state.previous_line.is_blank or
+            state.previous_line.is_structural_markup
+        ):
+            text = self._layout_paragraph()
+        if state.is_blank:
+            return text
+        if state.markup.is_markup_line:
+            if state.is_continued:
+                return text + self._render_piece(line, state)
+            lines = self._split_on_line_length(self._format(line, state))
+            lines.append('')
+            return text + '\n'.join(lines)
+        if not self.paragraph:
+            # Paragraphs aren't indented, so separate them with a blank line.
+            self.paragraph_prefix = self._blank_lines(state) or '\n'
+        if state.is_continued:
+            line, self.held = self._hold_back_word(line)
+        line = self._strip_bold_italics(self.rules.clean_whitespace(line))
+        self.paragraph.extend(line.split())
+        return text
+
+    def _render_piece(self, line, state):
+        """Format and wrap the next piece of a line that is too long to be
+        read at once.
+        Output lines are only split off once the text that decides where
+        they break is known, so the output is the same as for the whole
+        line while at most a piece of it is held in memory.
+
+        @type  line: str
+        @param line: Piece of a proze formatted line.
+        @type  state: lib.state.State or lib.state.LineState
+        @param state: Formatting state of the line of text.
+        @rtype:  str
+        @return: Output text ending in a line break. Empty if no output line
+            is complete yet.
+        """
+        if self.held is not None:
+            line = self.held + line
+            self.held = None
+        if state.is_continued:
+            line, self.held = self._hold_back(line)
+        is_markup_line = state.markup.is_markup_line
+        if self.wrapping is None:
+            self.wrapping = self._blank_lines(state)
+            if not is_markup_line:
+                self.wrapping = self.wrapping + self.rules.first_character(
+                    state, use_spaces=True
+                )
+            self.is_leading = True
+        if is_markup_line:
+            line = self._replace_markup_token(whitespace.sub(' ', line), state)
+            if self.is_leading:
+                line = line.lstrip()
+        elif self.is_leading:
+            line = line.lstrip()
+        if not state.is_continued:
+            line = line.rstrip()
+        if line:
+            self.is_leading = False
+        if not is_markup_line:
+            line = self._strip_bold_italics(whitespace.sub(' ', line))
+        text = self.wrapping + line
+        if not state.is_continued:
+            if is_markup_line:
+                text = text.rstrip(' ')
+            self.wrapping = None
+            lines = self._split_on_line_length(text)
+            lines.append('')
+            return '\n'.join(lines)
+        # Trailing whitespace may still be stripped, so it can't decide
+        # where a line breaks yet.
+        decided = text.rstrip()
+        lines = self._split_on_line_length(decided)
+        self.wrapping = text[len(decided) - len(lines[-1]):]
+        lines[-1] = ''
+        return '\n'.join(lines)
+
+    def _replace_markup_token(self, line, state):
+        """Replace the structural markup token of a line.
+        @type  line: str
+        @param line: Proze formatted line, or a piece of one.
+        @type  state: lib.state.State
+        @param state: Formatting state of the current line of text.
+        @rtype:  str
+        @return: Line after the token is replaced.
+        """
         if state.markup.token == MarkupToken.author:
             line = re.sub(state.markup.token, 'by', line, flags=re.I)
         elif state.markup.token == MarkupToken.chapter:
             line = re.sub(state.markup.token, '', line, flags=re.I)
         elif state.markup.token == MarkupToken.section:
             line = re.sub(state.markup.token, '', line, flags=re.I)
-        elif state.markup.token == MarkupToken.section_break:
-            line = line.strip()
         elif state.markup.token == MarkupToken.title:
             line = re.sub(state.markup.token, '', line, flags=re.I)
-        return line.strip()
+        return line
 
     def _split_on_line_length(self, line):
-        """Split into multiple lines if longer than MAX_LINE_LENGTH.
+        """Split into multiple lines if longer than the line length.
         @type  line: str:
         @param line: Text to be split.
         @rtype:  list
         @return: Split line.
         """
-        lines = []
-        curr = line
-        while len(curr) > MAX_LINE_LENGTH:
-            index = MAX_LINE_LENGTH
-            while curr[index] not in [' ', '-'] and index >= 0:
-                index -= 1
-            if index == 0:
-                # Force a hard mid-word split for really long words.
-                index = MAX_LINE_LENGTH
-            lines.append(curr[0:index])
-            curr = curr[index+1:]
-        lines.append(curr)
-        return lines
+        return split_on_line_length(line, self.line_length)
 
     def _strip_bold_italics(self, line):
         """Remove bold and italic markup.
@@ -145,15 +455,49 @@ class _TextStrategyCompiler(BaseStrategyCompiler):
         line = re.sub('__', '', line)
         return line
 
+    def write_fragment(self, fragment):
+        """Write output already compiled by another compiler.
+        @type  fragment: str
+        @param fragment: Output of a text compiler that wrote to a stream.
+        """
+        self.flush()
+        self.handle.write(fragment)
+
     def write(self, line, state):
         """Write a line of text to the output document.
         @type  line: str
         @param line: Formatted line to be written to the document.
-        @type  state: lib.state.State
+        @type  state: lib.state.State or lib.state.LineState
         @param state: Formatting state of the current line of text.
         """
-        if not state.is_blank:
-            line = self._format(line, state)
-            lines = self._split_on_line_length(line)
-            for partial in lines:
-                self.handle.write(partial + '\n')
+        text = self._render(line, state)
+        if text:
+            self.buffer.append(text)
+            self.buffered = self.buffered + len(text)
+            if self.buffered >= self.buffer_size:
+                self.flush()
+
+    def write_many(self, lines, states):
+        """Write a batch of lines to the output document.
+        Lines and states are consumed in step, so a generator of lines can
+        be paired with the live state object, e.g. itertools.repeat(state).
+
+        @type  lines: iterable
+        @param lines: Formatted lines to be written to the document.
+        @type  states: iterable
+        @param states: Formatting state of each line of text.
+        """
+        buffer = self.buffer
+        buffer_size = self.buffer_size
+        buffered = self.buffered
+        render = self._render
+        for line, state in zip(lines, states):
+            text = render(line, state)
+            if text:
+                buffer.append(text)
+                buffered = buffered + len(text)
+                if buffered >= buffer_size:
+                    self.handle.write(''.join(buffer))
+                    buffer.clear()
+                    buffered = 0
+        self.buffered = buffered
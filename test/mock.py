@@ -3,9 +3,17 @@ class MockArgs(object):
     """Mock for command line args."""
 
     def __init__(self, **kwargs):
+        self.cache = kwargs.get('cache', False)
+        self.chapters = kwargs.get('chapters')
         self.doctype = kwargs.get('doctype')
+        self.file = kwargs.get('file')
+        self.jobs = kwargs.get('jobs', 1)
+        self.memory_report = kwargs.get('memory_report', False)
         self.output = kwargs.get('output')
         self.path = kwargs.get('path')
+        self.pipeline = kwargs.get('pipeline', False)
+        self.profile = kwargs.get('profile', False)
+        self.trace = kwargs.get('trace')
 
 
 class NameOptions(object):
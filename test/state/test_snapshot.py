@@ -0,0 +1,88 @@
+from lib.state import State, StateSnapshot
+from strategy.text import TextStrategy
+from types import SimpleNamespace
+import io
+import json
+import lib.config
+import pickle
+import unittest
+
+lines = [
+    'Chapter: One\n',
+    '\n',
+    '    An *indented\n',
+    '\n',
+    '        quote that__ goes\n',
+    '\n',
+    '    back out.\n',
+]
+
+
+class TestStateSnapshot(unittest.TestCase):
+
+    """Tests for saving and restoring the state."""
+
+    def updated_state(self):
+        """State after every line of the sample."""
+        state = State()
+        for line in lines:
+            state.update(line)
+        return state
+
+    def test_no_instance_dict(self):
+        """State objects use slots."""
+        state = State()
+        for value in [state, state.markup, state.previous_line]:
+            self.assertFalse(hasattr(value, '__dict__'))
+        with self.assertRaises(AttributeError):
+            state.is_chapter = True
+
+    def test_pickle_and_json(self):
+        """A snapshot survives pickling and a round trip to JSON."""
+        state = self.updated_state()
+        snapshot = state.snapshot()
+        self.assertIsInstance(snapshot, StateSnapshot)
+        self.assertEqual(snapshot.indent_lengths, (4,))
+        self.assertEqual(pickle.loads(pickle.dumps(snapshot)), snapshot)
+        unpickled = pickle.loads(pickle.dumps(state))
+        self.assertEqual(unpickled.snapshot(), snapshot)
+        restored = State()
+        restored.restore(json.loads(json.dumps(snapshot)))
+        self.assertEqual(restored.snapshot(), snapshot)
+        for line in ['\n', 'Not indented.\n']:
+            state.update(line)
+            restored.update(line)
+        self.assertEqual(restored.snapshot(), state.snapshot())
+        self.assertEqual(state.indent_level, 0)
+
+    def test_snapshot_in_place_of_state(self):
+        """Strategies give the same output for a snapshot and the state."""
+        args = SimpleNamespace(path='test/sample/dark-and-story')
+        strategy = TextStrategy(lib.config.load(args))
+        outputs = []
+        for use_snapshot in [False, True]:
+            output = io.StringIO()
+            state = State()
+            with strategy.compile(output) as compiler:
+                for line in lines:
+                    state.update(line)
+                    compiler.write(
+                        line, state.snapshot() if use_snapshot else state
+                    )
+            outputs.append(output.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertTrue(outputs[0])
+
+    def test_line_state(self):
+        """Lines with the same formatting values share a record."""
+        state = State()
+        records = []
+        lines = ['Chapter: One\n', '\n', 'First.\n', '\n', 'Next.\n', '\n']
+        for line in lines:
+            state.update(line)
+            records.append(state.line_state())
+        self.assertEqual(records[0].markup.token, 'chapter:')
+        self.assertTrue(records[2].is_first_paragraph)
+        self.assertFalse(records[4].is_first_paragraph)
+        self.assertIs(records[3], records[5])
+        self.assertTrue(records[4].previous_line.is_blank)
@@ -335,6 +335,27 @@ class TestBlocks(unittest.TestCase):
             blocks.reset()
             self.assertEqual(blocks.remove(line[0]), line[1])
 
+    def test_line_comment_at_start_hides_brackets(self):
+        """A line comment at the start of the text hides later tokens."""
+        lines = [
+            [
+                '## hidden [ bracket ] hidden',
+                '',
+            ],
+            [
+                '[ hidden ]## hidden [ bracket ] hidden',
+                '',
+            ],
+            [
+                '### hidden [ bracket ] hidden ### efg',
+                ' efg',
+            ],
+        ]
+        blocks = Blocks()
+        for line in lines:
+            blocks.reset()
+            self.assertEqual(blocks.remove(line[0]), line[1])
+
     def test_line_comment_token(self):
         """Normal usage of a line comment token."""
         lines = [
@@ -360,6 +381,15 @@ class TestBlocks(unittest.TestCase):
             blocks.reset()
             self.assertEqual(blocks.remove(line[0]), line[1])
 
+    def test_line_comment_continued(self):
+        """A line comment hides the later pieces of a long line."""
+        blocks = Blocks()
+        self.assertEqual(blocks.remove('abcd ## hidden '), 'abcd ')
+        self.assertEqual(blocks.remove_continued('[ still hidden '), '')
+        self.assertEqual(blocks.remove('efg [hidden] '), 'efg  ')
+        self.assertEqual(blocks.remove_continued('hij [hidden'), 'hij ')
+        self.assertEqual(blocks.remove_continued(' still] klm'), ' klm')
+
     def test_multiple_brackets_per_line(self):
         """Lines that have multiple blocks."""
         lines = [
@@ -381,6 +411,15 @@ class TestBlocks(unittest.TestCase):
             blocks.reset()
             self.assertEqual(blocks.remove(line[0]), line[1])
 
+    def test_many_blocks_per_line(self):
+        """A long line densely packed with blocks."""
+        line = 'a [ b ] c ### d ### e \\[ f ' * 500
+        expected = 'a  c  e \\[ f ' * 500
+        blocks = Blocks()
+        self.assertEqual(blocks.remove(line), expected)
+        self.assertFalse(blocks.in_bracket_block)
+        self.assertFalse(blocks.in_comment_block)
+
     def test_multiple_comment_blocks(self):
         """Lines that have multiple block comments."""
         lines = [
@@ -0,0 +1,113 @@
+from lib.cache import FileHashes, FragmentCache
+from test.mock import MockArgs
+import lib.config
+import os
+import proze
+import shutil
+import tempfile
+import unittest
+
+no_heading = 'test/sample/no-heading'
+pumpkins = 'test/sample/pumpkins'
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    """Tests for caching compiled fragments between runs."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.project = os.path.join(self.tmp, 'project')
+        shutil.copytree(pumpkins, self.project)
+        self.output = os.path.join(self.tmp, 'out', 'output')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def compile(self, **kwargs):
+        """Compile the project and return the generated text."""
+        args = MockArgs(
+            doctype='txt',
+            output=self.output,
+            path=self.project,
+            **kwargs
+        )
+        proze.run(args)
+        with open(self.output + '.txt', 'rb') as f:
+            return f.read()
+
+    def test_cached_output_matches(self):
+        """Compiling with a warm cache gives identical output."""
+        expected = self.compile()
+        self.assertEqual(self.compile(cache=True), expected)
+        cache_dir = os.path.join(self.project, '.proze-cache')
+        self.assertTrue(os.path.isdir(cache_dir))
+        self.assertEqual(self.compile(cache=True), expected)
+        self.assertEqual(self.compile(cache=True, jobs=2), expected)
+
+    def test_changed_file_recompiled(self):
+        """A modified proze file isn't served from the cache."""
+        self.compile(cache=True)
+        path = os.path.join(self.project, 'pumpkins.proze')
+        with open(path, 'a') as f:
+            f.write('\nA brand new closing paragraph.\n')
+        expected = self.compile()
+        self.assertIn(b'A brand new closing paragraph.', expected)
+        self.assertEqual(self.compile(cache=True), expected)
+
+    def test_heading_before_file_recompiled(self):
+        """A file isn't served from the cache once the file before it
+        starts or stops ending in a heading.
+        """
+        shutil.rmtree(self.project)
+        shutil.copytree(no_heading, self.project)
+        for jobs in [1, 2]:
+            self.compile(cache=True, jobs=jobs)
+            with open(os.path.join(self.project, 'a.proze'), 'a') as f:
+                f.write('\nChapter: Two\n')
+            expected = self.compile()
+            self.assertIn(b'\n\n\nMore prose here.', expected)
+            self.assertEqual(self.compile(cache=True, jobs=jobs), expected)
+            with open(os.path.join(self.project, 'a.proze'), 'w') as f:
+                f.write('Chapter: One\n\nFirst para.\n')
+            expected = self.compile()
+            self.assertIn(b'\n    More prose here.', expected)
+            self.assertEqual(self.compile(cache=True, jobs=jobs), expected)
+
+    def test_line_length_change_recompiled(self):
+        """Fragments cached at another line length aren't reused."""
+        self.compile(cache=True)
+        with open(os.path.join(self.project, 'config.yml'), 'w') as f:
+            f.write('compile:\n  lineLength: 39\n')
+        expected = self.compile()
+        lengths = [len(line) for line in expected.splitlines()]
+        self.assertLessEqual(max(lengths), 39)
+        self.assertEqual(self.compile(cache=True), expected)
+
+    def test_hash_reused_when_unchanged(self):
+        """Content isn't rehashed if mtime and size match."""
+        hashes = FileHashes(self.project)
+        digest = hashes.get('pumpkins.proze')
+        hashes.records['pumpkins.proze'][2] = 'sentinel'
+        self.assertEqual(hashes.get('pumpkins.proze'), 'sentinel')
+        os.utime(os.path.join(self.project, 'pumpkins.proze'), ns=(0, 0))
+        self.assertEqual(hashes.get('pumpkins.proze'), digest)
+        self.assertIsNone(hashes.get('missing.proze'))
+
+    def test_lru_eviction(self):
+        """Least recently used fragments are evicted over the size limit."""
+        for name in ['a.proze', 'b.proze', 'c.proze']:
+            with open(os.path.join(self.project, name), 'w') as f:
+                f.write(name)
+        options = lib.config.load(MockArgs(path=self.project))
+        cache = FragmentCache(self.project, 'txt', options, max_bytes=120)
+        cache.put('a.proze', True, 'a' * 40, '', False)
+        cache.put('b.proze', True, 'b' * 40, '', False)
+        self.assertIsNotNone(cache.get('a.proze', True))
+        cache.put('c.proze', True, 'c' * 40, '', False)
+        cache.save()
+        cache = FragmentCache(self.project, 'txt', options, max_bytes=120)
+        self.assertEqual(cache.get('a.proze', True), ('a' * 40, '', False))
+        self.assertIsNone(cache.get('b.proze', True))
+        self.assertEqual(cache.get('c.proze', True), ('c' * 40, '', False))
+        self.assertIsNone(cache.get('c.proze', False))
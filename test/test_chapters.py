@@ -0,0 +1,177 @@
+from lib.chapters import ChapterIndex, Segment
+from lib.cli import chapter_numbers
+from test.mock import MockArgs
+from types import SimpleNamespace
+import argparse
+import contextlib
+import io
+import lib.cli
+import os
+import proze
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+config = '''---
+compile:
+  order:
+    - title.proze
+    - book.proze
+    - epilogue.proze
+'''
+
+title = '''Title: Chapters
+Author: Mary Sue
+'''
+
+book = '''Chapter: One
+
+The *first chapter
+goes on* and on. [A note that
+spans lines.]
+
+    An indented quote.
+
+Chapter: Two
+
+### A block comment
+Chapter: Hidden
+###
+
+Section: Part A
+
+The second chapter ## with a comment
+
+---
+
+More of __the second
+chapter__.
+
+Chapter: Three
+
+Third.
+'''
+
+epilogue = '''Still the third chapter.
+
+Chapter: Four
+
+The end.
+'''
+
+
+class TestChapterIndex(unittest.TestCase):
+
+    """Tests for compiling selected chapters from byte offsets."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.project = os.path.join(self.tmp, 'project')
+        os.makedirs(self.project)
+        files = {
+            'config.yml': config,
+            'title.proze': title,
+            'book.proze': book,
+            'epilogue.proze': epilogue,
+        }
+        for filename, text in files.items():
+            with open(os.path.join(self.project, filename), 'w') as f:
+                f.write(text)
+        self.output = os.path.join(self.tmp, 'out', 'output')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def compile(self, **kwargs):
+        """Compile the project and return the generated text."""
+        args = MockArgs(
+            doctype='txt',
+            output=self.output,
+            path=self.project,
+            **kwargs
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            proze.run(args)
+        with open(self.output + '.txt', 'r') as f:
+            return f.read()
+
+    def test_chapter_numbers(self):
+        """Parse chapter selections from the command line."""
+        self.assertEqual(chapter_numbers('3'), [3])
+        self.assertEqual(chapter_numbers('12-15'), [12, 13, 14, 15])
+        self.assertEqual(chapter_numbers('4,1-2,2'), [1, 2, 4])
+        for value in ['', 'a', '0', '3-1', '1-']:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                chapter_numbers(value)
+
+    def test_chapters_reject_cache_and_jobs(self):
+        """Selections can't be combined with --cache or --jobs."""
+        for extra in [['--cache'], ['--jobs', '2']]:
+            argv = ['proze.py', 'txt', '--chapters', '1'] + extra
+            with unittest.mock.patch('sys.argv', argv):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    with self.assertRaises(SystemExit):
+                        lib.cli.parse()
+
+    def test_chapters_match_full_compile(self):
+        """Each chapter compiles to the same text as in the full document."""
+        full = self.compile()
+        chapters = [self.compile(chapters=[n]) for n in range(1, 5)]
+        self.assertTrue(all(chapters))
+        self.assertTrue(full.endswith(''.join(chapters)))
+        self.assertIn('Still the third chapter.', chapters[2])
+        self.assertNotIn('Hidden', ''.join(chapters))
+        self.assertEqual(
+            self.compile(chapters=[2, 3]), chapters[1] + chapters[2]
+        )
+        self.assertEqual(self.compile(chapters=[9]), '')
+
+    def test_open_segment(self):
+        """Only the bytes of a segment are read, as text."""
+        path = os.path.join(self.tmp, 'segment.proze')
+        with open(path, 'wb') as f:
+            text = 'Before.\nCaf\u00e9 one.\nCaf\u00e9 two.\nAfter.\n'
+            f.write(text.encode('utf-8'))
+        marker = SimpleNamespace(offset=8)
+        segment = Segment('segment.proze', marker, 30)
+        with proze.open_segment(path, segment) as proze_file:
+            self.assertEqual(proze_file.readline(4), 'Caf\u00e9')
+            self.assertEqual(
+                proze_file.read(), ' one.\nCaf\u00e9 two.\n'
+            )
+        segment = Segment('segment.proze', marker, None)
+        with proze.open_segment(path, segment) as proze_file:
+            self.assertTrue(proze_file.read().endswith('After.\n'))
+
+    def test_file_selection(self):
+        """Only the selected files are compiled."""
+        self.assertEqual(
+            self.compile(file=['epilogue.proze']),
+            self.compile(file=['epilogue.proze', 'nope.proze'])
+        )
+        self.assertEqual(
+            self.compile(chapters=[3, 4], file=['epilogue.proze']),
+            self.compile(file=['epilogue.proze'])
+        )
+        self.assertNotIn('Still', self.compile(chapters=[4]))
+
+    def test_index_invalidated(self):
+        """Markers are found again when a file changes."""
+        index = ChapterIndex(self.project)
+        order = ['title.proze', 'book.proze', 'epilogue.proze']
+        titles = [marker.title for marker in index.chapters(order)]
+        self.assertEqual(titles, ['One', 'Two', 'Three', 'Four'])
+        index.save()
+        with open(os.path.join(self.project, 'title.proze'), 'a') as f:
+            f.write('\nChapter: Zero\n')
+        index = ChapterIndex(self.project)
+        self.assertFalse(index.changed)
+        titles = [marker.title for marker in index.chapters(order)]
+        self.assertEqual(titles, ['Zero', 'One', 'Two', 'Three', 'Four'])
+        self.assertTrue(index.changed)
+        sections = [
+            marker.title for marker in index.markers('book.proze')
+            if marker.token == 'section:'
+        ]
+        self.assertEqual(sections, ['Part A'])
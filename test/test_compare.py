@@ -0,0 +1,79 @@
+from bench.compare import compare, main, mismatches
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+def run(calibration, **stages):
+    """Benchmark results with the given samples per stage."""
+    return {
+        'calibration': calibration,
+        'stages': {
+            name: {'samples': samples} for name, samples in stages.items()
+        },
+    }
+
+
+class TestCompare(unittest.TestCase):
+
+    """Tests for comparing benchmark runs against a baseline."""
+
+    def test_noise_is_not_a_regression(self):
+        """A higher median with overlapping samples passes."""
+        baseline = run(1.0, blocks=[1.0, 1.0, 1.1, 1.2, 2.0])
+        results = run(1.0, blocks=[1.0, 1.1, 1.4, 1.5, 1.6])
+        name, change, slower = compare(baseline, results)[0]
+        self.assertAlmostEqual(change, 0.3 / 1.1)
+        self.assertFalse(slower)
+
+    def test_regression(self):
+        """A clearly slower stage fails, other stages pass."""
+        baseline = run(
+            1.0, blocks=[1.0, 1.0, 1.1, 1.0, 0.9], wrap=[2.0, 2.1, 1.9]
+        )
+        results = run(
+            1.0, blocks=[3.0, 3.1, 2.9, 3.0, 3.0], wrap=[2.0, 2.0, 2.0],
+            extra=[1.0]
+        )
+        compared = compare(baseline, results)
+        self.assertEqual([c[0] for c in compared], ['blocks', 'wrap'])
+        self.assertTrue(compared[0][2])
+        self.assertAlmostEqual(compared[0][1], 2.0)
+        self.assertFalse(compared[1][2])
+        self.assertFalse(compare(baseline, results, threshold=3)[0][2])
+
+    def test_slower_machine(self):
+        """Results are scaled by the calibration time."""
+        baseline = run(1.0, blocks=[1.0, 1.0, 1.1, 1.0, 0.9])
+        results = run(2.0, blocks=[2.0, 2.0, 2.2, 2.0, 1.8])
+        name, change, slower = compare(baseline, results)[0]
+        self.assertAlmostEqual(change, 0.0)
+        self.assertFalse(slower)
+
+    def test_mismatched_runs(self):
+        """Runs of another version or spec aren't compared."""
+        baseline = run(1.0, blocks=[1.0])
+        baseline.update(version=1, spec={'seed': 1, 'files': 20})
+        results = run(1.0, blocks=[1.0])
+        results.update(version=1, spec={'seed': 2, 'files': 20})
+        self.assertEqual(mismatches(baseline, baseline), [])
+        self.assertEqual(mismatches(baseline, results), ['spec'])
+        results['version'] = 2
+        self.assertEqual(mismatches(baseline, results), ['version', 'spec'])
+        folder = tempfile.mkdtemp()
+        paths = []
+        for name, data in [('baseline', baseline), ('results', results)]:
+            paths.append(os.path.join(folder, name + '.json'))
+            with open(paths[-1], 'w') as f:
+                json.dump(data, f)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            status = main(['--baseline', paths[0], paths[1]])
+        self.assertEqual(status, 2)
+        self.assertIn('different version, spec', output.getvalue())
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(['--baseline', paths[0], paths[0]]), 0)
+        shutil.rmtree(folder)
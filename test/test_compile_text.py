@@ -14,6 +14,8 @@ dark_and_stormy = Case(
 )
 feelings = Case('test/sample/feelings', '')
 missing = Case('test/sample/missing_data', '')
+# Files after the first don't start with a heading.
+no_heading = Case('test/sample/no-heading', '')
 no_data = Case('test/sample/no_data', '')
 pumpkins = Case(
     'test/sample/pumpkins',
@@ -81,6 +83,81 @@ class TestCompileText(unittest.TestCase):
         for i in range(0, len(expected_lines)):
             self.assertEqual(generated_lines[i], expected_lines[i])
 
+    def test_compile_iter(self):
+        """The streaming API generates the same text as a compile."""
+        for case in [dark_and_stormy, feelings, pumpkins]:
+            args = MockArgs(
+                doctype='txt',
+                output=OUTPUT_PATH[:-4],
+                path=case.root_path
+            )
+            proze.run(args)
+            with open(OUTPUT_PATH, 'r') as f:
+                expected = f.read()
+            chunks = proze.compile_iter(case.root_path, 'txt')
+            self.assertEqual(''.join(chunks), expected)
+
+    def test_compile_iter_is_lazy(self):
+        """Output is generated before later files are read."""
+        chunks = proze.compile_iter(dark_and_stormy.root_path, 'txt')
+        self.assertEqual(next(chunks), 'A Dark and Story Night\n')
+        self.assertFalse(os.path.isfile(OUTPUT_PATH))
+        chunks.close()
+
+    def test_parallel_matches_serial(self):
+        """Compiling with a process pool gives byte-identical output."""
+        for case in [dark_and_stormy, feelings, no_heading, pumpkins]:
+            args = MockArgs(
+                doctype='txt',
+                output=OUTPUT_PATH[:-4],
+                path=case.root_path
+            )
+            proze.run(args)
+            with open(OUTPUT_PATH, 'rb') as f:
+                serial = f.read()
+            args.jobs = 3
+            proze.run(args)
+            with open(OUTPUT_PATH, 'rb') as f:
+                parallel = f.read()
+            self.assertEqual(parallel, serial)
+
+    def test_heading_carried_over(self):
+        """A file without a heading continues the chapter of the file
+        before it, and a heading at the end of a file starts the first
+        paragraph of the next one, however many jobs are used.
+        """
+        for jobs in [1, 3]:
+            args = MockArgs(
+                doctype='txt',
+                jobs=jobs,
+                output=OUTPUT_PATH[:-4],
+                path=no_heading.root_path
+            )
+            proze.run(args)
+            with open(OUTPUT_PATH, 'r') as f:
+                lines = f.read().splitlines()
+            self.assertIn('    More prose here.', lines)
+            self.assertIn('    Still the same chapter.', lines)
+            index = lines.index('Prose after a heading in another file.')
+            self.assertEqual(lines[index - 3:index], ['Two', '', ''])
+
+    def test_pipeline_matches_serial(self):
+        """Formatting in a separate process gives byte-identical output."""
+        for case in [dark_and_stormy, feelings, no_heading, pumpkins]:
+            args = MockArgs(
+                doctype='txt',
+                output=OUTPUT_PATH[:-4],
+                path=case.root_path
+            )
+            proze.run(args)
+            with open(OUTPUT_PATH, 'rb') as f:
+                serial = f.read()
+            args.pipeline = True
+            proze.run(args)
+            with open(OUTPUT_PATH, 'rb') as f:
+                pipelined = f.read()
+            self.assertEqual(pipelined, serial)
+
     def test_pumpkins(self):
         """Compile the pumpkins sample project."""
         args = MockArgs(
@@ -0,0 +1,95 @@
+from lib.concordance import Concordance, decode_lines, scan
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+dark_and_stormy = 'test/sample/dark-and-story'
+order = [
+    'title.proze',
+    'erased.proze',
+    'disaster.proze',
+    'flee.proze',
+    'reassurances.proze',
+    'awakening.proze',
+]
+
+
+class TestConcordance(unittest.TestCase):
+
+    """Tests for the persistent word index."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.project = os.path.join(self.tmp, 'project')
+        shutil.copytree(dark_and_stormy, self.project)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_chapters_carry_over_files(self):
+        """Lines before the first chapter of a file use the last chapter."""
+        with open(os.path.join(self.project, 'extra.proze'), 'w') as f:
+            f.write('Dallas kept walking.\n')
+        concordance = Concordance(self.project)
+        concordance.update(order + ['extra.proze'])
+        self.assertEqual(concordance.find('Dallas'), [
+            ('awakening.proze', 4, 'Awakening'),
+            ('awakening.proze', 6, 'Awakening'),
+            ('extra.proze', 1, 'Awakening'),
+        ])
+        self.assertEqual(concordance.chapters('dallas'), ['Awakening'])
+
+    def test_incremental_update(self):
+        """Only changed files are scanned again after the index is saved."""
+        concordance = Concordance(self.project)
+        self.assertEqual(concordance.update(order), order)
+        concordance.save()
+        concordance = Concordance(self.project)
+        self.assertEqual(concordance.update(order), [])
+        self.assertEqual(concordance.chapters('happenstance'), ['Erased'])
+        path = os.path.join(self.project, 'flee.proze')
+        with open(path, 'a') as f:
+            f.write('\nHappenstance Ridge was far behind them.\n')
+        self.assertEqual(concordance.update(order), ['flee.proze'])
+        self.assertEqual(
+            concordance.chapters('happenstance'),
+            ['Erased', 'Flee']
+        )
+        self.assertEqual(concordance.update(order[:-1]), [])
+        self.assertEqual(concordance.find('dallas'), [])
+
+    def test_scan_skips_hidden_text(self):
+        """Comments and brackets aren't indexed."""
+        entry = scan(io.StringIO(
+            'Chapter: One\n'
+            '\n'
+            'Dallas ran. ## Malachai watched.\n'
+            '[Malachai is hidden.] Dallas hid.\n'
+            '### Malachai\n'
+            'is in a block comment ###\n'
+            'dallas\n'
+        ))
+        self.assertEqual(entry['chapters'], [[1, 'One']])
+        self.assertNotIn('malachai', entry['words'])
+        self.assertEqual(entry['words']['dallas'], [3, 1, 3])
+        self.assertEqual(decode_lines(entry['words']['dallas']), [3, 4, 7])
+
+    def test_scan_skips_markup_tokens(self):
+        """Markup tokens aren't indexed, and words of any alphabet are
+        kept whole.
+        """
+        entry = scan(io.StringIO(
+            'Title: Zoë and the Café\n'
+            '\n'
+            'Chapter: Naïve\n'
+            '\n'
+            'The chapter title was naïve.\n'
+        ))
+        self.assertEqual(decode_lines(entry['words']['chapter']), [5])
+        self.assertEqual(decode_lines(entry['words']['title']), [5])
+        self.assertEqual(decode_lines(entry['words']['naïve']), [3, 5])
+        self.assertIn('zoë', entry['words'])
+        self.assertIn('café', entry['words'])
+        self.assertNotIn('caf', entry['words'])
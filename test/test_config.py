@@ -19,6 +19,7 @@ class TestConfigLoader(unittest.TestCase):
         self.assertTrue(options.compile.paragraph.tabFirst.section)
         self.assertTrue(options.compile.paragraph.removeBlankLines)
         self.assertEqual(options.compile.spacing, 'single')
+        self.assertEqual(options.compile.lineLength, 80)
 
     def test_names(self):
         """Test names loaded from config file."""
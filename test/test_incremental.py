@@ -0,0 +1,71 @@
+from lib.incremental import IncrementalParser
+import random
+import unittest
+
+paragraphs = [
+    'Plain proze.\n',
+    '\n',
+    'Some *italics\n',
+    'that wrap* lines.\n',
+    '__Bold starts\n',
+    '    An indented quote.\n',
+    '        Indented further.\n',
+    '### A comment block\n',
+    'ends here ###\n',
+    '[Brackets open\n',
+    'and close]\n',
+    'Chapter: Two\n',
+    'A line ## with a comment\n',
+    '---\n',
+]
+
+
+def render(line, state):
+    """Output that depends on every part of the state."""
+    return '{}|{}|{}|{}|{}|{}'.format(
+        line.rstrip('\n'),
+        state.is_bold,
+        state.is_italics,
+        state.indent_level,
+        state.is_first_paragraph,
+        state.markup.token,
+    )
+
+
+class TestIncrementalParser(unittest.TestCase):
+
+    """Tests for parsing again after an edit."""
+
+    def assertParsed(self, parser):
+        """The output matches parsing the whole file from scratch."""
+        fresh = IncrementalParser(render)
+        fresh.load(parser.lines)
+        self.assertEqual(parser.output, fresh.output)
+
+    def test_early_stop(self):
+        """Parsing stops at the next checkpoint if the state is unchanged."""
+        parser = IncrementalParser(render, interval=4)
+        parser.load(['Plain proze.\n', '\n'] * 50)
+        self.assertEqual(parser.edit(21, 22, ['Changed.\n']), (20, 24))
+        self.assertParsed(parser)
+        self.assertEqual(parser.edit(30, 30, ['### Open\n']), (28, 101))
+        self.assertParsed(parser)
+
+    def test_random_edits(self):
+        """Random edits give the same output as a full parse."""
+        rng = random.Random(7)
+        parser = IncrementalParser(render, interval=5)
+        parser.load([rng.choice(paragraphs) for _ in range(200)])
+        for _ in range(300):
+            start = rng.randrange(len(parser.lines) + 1)
+            end = min(len(parser.lines), start + rng.randrange(4))
+            lines = [rng.choice(paragraphs) for _ in range(rng.randrange(4))]
+            parser.edit(start, end, lines)
+            self.assertParsed(parser)
+        self.assertEqual(len(parser.output), len(parser.lines))
+
+    def test_empty_file(self):
+        """Lines can be added to an empty file."""
+        parser = IncrementalParser()
+        self.assertEqual(parser.edit(0, 0, ['[Hidden] Shown\n']), (0, 1))
+        self.assertEqual(parser.text(), ' Shown\n')
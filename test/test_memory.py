@@ -0,0 +1,198 @@
+from lib.blocks import Blocks
+from test.mock import MockArgs
+import contextlib
+import io
+import lib.cli
+import lib.config
+import os
+import proze
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+
+class TestMemory(unittest.TestCase):
+
+    """Tests for the memory report, and for compiling oversized lines in
+    pieces so memory use doesn't grow with the length of a line.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def compile(self, path, **kwargs):
+        """Compile a project and return the output.
+        @type  path: str
+        @param path: Path to the root folder of the project.
+        @rtype:  str
+        @return: Text of the output document.
+        """
+        args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'output'),
+            path=path,
+            **kwargs
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            proze.run(args)
+        with open(args.output + '.txt', 'r') as f:
+            return f.read()
+
+    def peak(self, size):
+        """Compile a project of one file that is a single line.
+        @type  size: int
+        @param size: Length of the line.
+        @rtype:  int
+        @return: Peak memory of the compile, in bytes.
+        """
+        path = os.path.join(self.tmp, 'project-{}'.format(size))
+        os.mkdir(path)
+        words = 'It was a __dark__ and *stormy* night [said Kelly] again '
+        with open(os.path.join(path, 'line.proze'), 'w') as f:
+            f.write((words * (size // len(words) + 1))[:size])
+        args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'output'),
+            path=path,
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            options = lib.config.load(args)
+            strategy = proze.determine_strategy(args, options)
+            with proze.create_memory_report() as memory_report:
+                proze.execute_strategy(strategy, args, options)
+        self.assertGreater(os.path.getsize(args.output + '.txt'), size // 2)
+        return memory_report.peak
+
+    def test_bounded_peak(self):
+        """Peak memory doesn't grow with the length of a line."""
+        small = self.peak(2 * 1000 * 1000)
+        large = self.peak(8 * 1000 * 1000)
+        self.assertLess(small, 4 * 1000 * 1000)
+        self.assertLess(large, 4 * 1000 * 1000)
+
+    def test_measures_exclusive(self):
+        """Only one of the ways of measuring a compile can be used."""
+        for flags in [
+            ['--memory-report', '--profile'],
+            ['--memory-report', '--trace', 'trace.json'],
+            ['--profile', '--trace', 'trace.json'],
+        ]:
+            with unittest.mock.patch('sys.argv', ['proze.py', 'txt'] + flags):
+                with contextlib.redirect_stderr(io.StringIO()) as errors:
+                    with self.assertRaises(SystemExit):
+                        lib.cli.parse()
+            self.assertIn('not allowed with argument', errors.getvalue())
+
+    def test_memory_report(self):
+        """The peak and the top allocation sites are printed, and the
+        output doesn't change.
+        """
+        remove = Blocks.remove
+        path = 'test/sample/dark-and-story'
+        expected = self.compile(path)
+        args = MockArgs(
+            doctype='txt',
+            memory_report=True,
+            output=os.path.join(self.tmp, 'output'),
+            path=path,
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as console:
+            proze.run(args)
+        with open(args.output + '.txt', 'r') as f:
+            self.assertEqual(f.read(), expected)
+        lines = console.getvalue().splitlines()
+        start = [line.startswith('Memory (') for line in lines].index(True)
+        self.assertEqual(lines[start + 1].split()[0], 'site')
+        self.assertGreater(len(lines), start + 2)
+        self.assertIs(Blocks.remove, remove)
+
+    def test_pieces_match_whole_lines(self):
+        """Compiling lines in small pieces gives the same output."""
+        path = 'test/sample/dark-and-story'
+        expected = self.compile(path)
+        piece_size = proze.PIECE_SIZE
+        proze.PIECE_SIZE = 16
+        try:
+            output = self.compile(path)
+        finally:
+            proze.PIECE_SIZE = piece_size
+        self.assertEqual(output, expected)
+
+    def test_justified_long_words(self):
+        """In justified mode, words longer than a piece are justified the
+        same as when the whole line is compiled.
+        """
+        path = os.path.join(self.tmp, 'project')
+        os.mkdir(path)
+        with open(os.path.join(path, 'config.yml'), 'w') as f:
+            f.write('compile:\n  lineLength: 20\n')
+            f.write('  paragraph:\n    mode: justified\n')
+        with open(os.path.join(path, 'line.proze'), 'w') as f:
+            f.write('Some words then ' + 'x' * 50 + ' and __bold__ *it* ')
+            f.write('averyveryverylongword ' * 3 + 'end.\n')
+        expected = self.compile(path)
+        self.assertIn('x' * 20 + '\n' + 'x' * 20 + '\n', expected)
+        piece_size = proze.PIECE_SIZE
+        for size in [7, 16, 23]:
+            proze.PIECE_SIZE = size
+            try:
+                output = self.compile(path)
+            finally:
+                proze.PIECE_SIZE = piece_size
+            self.assertEqual(output, expected)
+
+    def test_piece_boundaries(self):
+        """Names and bold tokens that span two pieces are found, and each
+        invalid name is reported once per line.
+        """
+        path = os.path.join(self.tmp, 'project')
+        os.mkdir(path)
+        with open(os.path.join(path, 'config.yml'), 'w') as f:
+            f.write('names:\n  invalid:\n    - Gerald\n')
+            f.write('    - cheddar castle\n')
+        with open(os.path.join(path, 'line.proze'), 'w') as f:
+            f.write('Gerald ate at the cheddar castle with Gerald. ' * 4)
+            f.write('\n\n' + 'a__b__c*d' * 10 + '\n')
+            f.write('\n' + 'x' * 20 + 'Gerald ' + 'wordGerald ' * 3 + '\n')
+        args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'output'),
+            path=path,
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as console:
+            proze.run(args)
+        with open(args.output + '.txt', 'r') as f:
+            expected = f.read()
+        piece_size = proze.PIECE_SIZE
+        for size in [7, 16, 23]:
+            proze.PIECE_SIZE = size
+            try:
+                with contextlib.redirect_stdout(io.StringIO()) as pieces:
+                    proze.run(args)
+            finally:
+                proze.PIECE_SIZE = piece_size
+            warnings = [
+                line for line in pieces.getvalue().splitlines()
+                if line.startswith('WARN')
+            ]
+            self.assertTrue(all('line.proze[1]' in w for w in warnings))
+            self.assertEqual(''.join(warnings).count("'Gerald'"), 1)
+            self.assertEqual(''.join(warnings).count("'cheddar castle'"), 1)
+            with open(args.output + '.txt', 'r') as f:
+                self.assertEqual(f.read(), expected)
+        self.assertIn('WARN', console.getvalue())
+
+    def test_split_piece(self):
+        """Pieces end after a space, or anywhere but after a '#', '_', '*'
+        or backslash.
+        """
+        self.assertEqual(proze.split_piece('abc def gh'), ('abc def ', 'gh'))
+        self.assertEqual(proze.split_piece('abcdef##'), ('abcdef', '##'))
+        self.assertEqual(proze.split_piece('abcdef\\'), ('abcdef', '\\'))
+        self.assertEqual(proze.split_piece('abc__'), ('abc', '__'))
+        self.assertEqual(proze.split_piece('abc*'), ('abc', '*'))
+        self.assertEqual(proze.split_piece('####'), ('####', ''))
@@ -70,3 +70,29 @@ class TestNames(unittest.TestCase):
         ]
         for line in lines:
             self.assertEqual(names.find_invalid(line[0]), line[1])
+
+    def test_invalid_multiple_words(self):
+        """Names with spaces or punctuation match on word boundaries."""
+        options = MockOptions()
+        options.names.invalid = ['cheddar castle', "O'Neil", 'Ann', 'Anna']
+        names = Names(options)
+        lines = [
+            [
+                'The Cheddar Castle was closed.',
+                ['cheddar castle'],
+            ],
+            [
+                'The cheddar castles were closed.',
+                [],
+            ],
+            [
+                "Anna o'neil waved.",
+                ["O'Neil", 'Anna'],
+            ],
+            [
+                'Annabel and Ann-Marie',
+                [],
+            ],
+        ]
+        for line in lines:
+            self.assertEqual(names.find_invalid(line[0]), line[1])
@@ -0,0 +1,73 @@
+from lib.blocks import Blocks
+from lib.outline import Heading, outline
+from lib.state import State
+import contextlib
+import glob
+import io
+import lib.cli
+import unittest
+import unittest.mock
+
+
+class TestOutline(unittest.TestCase):
+
+    """Tests for extracting structural markup without compiling."""
+
+    def test_markup_rules(self):
+        """Markup only counts after a blank line or other markup."""
+        proze_file = io.StringIO(
+            'Title: The Story\n'
+            'Author: Mary Sue\n'
+            '\n'
+            'Chapter: One\n'
+            'Chapter: not markup after a line of markup? It is.\n'
+            'Some proze.\n'
+            'Section: not markup after proze\n'
+            '\n'
+            '## Chapter: hidden in a comment\n'
+            '\n'
+            '[Section: hidden in brackets]\n'
+            '\n'
+            '  ---  \n'
+            '\n'
+            'section: Two\n'
+        )
+        self.assertEqual(list(outline('story.proze', proze_file)), [
+            Heading('story.proze', 1, 'title:', 'The Story'),
+            Heading('story.proze', 2, 'author:', 'Mary Sue'),
+            Heading('story.proze', 4, 'chapter:', 'One'),
+            Heading(
+                'story.proze', 5, 'chapter:',
+                'not markup after a line of markup? It is.'
+            ),
+            Heading('story.proze', 13, '---', ''),
+            Heading('story.proze', 15, 'section:', 'Two'),
+        ])
+
+    def test_matches_compile_state(self):
+        """Markup lines are the same ones found while compiling."""
+        for path in glob.glob('test/sample/**/*.proze', recursive=True):
+            blocks = Blocks()
+            state = State()
+            expected = []
+            with open(path, 'r') as proze_file:
+                for line_number, raw_line in enumerate(proze_file, 1):
+                    line = blocks.remove(raw_line)
+                    state.update(raw_line)
+                    if line and state.markup.is_markup_line:
+                        expected.append((line_number, state.markup.token))
+            with open(path, 'r') as proze_file:
+                found = [
+                    (heading.line_number, heading.token)
+                    for heading in outline(path, proze_file)
+                ]
+            self.assertEqual(found, expected, path)
+
+    def test_watch_rejected(self):
+        """The outline is printed once, so it can't be watched."""
+        argv = ['proze.py', 'outline', '--watch']
+        with unittest.mock.patch('sys.argv', argv):
+            with contextlib.redirect_stderr(io.StringIO()) as errors:
+                with self.assertRaises(SystemExit):
+                    lib.cli.parse()
+        self.assertIn('--watch can only be used with', errors.getvalue())
@@ -0,0 +1,115 @@
+from lib.pipeline import BackgroundWriter, PipelineCompiler, Prefetcher
+from lib.state import State
+from test.mock import MockArgs
+import contextlib
+import io
+import lib.config
+import os
+import proze
+import shutil
+import tempfile
+import unittest
+
+
+class TestPipeline(unittest.TestCase):
+
+    """Tests for the stages of the pipelined compile."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_background_writer(self):
+        """Chunks are written in order once the writer is closed."""
+        path = os.path.join(self.tmp, 'output.txt')
+        with BackgroundWriter(path, queue_size=2) as stream:
+            for number in range(100):
+                stream.write('{}\n'.format(number))
+        with open(path, 'r') as f:
+            self.assertEqual(f.read().split(), [str(n) for n in range(100)])
+
+    def test_background_writer_error(self):
+        """A failed write is raised by a later write instead of blocking
+        on the full queue.
+        """
+        path = os.path.join(self.tmp, 'output.txt')
+        with self.assertRaises(UnicodeEncodeError):
+            with BackgroundWriter(path, queue_size=1) as stream:
+                stream.write('\ud800')
+                for number in range(100):
+                    stream.write('{}\n'.format(number))
+
+    def test_missing_files(self):
+        """Missing files are reported the same way as a serial compile."""
+        args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'output'),
+            path='test/sample/missing_data',
+            pipeline=True,
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            proze.run(args)
+        self.assertEqual(output.getvalue().count('MISSING'), 3)
+        with open(args.output + '.txt', 'r') as f:
+            self.assertEqual(f.read(), '')
+
+    def test_prefetch_in_pieces(self):
+        """Only the start of each file is read ahead, and lines that run
+        past it are read in full.
+        """
+        path = os.path.join(self.tmp, 'file.proze')
+        text = 'A first line.\nA second line.\n\nEnd'
+        with open(path, 'w') as f:
+            f.write(text)
+        for size in range(len(text) + 2):
+            with Prefetcher([path], size=size) as reader:
+                with reader.open(path) as proze_file:
+                    lines = list(iter(proze_file.readline, ''))
+            self.assertEqual(lines, text.splitlines(True))
+            with Prefetcher([path], size=size) as reader:
+                with reader.open(path) as proze_file:
+                    pieces = list(iter(lambda: proze_file.readline(4), ''))
+            self.assertEqual(''.join(pieces), text)
+            self.assertTrue(all(len(piece) <= 4 for piece in pieces))
+
+    def test_prefetch_in_order(self):
+        """Files are opened in order, whatever order the reads finish in."""
+        paths = []
+        for number in range(10):
+            path = os.path.join(self.tmp, '{}.proze'.format(number))
+            with open(path, 'w') as f:
+                f.write('File {}\n'.format(number) * (10 - number) * 1000)
+            paths.append(path)
+        with Prefetcher(paths, depth=3) as reader:
+            for number, path in enumerate(paths):
+                with reader.open(path) as proze_file:
+                    self.assertEqual(
+                        proze_file.readline(), 'File {}\n'.format(number)
+                    )
+            with self.assertRaises(IndexError):
+                reader.open(paths[0])
+
+    def test_format_error(self):
+        """An error in the formatting process is raised in the parser
+        instead of blocking on the full queue.
+        """
+        output = os.path.join(self.tmp, 'output')
+        os.mkdir(output + '.txt')
+        args = MockArgs(
+            doctype='txt',
+            output=output,
+            path='test/sample/dark-and-story',
+            pipeline=True,
+        )
+        options = lib.config.load(args)
+        strategy = proze.determine_strategy(args, options)
+        with self.assertRaises(IsADirectoryError):
+            with PipelineCompiler(strategy, output + '.txt', batch_size=1,
+                                  queue_size=1) as compiler:
+                for _ in range(100):
+                    compiler.write('Line of text.', State())
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(IsADirectoryError):
+                proze.run(args)
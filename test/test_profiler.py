@@ -0,0 +1,77 @@
+from lib.blocks import Blocks
+from lib.state import State
+from test.mock import MockArgs
+import contextlib
+import io
+import lib.cli
+import os
+import proze
+import shutil
+import strategy.text
+import tempfile
+import unittest
+import unittest.mock
+
+
+class TestProfiler(unittest.TestCase):
+
+    """Tests for timing the stages of a compile."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def compile(self, profile):
+        """Compile the dark-and-stormy sample and return the console text
+        and the output document.
+        """
+        args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'output'),
+            path='test/sample/dark-and-story',
+            profile=profile,
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as console:
+            proze.run(args)
+        with open(args.output + '.txt', 'r') as f:
+            return console.getvalue(), f.read()
+
+    def test_profile(self):
+        """Every stage is counted and the output doesn't change."""
+        remove = Blocks.remove
+        update = State.update
+        _, expected = self.compile(False)
+        console, output = self.compile(True)
+        self.assertEqual(output, expected)
+        lines = console.splitlines()
+        start = [line.startswith('Profile (') for line in lines].index(True)
+        counts = {}
+        for line in lines[start + 1:]:
+            label, count = line[:48].strip(), line[48:58].strip()
+            counts[label] = count
+        self.assertEqual(counts['Blocks.remove'], counts['State.update'])
+        self.assertEqual(
+            counts['Blocks.remove'], counts['check_invalid_names']
+        )
+        self.assertIn('_TextStrategyCompiler._format', counts)
+        self.assertIn('_TextStrategyCompiler._split_on_line_length', counts)
+        self.assertEqual(counts['file open'], '6')
+        self.assertEqual(counts['output write'], '1')
+        self.assertEqual(counts['awakening.proze'], '6')
+        self.assertIs(Blocks.remove, remove)
+        self.assertIs(State.update, update)
+        self.assertNotIn('open', vars(strategy.text))
+
+    def test_profile_rejects_other_processes(self):
+        """Work done in other processes isn't counted, so --profile can't
+        be combined with options that compile in other processes.
+        """
+        for extra in [['--jobs', '2'], ['--jobs', '0'], ['--pipeline']]:
+            argv = ['proze.py', 'txt', '--profile'] + extra
+            with unittest.mock.patch('sys.argv', argv):
+                with contextlib.redirect_stderr(io.StringIO()) as errors:
+                    with self.assertRaises(SystemExit):
+                        lib.cli.parse()
+            self.assertIn('--profile', errors.getvalue())
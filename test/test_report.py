@@ -0,0 +1,139 @@
+from collections import Counter
+from test.mock import MockArgs, MockOptions
+from lib.report import NameReport
+from lib.spelling import BKTree, distance
+import contextlib
+import io
+import lib.config
+import proze
+import unittest
+
+
+class TestNameReport(unittest.TestCase):
+
+    """Tests for counting configured names in a proze project."""
+
+    def options(self):
+        options = MockOptions()
+        options.names.characters = ['Dallas', 'Kathy Jones', 'Winchester']
+        options.names.places = ['Tottle Town']
+        options.names.things = ['quick zapper']
+        return options
+
+    def test_counts_by_chapter(self):
+        """Names are counted separately in each chapter of a file."""
+        report = NameReport(self.options())
+        proze_file = io.StringIO(
+            'Chapter: One\n'
+            '\n'
+            'Dallas met Kathy Jones in Tottle Town.\n'
+            '## Dallas is hidden in a comment.\n'
+            '[Dallas is hidden in brackets.]\n'
+            '\n'
+            'Chapter: Two\n'
+            '\n'
+            'DALLAS used the quick zapper on dallas.\n'
+        )
+        report.scan('story.proze', proze_file)
+        self.assertEqual(report.counts, {
+            ('story.proze', 0, ''): Counter(),
+            ('story.proze', 1, 'One'): Counter({
+                'dallas': 1, 'kathy jones': 1, 'tottle town': 1,
+            }),
+            ('story.proze', 2, 'Two'): Counter({
+                'dallas': 2, 'quick zapper': 1,
+            }),
+        })
+
+    def test_markup_names_and_repeated_titles(self):
+        """Names in markup are counted, and chapters with the same title
+        are kept apart.
+        """
+        report = NameReport(self.options())
+        proze_file = io.StringIO(
+            'Title: Dallas in Tottle Town\n'
+            '\n'
+            'Chapter: Dallas\n'
+            '\n'
+            'Winchester waved.\n'
+            '\n'
+            'Chapter: Dallas\n'
+            '\n'
+            'Nobody waved.\n'
+        )
+        report.scan('story.proze', proze_file)
+        self.assertEqual(report.counts, {
+            ('story.proze', 0, ''): Counter({
+                'dallas': 1, 'tottle town': 1,
+            }),
+            ('story.proze', 1, 'Dallas'): Counter({
+                'dallas': 1, 'winchester': 1,
+            }),
+            ('story.proze', 2, 'Dallas'): Counter({'dallas': 1}),
+        })
+
+    def test_near_misses(self):
+        """Capitalized words close to a configured name are flagged."""
+        report = NameReport(self.options())
+        proze_file = io.StringIO(
+            'Then Dalas told Kathy Jomes about Winchster.\n'
+            'The Dallas that Tottle knew was a Mason.\n'
+        )
+        report.scan('story.proze', proze_file)
+        self.assertEqual(report.near_misses, [
+            ('story.proze', 1, 'Dalas', ['Dallas']),
+            ('story.proze', 1, 'Jomes', ['Jones']),
+            ('story.proze', 1, 'Winchster', ['Winchester']),
+        ])
+
+    def test_near_misses_skip_sentence_start(self):
+        """Words that start a sentence are capitalized anyway, so they
+        aren't flagged.
+        """
+        report = NameReport(self.options())
+        proze_file = io.StringIO(
+            'Dalas said so. Jomes agreed! "Quick, Dalas," she said.\n'
+            '\n'
+            'Chapter: Jomes\n'
+        )
+        report.scan('story.proze', proze_file)
+        self.assertEqual(report.near_misses, [
+            ('story.proze', 1, 'Dalas', ['Dallas']),
+        ])
+
+    def test_report_project(self):
+        """Scan every file of a project in compile order."""
+        args = MockArgs(doctype='report', path='test/sample/dark-and-story')
+        options = lib.config.load(args)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            report = proze.report_names(args, options)
+        self.assertEqual(
+            report.counts[('awakening.proze', 1, 'Awakening')],
+            Counter({'dallas': 2, 'jacob': 1, 'sally': 1})
+        )
+        self.assertEqual(
+            report.counts[('disaster.proze', 1, 'Disaster')],
+            Counter({'winchester mason': 1})
+        )
+        self.assertIn('  Tottle Town (places): 0', output.getvalue())
+
+
+class TestSpelling(unittest.TestCase):
+
+    """Tests for near-miss spelling lookups."""
+
+    def test_distance(self):
+        """Edit distance is bounded by the limit."""
+        self.assertEqual(distance('kitten', 'sitting', 5), 3)
+        self.assertEqual(distance('kitten', 'sitting', 2), 3)
+        self.assertEqual(distance('same', 'same', 1), 0)
+        self.assertEqual(distance('a', 'abcd', 1), 2)
+
+    def test_search(self):
+        """Only words within the tolerance are found, closest first."""
+        tree = BKTree(['dallas', 'sally', 'salla', 'jacob'])
+        self.assertEqual(tree.search('sallas', 1), [
+            (1, 'dallas'), (1, 'salla'),
+        ])
+        self.assertEqual(tree.search('jacob', 0), [(0, 'jacob')])
+        self.assertEqual(BKTree().search('jacob', 2), [])
@@ -53,8 +53,8 @@ class TestNames(unittest.TestCase):
         state = State()
         state.previous_line.is_blank = True
         state.is_first_paragraph = True
-        state.is_chapter = False
-        state.is_section = False
+        state.markup.is_chapter = False
+        state.markup.is_section = False
         self.assertEqual(rules.first_character(state), '')
         self.assertEqual(rules.first_character(state, use_spaces=True), '')
         rules.options.compile.paragraph.mode = 'justified'
@@ -67,8 +67,8 @@ class TestNames(unittest.TestCase):
         state = State()
         state.previous_line.is_blank = True
         state.is_first_paragraph = False
-        state.is_chapter = False
-        state.is_section = False
+        state.markup.is_chapter = False
+        state.markup.is_section = False
         self.assertEqual(rules.first_character(state), '\t')
         self.assertEqual(rules.first_character(state, use_spaces=True), '    ')
         rules.options.compile.paragraph.mode = 'justified'
@@ -81,8 +81,8 @@ class TestNames(unittest.TestCase):
         state = State()
         state.previous_line.is_blank = False
         state.is_first_paragraph = False
-        state.is_chapter = False
-        state.is_section = False
+        state.markup.is_chapter = False
+        state.markup.is_section = False
         self.assertEqual(rules.first_character(state), '')
         self.assertEqual(rules.first_character(state, use_spaces=True), '')
         rules.options.compile.paragraph.mode = 'justified'
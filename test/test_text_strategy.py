@@ -0,0 +1,160 @@
+from lib.state import State
+from strategy.text import TextStrategy, justify, split_on_line_length
+from test.mock import MockArgs
+import io
+import itertools
+import lib.config
+import unittest
+
+pumpkins = 'test/sample/pumpkins'
+
+
+class CountingStream(io.StringIO):
+
+    """In-memory stream that counts calls to write."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes = self.writes + 1
+        return super().write(text)
+
+
+class TestTextStrategy(unittest.TestCase):
+
+    """Tests for the plain text compiler."""
+
+    def setUp(self):
+        self.options = lib.config.load(MockArgs(path=pumpkins))
+
+    def compile_lines(self, lines, buffer_size):
+        """Compile lines of proze with the given buffer size."""
+        stream = CountingStream()
+        strategy = TextStrategy(self.options, buffer_size=buffer_size)
+        state = State()
+
+        def parse():
+            for line in lines:
+                state.update(line)
+                yield line
+
+        with strategy.compile(stream) as compiler:
+            compiler.write_many(parse(), itertools.repeat(state))
+        return stream
+
+    def test_buffered_writes(self):
+        """Output is collected and written in large chunks."""
+        lines = ['Chapter: One\n', '\n'] + [
+            'A short line of proze.\n', '\n'
+        ] * 100
+        unbuffered = self.compile_lines(lines, buffer_size=1)
+        buffered = self.compile_lines(lines, buffer_size=1024)
+        self.assertEqual(buffered.getvalue(), unbuffered.getvalue())
+        self.assertEqual(unbuffered.writes, 101)
+        self.assertLess(buffered.writes, 5)
+
+    def test_write_matches_write_many(self):
+        """Writing one line at a time gives the same output as a batch."""
+        lines = ['Title: Pumpkins\n', '\n', 'Some *proze* text.\n']
+        batch = self.compile_lines(lines, buffer_size=1024)
+        stream = io.StringIO()
+        state = State()
+        with TextStrategy(self.options).compile(stream) as compiler:
+            for line in lines:
+                state.update(line)
+                compiler.write(line, state)
+        self.assertEqual(stream.getvalue(), batch.getvalue())
+
+    def test_split_at_space_and_hyphen(self):
+        """Lines split at the last space or hyphen that fits."""
+        cases = [
+            ['short', 10, ['short']],
+            ['one two three four', 10, ['one two', 'three four']],
+            ['a well-known fact', 10, ['a well', 'known fact']],
+            ['abcdefghijklmnop', 5, ['abcde', 'fghij', 'klmno', 'p']],
+            [' abcdefghij', 5, [' abcd', 'efghi', 'j']],
+        ]
+        for line, width, expected in cases:
+            self.assertEqual(split_on_line_length(line, width), expected)
+
+    def test_split_long_paragraph(self):
+        """A long single line paragraph is split without losing words."""
+        words = ['word{}'.format(i) for i in range(20000)]
+        lines = split_on_line_length(' '.join(words), 80)
+        self.assertTrue(all(len(line) <= 80 for line in lines))
+        self.assertEqual(' '.join(lines).split(' '), words)
+
+    def test_line_length_option(self):
+        """The line length is read from the compile options."""
+        self.options = self.options._replace(
+            compile=self.options.compile._replace(lineLength=20)
+        )
+        stream = io.StringIO()
+        state = State()
+        line = 'A line of proze that is longer than twenty characters.'
+        with TextStrategy(self.options).compile(stream) as compiler:
+            state.update(line)
+            compiler.write(line, state)
+        self.assertEqual(
+            stream.getvalue(),
+            '\n\nA line of proze\nthat is longer than\ntwenty characters.\n'
+        )
+
+    def test_justify(self):
+        """Every line but the last is padded to the full width."""
+        words = 'aaa bb cc ddddd e ff gggg hh i jjjjjjj kk'.split()
+        lines = justify(words, 12)
+        self.assertEqual(lines, [
+            'aaa   bb  cc',
+            'ddddd  e  ff',
+            'gggg   hh  i',
+            'jjjjjjj kk',
+        ])
+
+    def test_justify_minimises_raggedness(self):
+        """Break points balance space across lines instead of greedily."""
+        words = 'aaa bb cc ddddd'.split()
+        self.assertEqual(justify(words, 6), ['aaa', 'bb  cc', 'ddddd'])
+
+    def test_justify_long_word(self):
+        """Words longer than the width are split."""
+        self.assertEqual(
+            justify(['abcdefgh', 'ij'], 5), ['abcde', 'fgh', 'ij']
+        )
+        self.assertEqual(justify([], 5), [])
+
+    def test_justify_long_paragraph(self):
+        """Long paragraphs are laid out without dropping words."""
+        words = ['w{}'.format(i % 97) * (1 + i % 3) for i in range(50000)]
+        lines = justify(words, 80)
+        self.assertTrue(all(len(line) == 80 for line in lines[:-1]))
+        self.assertEqual(' '.join(lines).split(), words)
+
+    def test_justified_paragraphs(self):
+        """Consecutive proze lines are joined into justified paragraphs."""
+        compiler = self.options.compile
+        self.options = self.options._replace(compile=compiler._replace(
+            lineLength=20,
+            paragraph=compiler.paragraph._replace(mode='justified')
+        ))
+        lines = [
+            'Title: Pumpkins\n',
+            '\n',
+            'The orange pumpkins\n',
+            'grew *quickly* in the\n',
+            'autumn sun.\n',
+            '\n',
+            'Then came the frost.\n',
+        ]
+        stream = self.compile_lines(lines, buffer_size=1024)
+        self.assertEqual(stream.getvalue(), (
+            'Pumpkins\n'
+            '\n\n'
+            'The  orange pumpkins\n'
+            'grew  quickly in the\n'
+            'autumn sun.\n'
+            '\n'
+            'Then came the frost.\n'
+        ))
@@ -0,0 +1,133 @@
+from lib.blocks import Blocks
+from lib.trace import Tracer
+from test.mock import MockArgs
+from types import SimpleNamespace
+import contextlib
+import io
+import json
+import lib.config
+import os
+import proze
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+
+class TestTrace(unittest.TestCase):
+
+    """Tests for recording a compile as Chrome trace events."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.trace_path = os.path.join(self.tmp, 'trace.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def compile(self, **kwargs):
+        """Compile the dark-and-stormy sample and return the output.
+        @rtype:  str
+        @return: Text of the output document.
+        """
+        args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'output'),
+            path='test/sample/dark-and-story',
+            **kwargs
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            proze.run(args)
+        with open(args.output + '.txt', 'r') as f:
+            return f.read()
+
+    def load(self):
+        """Load the spans of the trace file.
+        @rtype:  list
+        @return: Complete events in the trace.
+        """
+        with open(self.trace_path, 'r') as f:
+            trace = json.load(f)
+        return [e for e in trace['traceEvents'] if e['ph'] == 'X']
+
+    def order(self):
+        """Names of the proze files in compile order.
+        @rtype:  list
+        @return: File names.
+        """
+        args = MockArgs(path='test/sample/dark-and-story')
+        return lib.config.load(args).compile.order
+
+    def test_serial(self):
+        """Every file is a span with the time of its stages."""
+        remove = Blocks.remove
+        expected = self.compile()
+        self.assertEqual(self.compile(trace=self.trace_path), expected)
+        self.assertIs(Blocks.remove, remove)
+        self.assertFalse(os.path.exists(self.trace_path + '.parts'))
+        spans = self.load()
+        files = [e for e in spans if e['cat'] == 'file']
+        self.assertEqual([e['name'] for e in files], self.order())
+        self.assertEqual(files[-1]['args']['lines'], 6)
+        self.assertIn('Blocks.remove ms', files[-1]['args'])
+        for event in spans:
+            self.assertGreaterEqual(event['ts'], 0)
+            self.assertGreaterEqual(event['dur'], 0)
+        self.assertIn('output write', [e['name'] for e in spans])
+
+    def test_jobs(self):
+        """Files compiled in worker processes are traced on each worker."""
+        expected = self.compile()
+        self.assertEqual(
+            self.compile(jobs=2, trace=self.trace_path), expected
+        )
+        files = [e for e in self.load() if e['cat'] == 'file']
+        self.assertEqual(
+            sorted(e['name'] for e in files), sorted(self.order())
+        )
+        self.assertNotIn(os.getpid(), [e['pid'] for e in files])
+
+    def test_pipeline(self):
+        """Reading and formatting are traced on their own threads and
+        process.
+        """
+        expected = self.compile()
+        self.assertEqual(
+            self.compile(pipeline=True, trace=self.trace_path), expected
+        )
+        spans = self.load()
+        files = [e for e in spans if e['cat'] == 'file']
+        self.assertEqual([e['name'] for e in files], self.order())
+        pids = set(e['pid'] for e in spans if e['name'] == 'output write')
+        self.assertEqual(len(pids), 1)
+        self.assertNotIn(os.getpid(), pids)
+        reads = [e for e in spans if e['name'] == 'read_head']
+        self.assertEqual(len(reads), len(self.order()))
+
+    def test_other_threads_not_charged(self):
+        """Only time spent in the thread that opened a file is added to the
+        span of the file.
+        """
+        stage = SimpleNamespace(work=lambda: time.sleep(0.02))
+        path = 'test/sample/dark-and-story/title.proze'
+        tracer = Tracer(
+            self.trace_path,
+            [(stage, 'work', 'work')],
+            openers=[(proze, 'open_segment')],
+        )
+        with tracer:
+            with proze.open_segment(path):
+                thread = threading.Thread(target=stage.work)
+                thread.start()
+                stage.work()
+                thread.join()
+        spans = self.load()
+        files = [e for e in spans if e['cat'] == 'file']
+        works = [e for e in spans if e['name'] == 'work']
+        own = [e for e in works if e['tid'] == files[0]['tid']]
+        self.assertEqual(len(works), 2)
+        self.assertEqual(len(own), 1)
+        self.assertAlmostEqual(
+            files[0]['args']['work ms'], own[0]['dur'] / 1000, delta=0.001
+        )
@@ -0,0 +1,132 @@
+from lib.watch import Watcher
+from test.mock import MockArgs
+import contextlib
+import io
+import lib.cli
+import os
+import proze
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+dark_and_stormy = 'test/sample/dark-and-story'
+no_heading = 'test/sample/no-heading'
+
+
+class TestWatch(unittest.TestCase):
+
+    """Tests for recompiling changed files in watch mode."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.project = os.path.join(self.tmp, 'project')
+        shutil.copytree(dark_and_stormy, self.project)
+        self.args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'out', 'output'),
+            path=self.project
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def append(self, filename, text):
+        """Append text to a project file and bump its mtime."""
+        path = os.path.join(self.project, filename)
+        with open(path, 'a') as f:
+            f.write(text)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def read_output(self):
+        with open(self.args.output + '.txt', 'rb') as f:
+            return f.read()
+
+    def serial_output(self):
+        """Compile the project from scratch to a separate file."""
+        args = MockArgs(
+            doctype='txt',
+            output=os.path.join(self.tmp, 'serial', 'output'),
+            path=self.project
+        )
+        proze.run(args)
+        with open(args.output + '.txt', 'rb') as f:
+            return f.read()
+
+    def test_watcher_detects_changes(self):
+        """Modified, created and deleted files are reported once."""
+        path = os.path.join(self.project, 'title.proze')
+        created = os.path.join(self.project, 'new.proze')
+        watcher = Watcher([path, created])
+        self.assertEqual(watcher.poll(), [])
+        self.append('title.proze', 'more')
+        self.assertEqual(watcher.poll(), [path])
+        self.assertEqual(watcher.poll(), [])
+        with open(created, 'w') as f:
+            f.write('created')
+        self.assertEqual(watcher.poll(), [created])
+        os.remove(created)
+        self.assertEqual(watcher.poll(), [created])
+
+    def test_only_changed_file_recompiled(self):
+        """A change to one file only replaces that file's fragment."""
+        project = proze.WatchedProject(self.args)
+        self.assertEqual(self.read_output(), self.serial_output())
+        before = dict(project.fragments)
+        self.append('flee.proze', '\nThey ran all the way home.\n')
+        changed = project.poll()
+        self.assertEqual(changed, [os.path.join(self.project, 'flee.proze')])
+        for filename, fragment in project.fragments.items():
+            if filename == 'flee.proze':
+                self.assertIsNot(fragment, before[filename])
+            else:
+                self.assertIs(fragment, before[filename])
+        output = self.read_output()
+        self.assertIn(b'They ran all the way home.', output)
+        self.assertEqual(output, self.serial_output())
+
+    def test_heading_change_recompiles_next_file(self):
+        """The files after a changed one are recompiled until one starts
+        the same as before, so a file without a heading follows a heading
+        added to the end of the file before it.
+        """
+        shutil.rmtree(self.project)
+        shutil.copytree(no_heading, self.project)
+        project = proze.WatchedProject(self.args)
+        self.assertEqual(self.read_output(), self.serial_output())
+        before = dict(project.fragments)
+        self.append('a.proze', '\n\nChapter: Two')
+        project.poll()
+        output = self.read_output()
+        self.assertIn(b'Two\n\n\nMore prose here.', output)
+        self.assertEqual(output, self.serial_output())
+        self.assertIsNot(project.fragments['b.proze'], before['b.proze'])
+        self.assertIs(project.fragments['c.proze'], before['c.proze'])
+        self.append('b.proze', '\n\nChapter: Three\n')
+        project.poll()
+        self.assertEqual(self.read_output(), self.serial_output())
+
+    def test_rejected_options(self):
+        """Watch mode only recompiles whole documents."""
+        for argv in [
+            ['index', '--watch'],
+            ['report', 'names', '--watch'],
+            ['txt', '--watch', '--chapters', '3'],
+            ['txt', '--watch', '--file', 'flee.proze'],
+        ]:
+            with unittest.mock.patch('sys.argv', ['proze.py'] + argv):
+                with contextlib.redirect_stderr(io.StringIO()) as errors:
+                    with self.assertRaises(SystemExit):
+                        lib.cli.parse()
+            self.assertIn('--watch', errors.getvalue())
+
+    def test_config_change_reloads(self):
+        """Changing the config reloads options and recompiles everything."""
+        project = proze.WatchedProject(self.args)
+        self.append('config.yml', '\n')
+        self.assertEqual(
+            project.poll(),
+            [os.path.join(self.project, 'config.yml')]
+        )
+        self.assertEqual(self.read_output(), self.serial_output())